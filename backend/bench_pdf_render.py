@@ -0,0 +1,98 @@
+"""
+Microbenchmark of per-invoice PDF render time.
+
+  before: the original per-request path - read and base64-encode the logo,
+          render the template with the stylesheet inlined in a <style> block,
+          and let WeasyPrint parse CSS and set up fonts from scratch.
+  after:  crm.pdf_rendering.PdfRenderer - logo encoded once per process,
+          stylesheet parsed once and reused with a shared FontConfiguration.
+
+Nothing touches the database; a synthetic invoice with --items line items
+is rendered --runs times each way (after a warm-up render).
+
+Usage:
+    python bench_pdf_render.py --runs 20 --items 12
+"""
+import argparse
+import base64
+import os
+import statistics
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import weasyprint
+from django.template.loader import render_to_string
+
+from crm.invoice_views import finance_pdf_context
+from crm.pdf_rendering import PdfRenderer
+
+
+def sample_invoice(item_count):
+    items = [
+        {'name': f'Service line {i}', 'price': 1500 + i, 'quantity': 2, 'subtotal': 2 * (1500 + i)}
+        for i in range(item_count)
+    ]
+    return SimpleNamespace(
+        invoice_number='INV-BENCH-0001',
+        issued_date=date.today(),
+        client_name='Benchmark Client LLC',
+        client_email='billing@example.com',
+        client_address='Office 1, Business Bay, Dubai',
+        items=items,
+        grand_total=sum(item['subtotal'] for item in items) * 1.05,
+    )
+
+
+def render_before(context):
+    context = dict(context)
+    with open(PdfRenderer.LOGO_PATH, 'rb') as image_file:
+        context['logo_data'] = base64.b64encode(image_file.read()).decode('utf-8')
+    with open(PdfRenderer.STYLESHEET_PATH, encoding='utf-8') as stylesheet:
+        css = stylesheet.read()
+    html_string = render_to_string(PdfRenderer.TEMPLATE, context)
+    html_string = html_string.replace('</head>', f'<style>{css}</style></head>', 1)
+    return weasyprint.HTML(string=html_string).write_pdf()
+
+
+def time_runs(render, context, runs):
+    render(context)  # warm-up: template loading, first font lookup
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render(context)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<8} mean={statistics.mean(timings):8.1f}ms  "
+          f"p50={statistics.median(timings):8.1f}ms  "
+          f"min={min(timings):8.1f}ms  max={max(timings):8.1f}ms")
+
+
+def run(runs, item_count):
+    context = finance_pdf_context(sample_invoice(item_count), is_invoice=True)
+    print(f"Rendering an invoice with {item_count} items, {runs} runs each\n")
+
+    before = time_runs(render_before, context, runs)
+    report('before', before)
+
+    renderer = PdfRenderer()
+    after = time_runs(renderer.render, context, runs)
+    report('after', after)
+
+    print(f"\nSpeed-up (mean): {statistics.mean(before) / statistics.mean(after):.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--items', type=int, default=12)
+    args = parser.parse_args()
+    run(args.runs, args.items)
@@ -68,7 +68,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=f"postgres://{os.getenv('POSTGRES_USER', 'clickai_user')}:{os.getenv('POSTGRES_PASSWORD', 'strongpassword')}@{os.getenv('POSTGRES_HOST', '127.0.0.1')}:5432/{os.getenv('POSTGRES_DB', 'clickai_crm')}",
-        conn_max_age=600
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600'))
     )
 }
 
@@ -99,6 +99,45 @@ STATIC_ROOT = '/app/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = "/app/media"
 
+# AuditLog months kept in the database before archive_audit_logs moves them to MEDIA_ROOT/audit_archive
+AUDIT_LOG_RETENTION_MONTHS = int(os.getenv('AUDIT_LOG_RETENTION_MONTHS', '12'))
+
+# Read notifications older than this are removed by prune_notifications
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Run history of the periodic jobs executed by `manage.py run_scheduler`
+JOB_RUN_RETENTION_DAYS = int(os.getenv('JOB_RUN_RETENTION_DAYS', '30'))
+
+# A SENT quotation without valid_until expires this many days after its issued_date (sweep_finance_statuses)
+QUOTATION_DEFAULT_VALIDITY_DAYS = int(os.getenv('QUOTATION_DEFAULT_VALIDITY_DAYS', '30'))
+
+# Size bound for rendered invoice/quotation PDFs in MEDIA_ROOT/pdf_cache, enforced by prune_pdf_cache
+PDF_CACHE_MAX_MB = int(os.getenv('PDF_CACHE_MAX_MB', '500'))
+
+# PDF rendering runs in a process pool (crm/workers.py) per web worker process.
+# Downloads wait up to PDF_RENDER_TIMEOUT seconds, then answer 202 with Retry-After.
+# WEB_CONCURRENCY is gunicorn's worker count (gunicorn reads the same variable), so by
+# default the pools of all web workers together get one render process per CPU.
+WEB_CONCURRENCY = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', str(max(1, (os.cpu_count() or 2) // WEB_CONCURRENCY))))
+PDF_RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT', '10'))
+PDF_RENDER_RETRY_AFTER = int(os.getenv('PDF_RENDER_RETRY_AFTER', '2'))
+PDF_RENDER_MAX_PENDING = int(os.getenv('PDF_RENDER_MAX_PENDING', '32'))
+
+# Background exports (run_export_worker) write to MEDIA_ROOT/exports; files are
+# deleted EXPORT_JOB_TTL_HOURS after they finish. A RUNNING job whose worker has
+# not reported progress for EXPORT_JOB_STALE_MINUTES is handed to another worker.
+EXPORT_JOB_TTL_HOURS = int(os.getenv('EXPORT_JOB_TTL_HOURS', '24'))
+EXPORT_JOB_STALE_MINUTES = int(os.getenv('EXPORT_JOB_STALE_MINUTES', '10'))
+
+# Lead documents are stored once per SHA-256 in MEDIA_ROOT/blobs. Chunked uploads
+# (/api/v1/upload-sessions/) stage in MEDIA_ROOT/uploads, send at most
+# UPLOAD_CHUNK_MAX_BYTES per request and are discarded UPLOAD_SESSION_TTL_HOURS
+# after they start if never finished.
+DOCUMENT_MAX_BYTES = int(os.getenv('DOCUMENT_MAX_BYTES', str(500 * 1024 * 1024)))
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv('UPLOAD_CHUNK_MAX_BYTES', str(8 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 cors_allowed_origins_env = os.getenv('CORS_ALLOWED_ORIGINS', '')
@@ -125,11 +164,12 @@ from corsheaders.defaults import default_headers
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'x-skip-loader',
+    'upload-offset',  # chunked document uploads (upload-sessions/<id>/chunk/)
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'crm.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -137,3 +177,29 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+# Bulk onboarding (UserViewSet.bulk_onboard, onboard_users command) hashes passwords
+# in a process pool (crm/password_hashing.py) once a batch has PASSWORD_HASH_POOL_MIN rows.
+# Like the PDF pools, each web worker's pool gets its share of the CPUs, and each web
+# worker hashes at most BULK_ONBOARD_MAX_CONCURRENT batches at once (others get a 503).
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // WEB_CONCURRENCY))))
+PASSWORD_HASH_POOL_MIN = int(os.getenv('PASSWORD_HASH_POOL_MIN', '4'))
+BULK_ONBOARD_MAX_ROWS = int(os.getenv('BULK_ONBOARD_MAX_ROWS', '1000'))
+BULK_ONBOARD_MAX_CONCURRENT = int(os.getenv('BULK_ONBOARD_MAX_CONCURRENT', '1'))
+BULK_ONBOARD_RETRY_AFTER = int(os.getenv('BULK_ONBOARD_RETRY_AFTER', '10'))
+
+# Access and refresh tokens carry the user's compiled permission set (rbac/engine.py)
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'rbac.tokens.PermissionTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'rbac.tokens.PermissionTokenRefreshSerializer',
+}
+
+# ClaimsJWTAuthentication rebuilds the user from token claims and only re-checks
+# is_active / perm_version in the database once per user per this many seconds,
+# so deactivations and permission changes take effect within this window.
+AUTH_USER_STATE_TTL = float(os.getenv('AUTH_USER_STATE_TTL', '30'))
+
+# EventSource cannot send headers, so the notification stream is opened with a
+# ?ticket= from POST /notifications/stream_ticket/ rather than the access token
+# itself; query strings end up in access logs. Tickets expire after this many seconds.
+NOTIFICATION_STREAM_TICKET_TTL = int(os.getenv('NOTIFICATION_STREAM_TICKET_TTL', '30'))
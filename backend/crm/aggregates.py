@@ -0,0 +1,34 @@
+from django.db import NotSupportedError
+from django.db.models import Aggregate, FloatField, Func
+
+
+class DurationSeconds(Func):
+    """Length of an interval expression (e.g. end - start) in seconds, as a float."""
+
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite datetime subtraction yields microseconds
+        return self.as_sql(compiler, connection, template='(%(expressions)s) / 1000000.0', **extra_context)
+
+
+class PercentileCont(Aggregate):
+    """
+    PostgreSQL's ordered-set aggregate PERCENTILE_CONT(fraction) WITHIN GROUP (ORDER BY expr).
+    """
+
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        if not 0 <= percentile <= 1:
+            raise ValueError('percentile must be between 0 and 1')
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if connection.vendor != 'postgresql':
+            raise NotSupportedError('PercentileCont requires PostgreSQL')
+        return super().as_sql(compiler, connection, **extra_context)
@@ -0,0 +1,245 @@
+import glob
+import gzip
+import json
+import os
+import re
+from datetime import date, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class AuditLogArchiveService:
+    """
+    Maintains the monthly partitions of crm_auditlog (see migration 0024) and
+    the compressed JSONL archives that old partitions are moved into.
+
+    Partition bounds are whole UTC months. Everything here is a no-op on
+    databases other than PostgreSQL, where the table is not partitioned.
+    """
+
+    TABLE = 'crm_auditlog'
+    DEFAULT_PARTITION = 'crm_auditlog_default'
+    PARTITION_RE = re.compile(r'^crm_auditlog_y(\d{4})m(\d{2})$')
+    ARCHIVE_RE = re.compile(r'auditlog_(\d{4})_(\d{2})\.jsonl\.gz$')
+    COLUMNS = ['id', 'lead_id', 'actor_id', 'action', 'from_stage', 'to_stage', 'timestamp', 'notes']
+    DETACH_LOCK_TIMEOUT = '5s'
+
+    @staticmethod
+    def is_partitioned():
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [AuditLogArchiveService.TABLE],
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def add_months(d, months):
+        month_index = d.year * 12 + (d.month - 1) + months
+        return date(month_index // 12, month_index % 12 + 1, 1)
+
+    @staticmethod
+    def partition_name(year, month):
+        return f"crm_auditlog_y{year}m{month:02d}"
+
+    @staticmethod
+    def archive_dir():
+        return os.path.join(settings.MEDIA_ROOT, 'audit_archive')
+
+    @staticmethod
+    def archive_path(year, month):
+        return os.path.join(AuditLogArchiveService.archive_dir(), f"auditlog_{year}_{month:02d}.jsonl.gz")
+
+    @staticmethod
+    def list_partitions():
+        """Returns [(year, month, table_name)] for the attached monthly partitions, oldest first."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = %s
+                """,
+                [AuditLogArchiveService.TABLE],
+            )
+            names = [row[0] for row in cursor.fetchall()]
+
+        partitions = []
+        for name in names:
+            match = AuditLogArchiveService.PARTITION_RE.match(name)
+            if match:
+                partitions.append((int(match.group(1)), int(match.group(2)), name))
+        return sorted(partitions)
+
+    @staticmethod
+    def ensure_partitions(months_ahead=3):
+        """
+        Creates any missing monthly partitions from the current month up to
+        `months_ahead` months in the future. Rows that already landed in the
+        default partition for such a month are moved into the new partition.
+        Returns the names of the partitions created.
+        """
+        if not AuditLogArchiveService.is_partitioned():
+            return []
+
+        existing = {name for _, _, name in AuditLogArchiveService.list_partitions()}
+        this_month = timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+        created = []
+
+        for offset in range(months_ahead + 1):
+            month_start = AuditLogArchiveService.add_months(this_month, offset)
+            name = AuditLogArchiveService.partition_name(month_start.year, month_start.month)
+            if name in existing:
+                continue
+
+            month_end = AuditLogArchiveService.add_months(month_start, 1)
+            bounds = [month_start.isoformat(), month_end.isoformat()]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE {name} (LIKE {AuditLogArchiveService.TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+                cursor.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {AuditLogArchiveService.DEFAULT_PARTITION}
+                        WHERE "timestamp" >= %s AND "timestamp" < %s
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved
+                    """,
+                    bounds,
+                )
+                cursor.execute(
+                    f"ALTER TABLE {AuditLogArchiveService.TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                    bounds,
+                )
+            created.append(name)
+
+        return created
+
+    @staticmethod
+    def detached_partitions():
+        """Returns [(year, month, table_name)] for monthly tables an interrupted archive run left detached."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT relname FROM pg_class
+                WHERE relkind = 'r' AND relname ~ '^crm_auditlog_y[0-9]{4}m[0-9]{2}$'
+                  AND pg_table_is_visible(oid)
+                  AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = pg_class.oid)
+                """
+            )
+            names = [row[0] for row in cursor.fetchall()]
+
+        partitions = []
+        for name in names:
+            match = AuditLogArchiveService.PARTITION_RE.match(name)
+            partitions.append((int(match.group(1)), int(match.group(2)), name))
+        return sorted(partitions)
+
+    @staticmethod
+    def archivable_partitions(keep_months):
+        """
+        Partitions whose whole month is older than the last `keep_months`
+        months, plus any detached month still waiting to be archived.
+        """
+        this_month = timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+        cutoff = AuditLogArchiveService.add_months(this_month, -keep_months)
+        attached = [
+            (year, month, name)
+            for year, month, name in AuditLogArchiveService.list_partitions()
+            if date(year, month, 1) < cutoff
+        ]
+        return sorted(attached + AuditLogArchiveService.detached_partitions())
+
+    @staticmethod
+    def archive_partition(year, month):
+        """
+        Detaches the partition for the given month, writes its rows to a
+        gzipped JSONL file under MEDIA_ROOT/audit_archive and drops it.
+        Returns (path, row_count).
+
+        Each step commits on its own, so crm_auditlog is only locked for the
+        DETACH itself (DETACH ... CONCURRENTLY is not allowed alongside the
+        default partition). The export reads the detached table, which no
+        query on crm_auditlog sees any more, and a run interrupted before the
+        DROP leaves a detached table that the next run archives again; the
+        archive file is simply rewritten, never duplicated in the history.
+        """
+        if connection.in_atomic_block:
+            raise RuntimeError('archive_partition commits each step and cannot run inside a transaction')
+
+        name = AuditLogArchiveService.partition_name(year, month)
+        path = AuditLogArchiveService.archive_path(year, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        columns = ', '.join(f'"{column}"' for column in AuditLogArchiveService.COLUMNS)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", [name])
+            if cursor.fetchone() is not None:
+                # Give up rather than queue: a waiting ACCESS EXCLUSIVE request blocks every insert behind it
+                cursor.execute(f"SET LOCAL lock_timeout = '{AuditLogArchiveService.DETACH_LOCK_TIMEOUT}'")
+                cursor.execute(f"ALTER TABLE {AuditLogArchiveService.TABLE} DETACH PARTITION {name}")
+
+        row_count = 0
+        # chunked_cursor() is a server-side cursor, so the month is never held in memory
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(f"SELECT {columns} FROM {name} ORDER BY id")
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+                while True:
+                    rows = cursor.fetchmany(2000)
+                    if not rows:
+                        break
+                    for row in rows:
+                        record = dict(zip(AuditLogArchiveService.COLUMNS, row))
+                        record['timestamp'] = record['timestamp'].isoformat()
+                        archive.write(json.dumps(record) + '\n')
+                        row_count += 1
+        finally:
+            cursor.close()
+
+        os.replace(tmp_path, path)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {name}")
+
+        return path, row_count
+
+    @staticmethod
+    def archived_months():
+        """Returns [(year, month)] for every archive file on disk, oldest first."""
+        months = []
+        for path in glob.glob(os.path.join(AuditLogArchiveService.archive_dir(), 'auditlog_*.jsonl.gz')):
+            match = AuditLogArchiveService.ARCHIVE_RE.search(path)
+            if match:
+                months.append((int(match.group(1)), int(match.group(2))))
+        return sorted(months)
+
+    @staticmethod
+    def read_archived(lead_id=None, months=None):
+        """
+        Yields archived rows as dicts (timestamp parsed back to a datetime).
+        Only the requested months are opened; by default every archived month.
+        """
+        if months is None:
+            months = AuditLogArchiveService.archived_months()
+
+        for year, month in months:
+            path = AuditLogArchiveService.archive_path(year, month)
+            if not os.path.exists(path):
+                continue
+            with gzip.open(path, 'rt', encoding='utf-8') as archive:
+                for line in archive:
+                    record = json.loads(line)
+                    if lead_id is not None and record['lead_id'] != lead_id:
+                        continue
+                    record['timestamp'] = parse_datetime(record['timestamp'])
+                    yield record
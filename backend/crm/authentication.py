@@ -0,0 +1,123 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from rbac.tokens import PERMISSIONS_CLAIM, PERM_VERSION_CLAIM
+from .models import ClaimsUser, User
+
+
+class UserStateCache:
+    """
+    Per-process, short-TTL cache of (is_active, perm_version) per user id:
+    the only columns that must be current to trust a token's claims.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Returns (is_active, perm_version), or None if the user no longer exists."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        state = User.objects.filter(pk=user_id).values_list('is_active', 'perm_version').first()
+        with self._lock:
+            self._entries[user_id] = (now + settings.AUTH_USER_STATE_TTL, state)
+        return state
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = UserStateCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request User query.
+
+    Tokens issued by rbac.tokens carry the user's identity columns, compiled
+    permissions and perm_version. When the cached perm_version still matches
+    the token's, the user is rebuilt from the claims as a ClaimsUser (which
+    loads any other column lazily); otherwise the claims are stale and the
+    User is loaded as before. Deleted and deactivated users are rejected
+    within AUTH_USER_STATE_TTL seconds.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        # simplejwt stores the id as a string; the cache and ClaimsUser need the real pk
+        user_id = User._meta.pk.to_python(user_id)
+
+        state = user_states.get(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, perm_version = state
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        perms = validated_token.get(PERMISSIONS_CLAIM)
+        token_version = validated_token.get(PERM_VERSION_CLAIM)
+        claims = {field: validated_token.get(field) for field in ClaimsUser.CLAIM_FIELDS}
+
+        if token_version == perm_version and perms is not None and None not in claims.values():
+            user = ClaimsUser.from_claims(user_id, claims, is_active, perm_version)
+        else:
+            user = super().get_user(validated_token)
+
+        if perms is not None and token_version is not None:
+            user.permission_claims = (token_version, perms)
+        return user
+
+
+STREAM_TICKET_SALT = 'crm.notification-stream'
+
+
+def issue_stream_ticket(user):
+    """A signed, short-lived ticket that only opens the notification stream."""
+    return signing.dumps(user.pk, salt=STREAM_TICKET_SALT)
+
+
+class StreamTicketAuthentication(ClaimsJWTAuthentication):
+    """
+    Reads a stream ticket from ?ticket= for clients that cannot set an
+    Authorization header, such as the browser's EventSource. Unlike the
+    access token, a ticket that ends up in an access log is useless after
+    NOTIFICATION_STREAM_TICKET_TTL seconds and for anything but the stream.
+    Only enable it on views that need it.
+    """
+
+    def authenticate(self, request):
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        try:
+            user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT,
+                                    max_age=settings.NOTIFICATION_STREAM_TICKET_TTL)
+        except signing.BadSignature:
+            raise AuthenticationFailed(_("Stream ticket is invalid or expired"), code="ticket_invalid")
+
+        state = user_states.get(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not state[0]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return User.objects.get(pk=user_id), None
@@ -0,0 +1,116 @@
+"""
+Column definitions for tabular exports (XLSX and CSV).
+
+Exports read plain values (values_list + iterator) instead of model
+instances, so each column names the database fields it needs and a
+formatter that turns them into a cell value.
+"""
+from django.utils import timezone
+
+
+def _text(value):
+    return value or ''
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def _person(first_name, last_name, username):
+    if first_name:
+        return f"{first_name} {last_name}"
+    return username or ''
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+def _local_date(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d')
+
+
+def _local_time(value):
+    return timezone.localtime(value).strftime('%H:%M:%S')
+
+
+def _local_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+# (header, fields, formatter)
+LEAD_EXPORT_COLUMNS = [
+    ('ID', ['id'], None),
+    ('Name', ['first_name', 'last_name'], lambda first, last: f"{first} {last}"),
+    ('Company Name', ['company_name'], _text),
+    ('Industry', ['industry'], _text),
+    ('Emirate', ['emirate'], _text),
+    ('Address', ['address'], _text),
+    ('Email', ['email'], _text),
+    ('Phone Number', ['phone'], _text),
+    ('Status', ['status'], None),
+    ('Stage', ['stage'], None),
+    ('Lead Generator', ['lead_generator__first_name', 'lead_generator__last_name', 'lead_generator__username'], _person),
+    ('Assigned To', ['assigned_to__first_name', 'assigned_to__last_name', 'assigned_to__username'], _person),
+    ('Created Date', ['created_at'], _local_date),
+    ('Create Time', ['created_at'], _local_time),
+    ('Service Requested', ['tech_requirements'], _text),
+    ('Follow up Reminder (latest)', ['reminder_date'], _date),
+    ('Latest Update Date', ['latest_update'], _date),
+    ('Remarks', ['remarks'], _text),
+    ('Location Link', ['created_location_link'], _text),
+]
+
+REMINDER_EXPORT_COLUMNS = [
+    ('ID', ['id'], None),
+    ('Lead ID', ['lead_id'], None),
+    ('Lead Name', ['lead__first_name', 'lead__last_name'], _full_name),
+    ('Company Name', ['lead__company_name'], _text),
+    ('Assigned To', ['assigned_to__first_name', 'assigned_to__last_name', 'assigned_to__username'], _person),
+    ('Type', ['reminder_type'], None),
+    ('Reason', ['reason'], _text),
+    ('Status', ['status'], None),
+    ('Due', ['due_date'], _local_datetime),
+    ('Message', ['message'], _text),
+    ('Read', ['is_read'], lambda is_read: 'Yes' if is_read else 'No'),
+    ('Created', ['created_at'], _local_datetime),
+    ('Completed', ['completed_at'], _local_datetime),
+]
+
+TASK_EXPORT_COLUMNS = [
+    ('ID', ['id'], None),
+    ('Subject', ['subject'], None),
+    ('Status', ['status'], None),
+    ('Priority', ['priority'], None),
+    ('Deadline', ['deadline'], _local_datetime),
+    ('Owner', ['owner__first_name', 'owner__last_name', 'owner__username'], _person),
+    ('Lead ID', ['lead_id'], _text),
+    ('Lead Name', ['lead__first_name', 'lead__last_name'], _full_name),
+    ('Deal', ['deal__name'], _text),
+    ('Contact', ['contact__first_name', 'contact__last_name'], _full_name),
+    ('Description', ['description'], _text),
+    ('Created', ['created_at'], _local_datetime),
+]
+
+
+def export_headers(columns):
+    return [header for header, _, _ in columns]
+
+
+def export_rows(queryset, columns, chunk_size=2000):
+    """
+    Yields one formatted row per object in `queryset`, fetching only the
+    fields the columns need in chunks from a server-side cursor.
+    """
+    fields = list(dict.fromkeys(field for _, column_fields, _ in columns for field in column_fields))
+    positions = {field: index for index, field in enumerate(fields)}
+    plan = [
+        ([positions[field] for field in column_fields], formatter)
+        for _, column_fields, formatter in columns
+    ]
+
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield [
+            formatter(*(values[i] for i in indexes)) if formatter else values[indexes[0]]
+            for indexes, formatter in plan
+        ]
@@ -1,21 +1,31 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils import timezone
-from datetime import timedelta
-from .models import Invoice, Quotation
+from datetime import datetime, timedelta
+from concurrent.futures import FIRST_COMPLETED, TimeoutError as FuturesTimeoutError, wait as futures_wait
+from django.conf import settings
+from django.db import transaction
+from .models import Invoice, Quotation, InvoiceItem, QuotationItem
 from .serializers import InvoiceSerializer, QuotationSerializer
 from .views import StandardResultsSetPagination
-from .utils import generate_pdf
+from .workers import pdf_render_pool, PoolBusy
+from .pdf_cache import PdfCacheService
+from .services import DocumentNumberService, LineItemService, ReceivablesService
+from .utils import ZipStreamBuffer
 from .num2words import num2words
-import random
-import base64
+import logging
 import os
-from django.conf import settings
+import time
+import zipfile
 
-def generate_finance_pdf(obj, request, is_invoice=False):
-    """Helper to generate PDF for either Quotation or Invoice"""
+logger = logging.getLogger(__name__)
+
+def finance_pdf_context(obj, is_invoice=False):
+    """Template context for a Quotation or Invoice PDF (everything except static assets)"""
     # Calculate validity/due date
     issued_date = obj.issued_date
     due_date = None
@@ -36,8 +46,7 @@ def generate_finance_pdf(obj, request, is_invoice=False):
     subtotal = round(grand_total_with_vat / 1.05, 2)
     vat_amount = round(grand_total_with_vat - subtotal, 2)
     
-    # Prepare context for template
-    context = {
+    return {
         'title': title,
         'number_label': label,
         'number': number,
@@ -53,22 +62,172 @@ def generate_finance_pdf(obj, request, is_invoice=False):
         'grand_total_words': num2words(grand_total_with_vat),
         'is_invoice': is_invoice,
     }
-    
-    logo_path = os.path.join(settings.BASE_DIR, 'crm/static/crm/img/clickai_logo.jpg')
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            context['logo_data'] = encoded_string
+
+def pdf_file_response(request, path, key, filename):
+    """Serves a cached PDF with validators, or 304 when the client's copy is current"""
+    etag = f'"{key}"'
+    last_modified = int(os.path.getmtime(path))
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Always revalidate: the same URL serves a new ETag once the document changes
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def generate_finance_pdf(obj, request, is_invoice=False):
+    """
+    Helper to serve the PDF for either Quotation or Invoice. Cache misses are
+    rendered on the PDF process pool; if that takes longer than
+    PDF_RENDER_TIMEOUT the client gets 202 + Retry-After and polls the same URL
+    (the render keeps going and lands in the cache).
+    """
+    context = finance_pdf_context(obj, is_invoice)
+    key = PdfCacheService.cache_key(context)
     
     try:
-        pdf_content = generate_pdf('crm/invoice.html', context, request)
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="{number}.pdf"'
-        return response
-    except Exception as e:
-        print(f"Error generating PDF: {str(e)}") 
+        for attempt in range(2):
+            path = PdfCacheService.get(key)
+            if path is None:
+                future = pdf_render_pool.submit(key, context)
+                path = future.result(timeout=settings.PDF_RENDER_TIMEOUT)
+            try:
+                return pdf_file_response(request, path, key, f"{context['number']}.pdf")
+            except FileNotFoundError:
+                # prune_pdf_cache removed the file after it was found: render it again
+                if attempt:
+                    raise
+    except FuturesTimeoutError:
+        return render_pending_response()
+    except PoolBusy:
+        return render_pending_response(status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception:
+        logger.exception("Error generating PDF for %s", context['number'])
         return None
 
+def render_pending_response(status_code=status.HTTP_202_ACCEPTED):
+    retry_after = settings.PDF_RENDER_RETRY_AFTER
+    response = Response({'status': 'rendering', 'retry_after': retry_after}, status=status_code)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+def filter_finance_documents(queryset, params):
+    """Applies ?status=, ?issued_from= and ?issued_to= (YYYY-MM-DD, inclusive). Raises ValueError on bad dates."""
+    status_param = params.get('status')
+    if status_param:
+        queryset = queryset.filter(status=status_param)
+    issued_from = params.get('issued_from')
+    if issued_from:
+        queryset = queryset.filter(issued_date__gte=datetime.strptime(issued_from, '%Y-%m-%d').date())
+    issued_to = params.get('issued_to')
+    if issued_to:
+        queryset = queryset.filter(issued_date__lte=datetime.strptime(issued_to, '%Y-%m-%d').date())
+    return queryset
+
+def stream_finance_pdf_zip(queryset, is_invoice, filename):
+    """
+    Streams a ZIP of the PDFs for every document in `queryset`. Cache hits are
+    added directly; misses are rendered on the PDF process pool with a bounded
+    number in flight, and each PDF is written to the archive (stored, PDFs are
+    already compressed) as soon as its render finishes, so memory holds about
+    one PDF and wall time scales with PDF_RENDER_WORKERS.
+    """
+    window = max(1, min(settings.PDF_RENDER_WORKERS * 2, settings.PDF_RENDER_MAX_PENDING // 2))
+
+    def generate():
+        buffer = ZipStreamBuffer()
+        failed = []
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            in_flight = {}
+
+            def add(path, number):
+                with open(path, 'rb') as pdf:
+                    archive.writestr(f"{number.replace('/', '-')}.pdf", pdf.read())
+
+            def collect(block):
+                done, _ = futures_wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    number = in_flight.pop(future)
+                    try:
+                        add(future.result(), number)
+                    except Exception as e:
+                        failed.append(f"{number}: {e}")
+
+            for obj in queryset.iterator(chunk_size=200):
+                context = finance_pdf_context(obj, is_invoice)
+                key = PdfCacheService.cache_key(context)
+                path = PdfCacheService.get(key)
+                if path is not None:
+                    add(path, context['number'])
+                else:
+                    while True:
+                        if len(in_flight) >= window:
+                            collect(block=True)
+                            continue
+                        try:
+                            in_flight[pdf_render_pool.submit(key, context)] = context['number']
+                            break
+                        except PoolBusy:
+                            # Other downloads fill the pool; wait for one of ours or briefly back off
+                            if in_flight:
+                                collect(block=True)
+                            else:
+                                time.sleep(0.2)
+                collect(block=False)
+                chunk = buffer.drain()
+                if chunk:
+                    yield chunk
+
+            while in_flight:
+                collect(block=True)
+                yield buffer.drain()
+
+            if failed:
+                archive.writestr('errors.txt', '\n'.join(failed) + '\n')
+        yield buffer.drain()
+
+    response = StreamingHttpResponse(generate(), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def revenue_by_item_response(request, item_model, default_statuses):
+    """
+    Shared body of the revenue-by-item actions: ?period=month|quarter|year,
+    ?issued_from=&issued_to= (YYYY-MM-DD) and ?status= (comma separated).
+    """
+    period = request.query_params.get('period', 'month')
+    if period not in ('month', 'quarter', 'year'):
+        return Response({"error": "period must be month, quarter or year"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        issued_from = request.query_params.get('issued_from')
+        issued_to = request.query_params.get('issued_to')
+        date_from = datetime.strptime(issued_from, '%Y-%m-%d').date() if issued_from else None
+        date_to = datetime.strptime(issued_to, '%Y-%m-%d').date() if issued_to else None
+    except ValueError:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+    status_param = request.query_params.get('status')
+    statuses = status_param.split(',') if status_param else default_statuses
+
+    rows = LineItemService.revenue_by_item(item_model, period, date_from, date_to, statuses)
+    return Response({
+        'period': period,
+        'statuses': statuses,
+        'results': [
+            {
+                'period': row['period'].isoformat(),
+                'name': row['name'],
+                'revenue': float(row['revenue']),
+                'quantity': float(row['quantity']),
+                'documents': row['documents'],
+            }
+            for row in rows
+        ],
+    })
+
 class QuotationViewSet(viewsets.ModelViewSet):
     queryset = Quotation.objects.all().order_by('-created_at')
     serializer_class = QuotationSerializer
@@ -82,14 +241,28 @@ class QuotationViewSet(viewsets.ModelViewSet):
             return response
         return Response({"error": "Failed to generate PDF quotation"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='export-pdfs')
+    def export_pdfs(self, request):
+        """ZIP of the PDFs matching ?status=&issued_from=&issued_to=, streamed as they render"""
+        try:
+            queryset = filter_finance_documents(self.get_queryset(), request.query_params)
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if not queryset.exists():
+            return Response({"error": "No quotations match the filter"}, status=status.HTTP_404_NOT_FOUND)
+        filename = f"quotations_{timezone.localdate():%Y%m%d}.zip"
+        return stream_finance_pdf_zip(queryset, is_invoice=False, filename=filename)
+
+    @action(detail=False, methods=['get'], url_path='revenue-by-item')
+    def revenue_by_item(self, request):
+        """Line item revenue (before VAT) grouped by item name and period"""
+        return revenue_by_item_response(request, QuotationItem, ['SENT', 'ACCEPTED'])
+
     def perform_create(self, serializer):
-        if not serializer.validated_data.get('quotation_number'):
-            today = timezone.now()
-            random_suffix = random.randint(100000, 999999)
-            quotation_number = f"QUO-{today.year}-{random_suffix}"
+        issued_date = serializer.validated_data.get('issued_date') or timezone.localdate()
+        with transaction.atomic():
+            quotation_number = DocumentNumberService.next_number(DocumentNumberService.QUOTATION_PREFIX, issued_date.year)
             serializer.save(created_by=self.request.user, quotation_number=quotation_number)
-        else:
-            serializer.save(created_by=self.request.user)
 
 class InvoiceViewSet(viewsets.ModelViewSet):
     queryset = Invoice.objects.all().order_by('-created_at')
@@ -104,11 +277,46 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             return response
         return Response({"error": "Failed to generate PDF invoice"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='export-pdfs')
+    def export_pdfs(self, request):
+        """ZIP of the PDFs matching ?status=&issued_from=&issued_to=, streamed as they render"""
+        try:
+            queryset = filter_finance_documents(self.get_queryset(), request.query_params)
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if not queryset.exists():
+            return Response({"error": "No invoices match the filter"}, status=status.HTTP_404_NOT_FOUND)
+        filename = f"invoices_{timezone.localdate():%Y%m%d}.zip"
+        return stream_finance_pdf_zip(queryset, is_invoice=True, filename=filename)
+
+    @action(detail=False, methods=['get'], url_path='revenue-by-item')
+    def revenue_by_item(self, request):
+        """Line item revenue (before VAT) grouped by item name and period"""
+        return revenue_by_item_response(request, InvoiceItem, ['ISSUED', 'OVERDUE', 'PAID'])
+
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """Accounts-receivable aging of open invoices per client (?as_of=YYYY-MM-DD, ?client=)"""
+        as_of = request.query_params.get('as_of')
+        try:
+            as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else timezone.localdate()
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, totals = ReceivablesService.aging(as_of, request.query_params.get('client'))
+        amounts = ['total', 'current', *(label for label, _, _ in ReceivablesService.AGING_BUCKETS)]
+
+        def as_float(row):
+            return {**row, **{label: float(row[label]) for label in amounts}}
+
+        return Response({
+            'as_of': as_of.isoformat(),
+            'clients': [as_float(row) for row in rows],
+            'totals': as_float(totals),
+        })
+
     def perform_create(self, serializer):
-        if not serializer.validated_data.get('invoice_number'):
-            today = timezone.now()
-            random_suffix = random.randint(100000, 999999)
-            invoice_number = f"INV-{today.year}-{random_suffix}"
+        issued_date = serializer.validated_data.get('issued_date') or timezone.localdate()
+        with transaction.atomic():
+            invoice_number = DocumentNumberService.next_number(DocumentNumberService.INVOICE_PREFIX, issued_date.year)
             serializer.save(created_by=self.request.user, invoice_number=invoice_number)
-        else:
-            serializer.save(created_by=self.request.user)
@@ -0,0 +1,88 @@
+"""
+Periodic jobs run by `manage.py run_scheduler`.
+
+Each job receives a text stream for its output, which is stored on the JobRun.
+Schedules are cron expressions in the project TIME_ZONE.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from .scheduler import register
+
+
+@register('generate_reminders', '0 * * * *', 'Auto reminders for stale and untouched leads')
+def generate_reminders(stdout):
+    call_command('generate_reminders', stdout=stdout)
+
+
+@register('check_stagnation', '30 * * * *', 'Reminders for leads not updated in 2 days')
+def check_stagnation(stdout):
+    from .models import Lead, LeadStage, User
+    from .services import StagnationService
+
+    threshold = timezone.now() - timedelta(days=2)
+    user_ids = Lead.objects.filter(
+        assigned_to__isnull=False,
+        updated_at__lt=threshold,
+    ).exclude(
+        stage__in=[LeadStage.WON, LeadStage.LOST, LeadStage.DELIVERED]
+    ).values('assigned_to_id').distinct()
+
+    total = 0
+    for user in User.objects.filter(id__in=user_ids, is_active=True):
+        total += StagnationService.check_and_alert(user)
+    stdout.write(f"Created {total} stagnation reminders.\n")
+
+
+@register('sweep_finance_statuses', '5 * * * *', 'Mark overdue invoices and expired quotations')
+def sweep_finance_statuses(stdout):
+    call_command('sweep_finance_statuses', stdout=stdout)
+
+
+@register('archive_audit_logs', '15 2 * * *', 'Create upcoming AuditLog partitions and archive old ones')
+def archive_audit_logs(stdout):
+    call_command('archive_audit_logs', stdout=stdout)
+
+
+@register('prune_notifications', '45 2 * * *', 'Coalesce notification bursts and prune old read notifications')
+def prune_notifications(stdout):
+    call_command('prune_notifications', stdout=stdout)
+
+
+@register('prune_pdf_cache', '30 3 * * *', 'Evict least recently used PDFs past PDF_CACHE_MAX_MB')
+def prune_pdf_cache(stdout):
+    call_command('prune_pdf_cache', stdout=stdout)
+
+
+@register('expire_exports', '20 * * * *', 'Delete background export files past EXPORT_JOB_TTL_HOURS')
+def expire_exports(stdout):
+    from .services import ExportJobService
+
+    stdout.write(f"Expired {ExportJobService.expire()} exports.\n")
+
+
+@register('expire_uploads', '25 * * * *', 'Discard unfinished upload sessions past UPLOAD_SESSION_TTL_HOURS')
+def expire_uploads(stdout):
+    from .services import DocumentStorageService
+
+    stdout.write(f"Expired {DocumentStorageService.expire_sessions()} upload sessions.\n")
+
+
+@register('prune_document_blobs', '50 3 * * *', 'Delete stored document files no lead document references')
+def prune_document_blobs(stdout):
+    from .services import DocumentStorageService
+
+    deleted, freed = DocumentStorageService.prune_blobs()
+    stdout.write(f"Deleted {deleted} document blobs ({freed / (1024 * 1024):.1f} MB).\n")
+
+
+@register('prune_job_runs', '0 3 * * *', 'Delete scheduler run history past JOB_RUN_RETENTION_DAYS')
+def prune_job_runs(stdout):
+    from .models import JobRun
+
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RUN_RETENTION_DAYS)
+    deleted, _ = JobRun.objects.filter(started_at__lt=cutoff).exclude(status=JobRun.Status.RUNNING).delete()
+    stdout.write(f"Deleted {deleted} job runs.\n")
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crm.audit_archive import AuditLogArchiveService
+
+class Command(BaseCommand):
+    help = 'Creates upcoming AuditLog partitions and archives partitions past the retention window to MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=settings.AUDIT_LOG_RETENTION_MONTHS,
+                            help='Number of recent months to keep in the database')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future monthly partitions to keep ready')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the partitions that would be archived without touching them')
+
+    def handle(self, *args, **options):
+        if not AuditLogArchiveService.is_partitioned():
+            self.stdout.write(self.style.WARNING('crm_auditlog is not partitioned on this database. Nothing to do.'))
+            return
+
+        created = AuditLogArchiveService.ensure_partitions(months_ahead=options['months_ahead'])
+        for name in created:
+            self.stdout.write(f"Created partition {name}")
+
+        partitions = AuditLogArchiveService.archivable_partitions(options['keep_months'])
+        if not partitions:
+            self.stdout.write("No partitions past the retention window.")
+
+        for year, month, name in partitions:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {name}")
+                continue
+            path, row_count = AuditLogArchiveService.archive_partition(year, month)
+            self.stdout.write(f"Archived {row_count} rows from {name} to {path}")
+
+        self.stdout.write(self.style.SUCCESS('AuditLog archival complete.'))
@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand
+from crm.models import LeadDocument
+from crm.services import DocumentStorageService
+
+class Command(BaseCommand):
+    help = 'Moves lead documents uploaded before content-addressed storage into deduplicated blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the documents to move')
+
+    def handle(self, *args, **options):
+        documents = LeadDocument.objects.filter(blob__isnull=True).exclude(file_path='')
+        if options['dry_run']:
+            self.stdout.write(f"{documents.count()} documents are not stored as blobs yet.")
+            return
+
+        moved = missing = 0
+        for document in documents.iterator(chunk_size=500):
+            old_name = document.file_path.name
+            old_path = DocumentStorageService.absolute_path(old_name)
+            if not os.path.exists(old_path):
+                missing += 1
+                continue
+
+            # Move the file unless another legacy row still points at the same name
+            shared = LeadDocument.objects.filter(file_path=old_name).exclude(pk=document.pk).exists()
+            blob = DocumentStorageService.store(old_path, document.name or old_name, move=not shared)
+            LeadDocument.objects.filter(pk=document.pk).update(blob=blob, file_path=blob.path)
+            moved += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} documents into deduplicated blobs; {missing} files were missing."
+        ))
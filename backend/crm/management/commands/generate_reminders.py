@@ -1,74 +1,71 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from datetime import timedelta
-from crm.models import Lead, FollowUpReminder, User, LeadStage
+from crm.models import Lead, FollowUpReminder, LeadStage
+from crm.services import ReminderService
 
 class Command(BaseCommand):
     help = 'Auto-generates follow-up reminders for stale and new leads'
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Running auto-reminder generation...")
-        
+        now = timezone.now()
+
         # 1. Stale Leads (Last contacted > 3 days ago)
-        three_days_ago = timezone.now() - timedelta(days=3)
         stale_leads = Lead.objects.filter(
-            last_contacted__lt=three_days_ago
+            last_contacted__lt=now - timedelta(days=3)
         ).exclude(
             stage__in=[LeadStage.LOST, LeadStage.DELIVERED, LeadStage.ON_HOLD]
         )
-        
-        stale_count = 0
-        for lead in stale_leads:
-            # Check if pending reminder already exists to avoid duplicates
-            exists = FollowUpReminder.objects.filter(
-                lead=lead, 
-                status='PENDING',
-                reminder_type='AUTO',
-                message__contains='Stale Lead'
-            ).exists()
-            
-            if not exists and lead.assigned_to:
-                FollowUpReminder.objects.create(
-                    lead=lead,
-                    assigned_to=lead.assigned_to,
-                    reminder_type='AUTO',
-                    status='PENDING',
-                    due_date=timezone.now(),
-                    message=f"Stale Lead: Has not been contacted in over 3 days. Please follow up."
-                )
-                stale_count += 1
-
+        stale_count = self.generate(
+            stale_leads,
+            FollowUpReminder.Reason.STALE_LEAD,
+            "Stale Lead: Has not been contacted in over 3 days. Please follow up.",
+            now,
+        )
         self.stdout.write(f"Generated {stale_count} reminders for stale leads.")
 
-        # 2. New Leads (Created > 24 hours ago and still in 'New' equivalent stage or untouched)
-        # Assuming 'PROFILING' is the first stage.
-        one_day_ago = timezone.now() - timedelta(days=1)
+        # 2. New Leads (Created > 24 hours ago, still a new inquiry and never contacted)
         new_untouched_leads = Lead.objects.filter(
             stage=LeadStage.NEW_INQUIRY,
-            created_at__lt=one_day_ago,
+            created_at__lt=now - timedelta(days=1),
             last_contacted__isnull=True
         )
-
-        new_count = 0
-        for lead in new_untouched_leads:
-             # Check for duplicates
-            exists = FollowUpReminder.objects.filter(
-                lead=lead, 
-                status='PENDING',
-                reminder_type='AUTO',
-                message__contains='New Lead'
-            ).exists()
-
-            if not exists and lead.assigned_to:
-                FollowUpReminder.objects.create(
-                    lead=lead,
-                    assigned_to=lead.assigned_to,
-                    reminder_type='AUTO',
-                    status='PENDING',
-                    due_date=timezone.now(),
-                    message=f"New Lead: Created over 24 hours ago and no contact logged."
-                )
-                new_count += 1
-                
+        new_count = self.generate(
+            new_untouched_leads,
+            FollowUpReminder.Reason.NEW_UNTOUCHED,
+            "New Lead: Created over 24 hours ago and no contact logged.",
+            now,
+        )
         self.stdout.write(f"Generated {new_count} reminders for new untouched leads.")
         self.stdout.write(self.style.SUCCESS('Auto-reminder generation complete.'))
+
+    def generate(self, leads, reason, message, due_date):
+        """
+        Creates one PENDING AUTO reminder (plus its notification) for every assigned
+        lead in `leads` that does not already have a pending reminder for `reason`.
+        The missing leads are found with a single anti-join.
+        """
+        pending_for_reason = FollowUpReminder.objects.filter(
+            lead=OuterRef('pk'),
+            status=FollowUpReminder.Status.PENDING,
+            reason=reason,
+        )
+        missing = leads.filter(assigned_to__isnull=False).filter(~Exists(pending_for_reason))
+
+        reminders = [
+            FollowUpReminder(
+                lead_id=lead_id,
+                assigned_to_id=assigned_to_id,
+                reminder_type=FollowUpReminder.Type.AUTO,
+                reason=reason,
+                status=FollowUpReminder.Status.PENDING,
+                due_date=due_date,
+                message=message,
+            )
+            for lead_id, assigned_to_id in missing.values_list('id', 'assigned_to_id').iterator(chunk_size=2000)
+        ]
+        with transaction.atomic():
+            return ReminderService.bulk_create_with_notifications(reminders)
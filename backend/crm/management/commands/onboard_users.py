@@ -0,0 +1,38 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from crm.services import OnboardingService
+
+class Command(BaseCommand):
+    help = 'Onboards users in bulk from a CSV or JSON file (see UserViewSet.bulk_onboard for the columns)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV file with a header row, or a .json list of users')
+        parser.add_argument('--default-password', type=str, default=None,
+                            help=f'Password for rows without one (default: {OnboardingService.DEFAULT_PASSWORD})')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the rows')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, encoding='utf-8-sig') as source:
+                text = source.read()
+            rows = OnboardingService.parse_json(json.loads(text)) if path.lower().endswith('.json') else OnboardingService.parse_csv(text)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        started = time.monotonic()
+        results = OnboardingService.onboard(rows, default_password=options['default_password'], dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        for result in results:
+            if result['status'] == 'error':
+                self.stdout.write(self.style.ERROR(
+                    f"row {result['row']} {result['username'] or '-'}: {'; '.join(result['errors'])}"
+                ))
+        ok = sum(result['status'] != 'error' for result in results)
+        verb = 'valid' if options['dry_run'] else 'created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{ok} users {verb}, {len(results) - ok} failed, in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,40 @@
+import gzip
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from crm.services import NotificationService
+
+class Command(BaseCommand):
+    help = 'Coalesces notification bursts into digests and deletes (or archives) old read notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help='Delete read notifications older than this many days')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per batch')
+        parser.add_argument('--archive', action='store_true',
+                            help='Write deleted rows to a gzipped JSONL file under MEDIA_ROOT/notification_archive')
+        parser.add_argument('--min-burst', type=int, default=5,
+                            help='Smallest burst of similar unread notifications that is coalesced into a digest')
+        parser.add_argument('--skip-coalesce', action='store_true',
+                            help='Only prune, do not coalesce bursts')
+
+    def handle(self, *args, **options):
+        if not options['skip_coalesce']:
+            coalesced = NotificationService.coalesce_bursts(min_burst=options['min_burst'])
+            self.stdout.write(f"Coalesced {coalesced} notifications into digests.")
+
+        older_than = timezone.now() - timedelta(days=options['days'])
+        if options['archive']:
+            archive_dir = os.path.join(settings.MEDIA_ROOT, 'notification_archive')
+            os.makedirs(archive_dir, exist_ok=True)
+            path = os.path.join(archive_dir, f"notifications_{timezone.now():%Y%m%d_%H%M%S}.jsonl.gz")
+            with gzip.open(path, 'wt', encoding='utf-8') as archive:
+                deleted = NotificationService.prune_read(older_than, options['batch_size'], archive=archive)
+            self.stdout.write(f"Archived {deleted} notifications to {path}")
+        else:
+            deleted = NotificationService.prune_read(older_than, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} read notifications older than {options['days']} days."))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crm.pdf_cache import PdfCacheService
+
+class Command(BaseCommand):
+    help = 'Bounds the rendered PDF cache (MEDIA_ROOT/pdf_cache) by evicting the least recently used files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-mb', type=int, default=settings.PDF_CACHE_MAX_MB,
+                            help='Largest total size the cache may keep')
+        parser.add_argument('--max-age-days', type=int, default=None,
+                            help='Also delete files not downloaded for this many days')
+
+    def handle(self, *args, **options):
+        max_age = options['max_age_days'] * 86400 if options['max_age_days'] is not None else None
+        deleted, freed, kept = PdfCacheService.prune(options['max_mb'] * 1024 * 1024, max_age)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} cached PDFs ({freed / 1048576:.1f} MB); {kept / 1048576:.1f} MB remain."
+        ))
@@ -0,0 +1,45 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from crm.services import ExportJobService
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Long-running worker that produces queued background exports (ExportJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-seconds', type=float, default=2,
+                            help='How often to look for new jobs when idle')
+        parser.add_argument('--once', action='store_true',
+                            help='Run every queued job, then exit')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        while not stop.is_set():
+            close_old_connections()
+            job = ExportJobService.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                stop.wait(options['poll_seconds'])
+                continue
+
+            self.stdout.write(f"Export #{job.pk}: {job.kind} as {job.format} for {job.requested_by}")
+            try:
+                outcome = ExportJobService.run(job)
+            except Exception:
+                logger.exception("Export #%s failed", job.pk)
+                continue
+            if outcome is None:
+                self.stdout.write(f"Export #{job.pk} was cancelled or reassigned.")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Export #{job.pk} finished ({job.processed_rows} rows)."))
+
+        self.stdout.write("Export worker stopped.")
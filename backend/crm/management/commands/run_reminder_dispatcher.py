@@ -0,0 +1,67 @@
+import logging
+import signal
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from crm.reminder_dispatch import ReminderDispatcher
+from crm.scheduler import advisory_lock
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Long-running dispatcher that notifies users when their follow-up reminders fall due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-minutes', type=int, default=60,
+                            help='How far ahead reminders are kept in memory')
+        parser.add_argument('--refresh-seconds', type=float, default=5,
+                            help='How often new and edited reminders are picked up')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Reminders claimed and notified per transaction')
+        parser.add_argument('--standby-seconds', type=float, default=30,
+                            help='How often a standby dispatcher retries the lock')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        while not stop.is_set():
+            try:
+                with advisory_lock('reminder_dispatcher') as acquired:
+                    if not acquired:
+                        self.stdout.write("Another dispatcher is active; standing by.")
+                        stop.wait(options['standby_seconds'])
+                        continue
+                    self.dispatch_forever(stop, options)
+            except Exception:
+                logger.exception("Reminder dispatcher failed; restarting")
+                connection.close()
+                stop.wait(options['standby_seconds'])
+
+        self.stdout.write("Reminder dispatcher stopped.")
+
+    def dispatch_forever(self, stop, options):
+        dispatcher = ReminderDispatcher(
+            horizon=timedelta(minutes=options['horizon_minutes']),
+            batch_size=options['batch_size'],
+        )
+        loaded = dispatcher.load()
+        self.stdout.write(f"Dispatcher active with {loaded} reminders due in the next {options['horizon_minutes']} minutes.")
+
+        while not stop.is_set():
+            dispatcher.refresh()
+            dispatcher.advance_horizon()
+            sent = dispatcher.fire_due()
+            if sent:
+                self.stdout.write(f"Sent {sent} reminder notifications.")
+
+            # Sleep until the next refresh, or earlier if a reminder falls due before it
+            timeout = options['refresh_seconds']
+            next_due = dispatcher.next_due()
+            if next_due is not None:
+                timeout = min(timeout, max((next_due - timezone.now()).total_seconds(), 0))
+            stop.wait(timeout)
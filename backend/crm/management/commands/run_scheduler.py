@@ -0,0 +1,92 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from crm.scheduler import SchedulerService, get_jobs
+
+class Command(BaseCommand):
+    help = 'Runs the registered periodic jobs (crm/jobs.py) on their cron schedules. Safe to run in several containers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs due in the current minute, then exit')
+        parser.add_argument('--run', metavar='JOB',
+                            help='Run one job immediately, ignoring its schedule, then exit')
+        parser.add_argument('--list', action='store_true',
+                            help='List registered jobs and their last run')
+        parser.add_argument('--max-workers', type=int, default=4,
+                            help='Jobs allowed to run at the same time in this process')
+
+    def handle(self, *args, **options):
+        jobs = get_jobs()
+
+        if options['list']:
+            for entry in SchedulerService.job_status(jobs):
+                last = entry['last_run']
+                last_text = f"{last['status']} at {last['started_at']} ({last['duration_ms']} ms)" if last else 'never run'
+                self.stdout.write(f"{entry['name']:<22} {entry['schedule']:<14} next {entry['next_run']}  last {last_text}")
+            return
+
+        if options['run']:
+            job = jobs.get(options['run'])
+            if job is None:
+                raise CommandError(f"Unknown job {options['run']!r}. Known jobs: {', '.join(sorted(jobs))}")
+            # Manual runs get their own slot (to the second) so they never collide with a scheduled one
+            run = SchedulerService.run_job(job, timezone.now().replace(microsecond=0))
+            self.report(job, run)
+            return
+
+        if options['once']:
+            slot = SchedulerService.current_slot()
+            for job in jobs.values():
+                if job.is_due(slot):
+                    self.report(job, SchedulerService.run_job(job, slot))
+            return
+
+        self.loop(jobs, options['max_workers'])
+
+    def loop(self, jobs, max_workers):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        self.stdout.write(f"Scheduler started with {len(jobs)} jobs: {', '.join(sorted(jobs))}")
+        running = {}
+        last_slot = None
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scheduler') as executor:
+            while not stop.is_set():
+                slot = SchedulerService.current_slot()
+                if slot != last_slot:
+                    last_slot = slot
+                    for job in jobs.values():
+                        if not job.is_due(slot):
+                            continue
+                        if job.name in running and not running[job.name].done():
+                            self.stdout.write(f"{job.name}: previous run still in progress, skipping {slot:%H:%M}")
+                            continue
+                        running[job.name] = executor.submit(self.run_in_thread, job, slot)
+
+                # Wake shortly after the next minute boundary
+                stop.wait(60.5 - time.time() % 60)
+
+            self.stdout.write("Scheduler stopping; waiting for running jobs...")
+
+    def run_in_thread(self, job, slot):
+        close_old_connections()
+        try:
+            self.report(job, SchedulerService.run_job(job, slot))
+        finally:
+            connection.close()
+
+    def report(self, job, run):
+        if run is None:
+            self.stdout.write(f"{job.name}: skipped (slot already claimed or job still running elsewhere)")
+        elif run.status == run.Status.SUCCESS:
+            self.stdout.write(self.style.SUCCESS(f"{job.name}: finished in {run.duration_ms} ms"))
+        else:
+            self.stdout.write(self.style.ERROR(f"{job.name}: failed after {run.duration_ms} ms"))
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from crm.services import ReceivablesService
+
+class Command(BaseCommand):
+    help = ('Marks invoices past their due date OVERDUE and quotations past valid_until '
+            '(or QUOTATION_DEFAULT_VALIDITY_DAYS without one) EXPIRED')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, default=None,
+                            help='Treat this day (YYYY-MM-DD) as today')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+
+        counts = ReceivablesService.sweep(today)
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['invoices_overdue']} invoices marked overdue, "
+            f"{counts['invoices_reopened']} reopened, "
+            f"{counts['quotations_expired']} quotations expired."
+        ))
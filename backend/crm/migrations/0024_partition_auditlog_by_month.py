@@ -0,0 +1,153 @@
+from datetime import date, timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(d, months):
+    month_index = d.year * 12 + (d.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _month_range(start, end):
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        yield current
+        current = _add_months(current, 1)
+
+
+def _capture_definitions(cursor, table):
+    """Index and FK definitions so they can be recreated under the same names."""
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+        [table, f'{table}_pkey'],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+    return indexes, foreign_keys
+
+
+def _restore_definitions(cursor, table, indexes, foreign_keys):
+    for name, definition in indexes:
+        # Strip "ON public.crm_auditlog" / "ON ONLY ..." variations down to the column list
+        columns = definition[definition.index('USING'):]
+        cursor.execute(f'CREATE INDEX "{name}" ON {table} {columns}')
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition_auditlog(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        indexes, foreign_keys = _capture_definitions(cursor, 'crm_auditlog')
+
+        cursor.execute("ALTER TABLE crm_auditlog RENAME TO crm_auditlog_unpartitioned")
+        cursor.execute("CREATE SEQUENCE crm_auditlog_pk_seq AS bigint")
+        cursor.execute(
+            """
+            CREATE TABLE crm_auditlog (
+                id bigint NOT NULL DEFAULT nextval('crm_auditlog_pk_seq'),
+                action varchar(100) NOT NULL,
+                from_stage varchar(30) NULL,
+                to_stage varchar(30) NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                notes text NOT NULL,
+                actor_id bigint NULL,
+                lead_id bigint NOT NULL,
+                PRIMARY KEY (id, "timestamp")
+            ) PARTITION BY RANGE ("timestamp")
+            """
+        )
+        cursor.execute("ALTER SEQUENCE crm_auditlog_pk_seq OWNED BY crm_auditlog.id")
+        cursor.execute("CREATE TABLE crm_auditlog_default PARTITION OF crm_auditlog DEFAULT")
+
+        cursor.execute('SELECT MIN("timestamp") FROM crm_auditlog_unpartitioned')
+        first = cursor.fetchone()[0]
+        # Partition bounds are whole UTC months (the connection runs in UTC)
+        today = timezone.now().date()
+        first_month = first.astimezone(dt_timezone.utc).date() if first else today
+        for month_start in _month_range(first_month, _add_months(today, MONTHS_AHEAD)):
+            month_end = _add_months(month_start, 1)
+            cursor.execute(
+                f"CREATE TABLE crm_auditlog_y{month_start.year}m{month_start.month:02d} "
+                f"PARTITION OF crm_auditlog FOR VALUES FROM (%s) TO (%s)",
+                [month_start.isoformat(), month_end.isoformat()],
+            )
+
+        cursor.execute(
+            """
+            INSERT INTO crm_auditlog (id, action, from_stage, to_stage, "timestamp", notes, actor_id, lead_id)
+            SELECT id, action, from_stage, to_stage, "timestamp", notes, actor_id, lead_id
+            FROM crm_auditlog_unpartitioned
+            """
+        )
+        cursor.execute(
+            "SELECT setval('crm_auditlog_pk_seq', COALESCE((SELECT MAX(id) FROM crm_auditlog), 0) + 1, false)"
+        )
+        cursor.execute("DROP TABLE crm_auditlog_unpartitioned")
+
+        _restore_definitions(cursor, 'crm_auditlog', indexes, foreign_keys)
+
+
+def unpartition_auditlog(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        indexes, foreign_keys = _capture_definitions(cursor, 'crm_auditlog')
+
+        cursor.execute("ALTER TABLE crm_auditlog RENAME TO crm_auditlog_partitioned")
+        cursor.execute(
+            """
+            CREATE TABLE crm_auditlog (
+                id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                action varchar(100) NOT NULL,
+                from_stage varchar(30) NULL,
+                to_stage varchar(30) NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                notes text NOT NULL,
+                actor_id bigint NULL,
+                lead_id bigint NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO crm_auditlog (id, action, from_stage, to_stage, "timestamp", notes, actor_id, lead_id)
+            SELECT id, action, from_stage, to_stage, "timestamp", notes, actor_id, lead_id
+            FROM crm_auditlog_partitioned
+            """
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('crm_auditlog', 'id'), "
+            "COALESCE((SELECT MAX(id) FROM crm_auditlog), 0) + 1, false)"
+        )
+        cursor.execute("DROP TABLE crm_auditlog_partitioned CASCADE")
+
+        _restore_definitions(cursor, 'crm_auditlog', indexes, foreign_keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0023_auditlog_action_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_auditlog, reverse_code=unpartition_auditlog),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+
+# Pushes every new notification, and the recipient's fresh unread count after
+# reads/deletes, onto the crm_notifications channel. crm.realtime listens on
+# it and fans events out to connected SSE clients.
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION crm_notification_notify_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('crm_notifications', json_build_object(
+        'event', 'notification',
+        'recipient_id', NEW.recipient_id,
+        'unread_count', (
+            SELECT COUNT(*) FROM crm_notification
+            WHERE recipient_id = NEW.recipient_id AND is_read = false
+        ),
+        'notification', json_build_object(
+            'id', NEW.id,
+            'message', left(NEW.message, 1000),
+            'is_read', NEW.is_read,
+            'created_at', NEW.created_at,
+            'lead', NEW.lead_id,
+            'task', NEW.task_id,
+            'sender', NEW.sender_id
+        )
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION crm_notification_notify_count() RETURNS trigger AS $$
+DECLARE
+    changed RECORD;
+BEGIN
+    FOR changed IN SELECT DISTINCT recipient_id FROM changed_rows LOOP
+        PERFORM pg_notify('crm_notifications', json_build_object(
+            'event', 'unread_count',
+            'recipient_id', changed.recipient_id,
+            'unread_count', (
+                SELECT COUNT(*) FROM crm_notification
+                WHERE recipient_id = changed.recipient_id AND is_read = false
+            )
+        )::text);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_notification_after_insert
+    AFTER INSERT ON crm_notification
+    FOR EACH ROW EXECUTE FUNCTION crm_notification_notify_insert();
+
+CREATE TRIGGER crm_notification_after_update
+    AFTER UPDATE ON crm_notification
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_notification_notify_count();
+
+CREATE TRIGGER crm_notification_after_delete
+    AFTER DELETE ON crm_notification
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_notification_notify_count();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS crm_notification_after_insert ON crm_notification;
+DROP TRIGGER IF EXISTS crm_notification_after_update ON crm_notification;
+DROP TRIGGER IF EXISTS crm_notification_after_delete ON crm_notification;
+DROP FUNCTION IF EXISTS crm_notification_notify_insert();
+DROP FUNCTION IF EXISTS crm_notification_notify_count();
+"""
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGERS)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGERS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0024_partition_auditlog_by_month'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, reverse_code=drop_triggers),
+    ]
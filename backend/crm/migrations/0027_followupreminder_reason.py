@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:50
+
+from django.db import migrations, models
+
+
+# Reasons were previously only recoverable from the generated message text
+MESSAGE_PREFIXES = [
+    ('Stale Lead', 'STALE_LEAD'),
+    ('New Lead', 'NEW_UNTOUCHED'),
+    ('Stagnant Lead', 'STAGNANT'),
+]
+
+
+def backfill_reasons(apps, schema_editor):
+    FollowUpReminder = apps.get_model('crm', 'FollowUpReminder')
+    for prefix, reason in MESSAGE_PREFIXES:
+        FollowUpReminder.objects.filter(reminder_type='AUTO', message__startswith=prefix).update(reason=reason)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0026_notification_recipient_is_read_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='followupreminder',
+            name='reason',
+            field=models.CharField(blank=True, choices=[('STALE_LEAD', 'Stale lead'), ('NEW_UNTOUCHED', 'New lead not contacted'), ('STAGNANT', 'Stagnant lead')], default='', help_text='Rule that generated an AUTO reminder', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='followupreminder',
+            index=models.Index(fields=['lead', 'status', 'reason'], name='crm_followu_lead_id_a44e2c_idx'),
+        ),
+        migrations.RunPython(backfill_reasons, reverse_code=migrations.RunPython.noop),
+    ]
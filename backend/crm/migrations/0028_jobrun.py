@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0027_followupreminder_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_name', models.CharField(max_length=100)),
+                ('scheduled_for', models.DateTimeField(help_text='Schedule slot (minute) this run belongs to')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('output', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('host', models.CharField(blank=True, default='', max_length=255)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job_name', 'started_at'], name='crm_jobrun_job_nam_be96b7_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job_name', 'scheduled_for'), name='unique_job_run_per_slot')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:53
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_past_reminders_notified(apps, schema_editor):
+    # Reminders already past due were seen on the reminders page; don't flood users with them
+    FollowUpReminder = apps.get_model('crm', 'FollowUpReminder')
+    FollowUpReminder.objects.filter(due_date__lte=timezone.now()).update(notified_at=F('due_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0028_jobrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='followupreminder',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, help_text='When the due-time notification was sent', null=True),
+        ),
+        migrations.AddField(
+            model_name='followupreminder',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(mark_past_reminders_notified, reverse_code=migrations.RunPython.noop),
+    ]
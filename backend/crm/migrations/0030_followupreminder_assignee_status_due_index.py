@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0029_followupreminder_dispatch_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followupreminder',
+            index=models.Index(fields=['assigned_to', 'status', 'due_date'], name='crm_followu_assigne_d584e1_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0030_followupreminder_assignee_status_due_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='techpipeline',
+            index=models.Index(fields=['stage', 'updated_at', 'id'], name='crm_techpip_stage_838e1a_idx'),
+        ),
+    ]
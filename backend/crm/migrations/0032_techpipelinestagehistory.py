@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_current_stage(apps, schema_editor):
+    # Only the current stage is known; PLANNING is the initial stage, so it started at
+    # creation, while any later stage is dated from the last update.
+    TechPipeline = apps.get_model('crm', 'TechPipeline')
+    TechPipelineStageHistory = apps.get_model('crm', 'TechPipelineStageHistory')
+    rows = TechPipeline.objects.values_list('id', 'stage', 'lead__assigned_to_id', 'created_at', 'updated_at')
+    TechPipelineStageHistory.objects.bulk_create([
+        TechPipelineStageHistory(
+            pipeline_id=pipeline_id,
+            stage=stage,
+            assignee_id=assignee_id,
+            entered_at=created_at if stage == 'PLANNING' else updated_at,
+        )
+        for pipeline_id, stage, assignee_id, created_at, updated_at in rows.iterator(chunk_size=2000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0031_techpipeline_stage_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TechPipelineStageHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('PLANNING', 'Planning'), ('DESIGNING', 'Designing'), ('EXECUTING', 'Executing'), ('REVIEW', 'Review'), ('TESTING', 'Testing')], max_length=20)),
+                ('entered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('exited_at', models.DateTimeField(blank=True, null=True)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tech_stage_history', to=settings.AUTH_USER_MODEL)),
+                ('pipeline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_history', to='crm.techpipeline')),
+            ],
+            options={
+                'ordering': ['entered_at'],
+                'indexes': [models.Index(fields=['stage', 'entered_at'], name='crm_techpip_stage_a56bce_idx'), models.Index(fields=['pipeline', 'exited_at'], name='crm_techpip_pipelin_09d4a8_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_current_stage, reverse_code=migrations.RunPython.noop),
+    ]
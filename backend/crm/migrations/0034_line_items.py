@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:03
+
+import re
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+PERIODIC_QUANTITIES = ('Per Month', 'Per Year')
+LEADING_NUMBER = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value or 0))
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def _multiplier(quantity):
+    label = str(quantity if quantity is not None else '').strip()
+    if label in PERIODIC_QUANTITIES:
+        return Decimal('1')
+    match = LEADING_NUMBER.match(label)
+    return Decimal(match.group(1)) if match else Decimal('0')
+
+
+def backfill_line_items(apps, schema_editor):
+    # Issued documents keep their stored totals; only the child rows are derived
+    for parent_name, item_name, fk in [('Invoice', 'InvoiceItem', 'invoice_id'), ('Quotation', 'QuotationItem', 'quotation_id')]:
+        Parent = apps.get_model('crm', parent_name)
+        Item = apps.get_model('crm', item_name)
+        batch = []
+        for parent_id, items in Parent.objects.values_list('id', 'items').iterator(chunk_size=500):
+            for position, item in enumerate(items if isinstance(items, list) else []):
+                if not isinstance(item, dict):
+                    continue
+                price = _decimal(item.get('price'))
+                quantity = _multiplier(item.get('quantity', 1))
+                subtotal = _decimal(item['subtotal']) if item.get('subtotal') not in (None, '') else price * quantity
+                batch.append(Item(**{
+                    fk: parent_id,
+                    'position': position,
+                    'name': str(item.get('name') or '')[:255],
+                    'price': price,
+                    'quantity_label': str(item.get('quantity', ''))[:50],
+                    'quantity': quantity,
+                    'subtotal': subtotal,
+                }))
+            if len(batch) >= 1000:
+                Item.objects.bulk_create(batch)
+                batch = []
+        Item.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0033_documentsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('quantity_label', models.CharField(blank=True, max_length=50)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Numeric multiplier applied to price', max_digits=12)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                'ordering': ['position'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='QuotationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('quantity_label', models.CharField(blank=True, max_length=50)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Numeric multiplier applied to price', max_digits=12)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                'ordering': ['position'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['issued_date'], name='crm_invoice_issued__143343_idx'),
+        ),
+        migrations.AddField(
+            model_name='invoiceitem',
+            name='invoice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='crm.invoice'),
+        ),
+        migrations.AddField(
+            model_name='quotationitem',
+            name='quotation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='crm.quotation'),
+        ),
+        migrations.AddIndex(
+            model_name='invoiceitem',
+            index=models.Index(fields=['name'], name='crm_invoice_name_eecc2e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotationitem',
+            index=models.Index(fields=['name'], name='crm_quotati_name_1a460f_idx'),
+        ),
+        migrations.RunPython(backfill_line_items, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0036_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='perm_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
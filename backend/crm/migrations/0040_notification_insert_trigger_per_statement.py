@@ -0,0 +1,97 @@
+from django.db import migrations
+
+
+# Replaces the FOR EACH ROW insert trigger from 0025, which ran an unread
+# COUNT(*) for every inserted row (a bulk_create of N notifications for one
+# user counted N times). Each new row is still pushed as a 'notification'
+# event, and the count is sent once per recipient per statement.
+CREATE_INSERT_TRIGGER = """
+DROP TRIGGER IF EXISTS crm_notification_after_insert ON crm_notification;
+
+CREATE OR REPLACE FUNCTION crm_notification_notify_insert() RETURNS trigger AS $$
+DECLARE
+    added RECORD;
+BEGIN
+    FOR added IN SELECT * FROM new_rows ORDER BY id LOOP
+        PERFORM pg_notify('crm_notifications', json_build_object(
+            'event', 'notification',
+            'recipient_id', added.recipient_id,
+            'notification', json_build_object(
+                'id', added.id,
+                'message', left(added.message, 1000),
+                'is_read', added.is_read,
+                'created_at', added.created_at,
+                'lead', added.lead_id,
+                'task', added.task_id,
+                'sender', added.sender_id
+            )
+        )::text);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same-event triggers fire in name order: the rows go out before their count
+CREATE TRIGGER crm_notification_after_insert
+    AFTER INSERT ON crm_notification
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_notification_notify_insert();
+
+CREATE TRIGGER crm_notification_after_insert_count
+    AFTER INSERT ON crm_notification
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_notification_notify_count();
+"""
+
+RESTORE_ROW_TRIGGER = """
+DROP TRIGGER IF EXISTS crm_notification_after_insert_count ON crm_notification;
+DROP TRIGGER IF EXISTS crm_notification_after_insert ON crm_notification;
+
+CREATE OR REPLACE FUNCTION crm_notification_notify_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('crm_notifications', json_build_object(
+        'event', 'notification',
+        'recipient_id', NEW.recipient_id,
+        'unread_count', (
+            SELECT COUNT(*) FROM crm_notification
+            WHERE recipient_id = NEW.recipient_id AND is_read = false
+        ),
+        'notification', json_build_object(
+            'id', NEW.id,
+            'message', left(NEW.message, 1000),
+            'is_read', NEW.is_read,
+            'created_at', NEW.created_at,
+            'lead', NEW.lead_id,
+            'task', NEW.task_id,
+            'sender', NEW.sender_id
+        )
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crm_notification_after_insert
+    AFTER INSERT ON crm_notification
+    FOR EACH ROW EXECUTE FUNCTION crm_notification_notify_insert();
+"""
+
+
+def per_statement(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INSERT_TRIGGER)
+
+
+def per_row(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(RESTORE_ROW_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0039_document_blobs_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.RunPython(per_statement, reverse_code=per_row),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
@@ -25,12 +27,59 @@ class User(AbstractUser):
     can_delete_leads = models.BooleanField(default=False)
     can_export_leads = models.BooleanField(default=False)
     
+    # Bumped whenever anything feeding the compiled permission set changes (rbac/engine.py)
+    perm_version = models.PositiveIntegerField(default=0, editable=False)
+
     # Revenue tracking
     revenue_threshold = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, help_text=_('Monthly revenue target for incentive calculation'))
 
     def __str__(self):
         return f"{self.username} ({self.team})"
 
+    def save(self, *args, **kwargs):
+        # perm_version only moves through F('perm_version') + 1 updates (rbac.engine.bump_perm_version).
+        # Writing back the value loaded with this instance could undo a concurrent bump and reuse a version.
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [field.name for field in self._meta.concrete_fields
+                                 if not field.primary_key and field.attname not in deferred]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'perm_version']
+        super().save(*args, **kwargs)
+
+class ClaimsUser(User):
+    """
+    The authenticated user as rebuilt from access token claims by
+    ClaimsJWTAuthentication, without a database query. Only the claimed
+    columns are loaded; touching any other field loads all the remaining
+    ones in a single query. It compares equal to, and filters like, the
+    real User, but is read-only: fetch the User to modify it.
+    """
+    # Columns carried in the token (rbac/tokens.py) plus the ones ClaimsJWTAuthentication checks
+    CLAIM_FIELDS = ('username', 'team', 'is_superuser', 'is_manager', 'is_staff')
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, claims, is_active, perm_version):
+        data = {'id': user_id, **{field: claims[field] for field in cls.CLAIM_FIELDS},
+                'is_active': is_active, 'perm_version': perm_version}
+        # from_db expects the values in the model's concrete field order, not ours
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in data]
+        return cls.from_db('default', field_names, [data[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            # Load every missing column at once rather than one query per attribute
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def save(self, *args, **kwargs):
+        raise TypeError("ClaimsUser is read-only; fetch the User to modify it")
+
 class LeadStage(models.TextChoices):
     NEW_INQUIRY = 'NEW_INQUIRY', _('New Inquiry')
     QUALIFICATION = 'QUALIFICATION', _('Qualification')
@@ -144,10 +193,28 @@ class Lead(models.Model):
         full_name = f"{self.first_name or ''} {self.last_name or ''}".strip()
         return f"{full_name or 'Unnamed Lead'} - {self.stage}"
 
+class DocumentBlob(models.Model):
+    """
+    A stored file's content, kept once per SHA-256 however many documents
+    reference it (see DocumentStorageService). Unreferenced blobs are pruned.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    # Relative to MEDIA_ROOT: blobs/<2 hex>/<2 hex>/<sha256><ext of the first upload>
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever an upload is deduplicated onto this blob; pruning spares recently used blobs
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
 class LeadDocument(models.Model):
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='documents')
     name = models.CharField(max_length=255, blank=True)
+    # Points at blob.path for documents stored through DocumentStorageService
     file_path = models.FileField(upload_to='lead_docs/')
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='documents')
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -162,6 +229,11 @@ class AuditLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['action', 'timestamp']),
+        ]
+
     def __str__(self):
         return f"{self.action} on {self.lead} by {self.actor}"
 
@@ -241,6 +313,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.message[:20]}"
@@ -255,18 +330,30 @@ class FollowUpReminder(models.Model):
         COMPLETED = 'COMPLETED', _('Completed')
         DISMISSED = 'DISMISSED', _('Dismissed')
 
+    class Reason(models.TextChoices):
+        STALE_LEAD = 'STALE_LEAD', _('Stale lead')
+        NEW_UNTOUCHED = 'NEW_UNTOUCHED', _('New lead not contacted')
+        STAGNANT = 'STAGNANT', _('Stagnant lead')
+
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='reminders')
     assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminders')
     reminder_type = models.CharField(max_length=10, choices=Type.choices, default=Type.AUTO)
+    reason = models.CharField(max_length=20, choices=Reason.choices, blank=True, default='', help_text=_('Rule that generated an AUTO reminder'))
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     due_date = models.DateTimeField()
     message = models.TextField()
     is_read = models.BooleanField(default=False, help_text=_('Whether the reminder has been read'))
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    notified_at = models.DateTimeField(null=True, blank=True, help_text=_('When the due-time notification was sent'))
 
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['lead', 'status', 'reason']),
+            models.Index(fields=['assigned_to', 'status', 'due_date']),
+        ]
 
     def __str__(self):
         return f"Reminder for {self.lead} (Due: {self.due_date})"
@@ -289,9 +376,33 @@ class TechPipeline(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['stage', 'updated_at', 'id']),
+        ]
+
     def __str__(self):
         return f"Tech Pipeline for {self.lead} - {self.stage}"
 
+class TechPipelineStageHistory(models.Model):
+    """One interval a pipeline spent in a stage; exited_at is null for the current stage."""
+    pipeline = models.ForeignKey(TechPipeline, on_delete=models.CASCADE, related_name='stage_history')
+    stage = models.CharField(max_length=20, choices=TechPipelineStage.choices)
+    # Lead owner when the stage was entered, so later reassignment doesn't rewrite history
+    assignee = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tech_stage_history')
+    entered_at = models.DateTimeField(default=timezone.now)
+    exited_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['entered_at']
+        indexes = [
+            models.Index(fields=['stage', 'entered_at']),
+            models.Index(fields=['pipeline', 'exited_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.pipeline_id} in {self.stage} from {self.entered_at}"
+
 class RevenueRecord(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revenue_records')
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE)
@@ -335,6 +446,10 @@ class Quotation(models.Model):
 
     class Meta:
         ordering = ['-issued_date', '-created_at']
+        indexes = [
+            # Expiry sweep: status = 'SENT' AND valid_until < today
+            models.Index(fields=['status', 'valid_until']),
+        ]
 
     def __str__(self):
         return f"{self.quotation_number} - {self.client_name}"
@@ -356,7 +471,7 @@ class Invoice(models.Model):
     
     status = models.CharField(
         max_length=20, 
-        choices=[('DRAFT', 'Draft'), ('ISSUED', 'Issued'), ('PAID', 'Paid'), ('CANCELLED', 'Cancelled')],
+        choices=[('DRAFT', 'Draft'), ('ISSUED', 'Issued'), ('OVERDUE', 'Overdue'), ('PAID', 'Paid'), ('CANCELLED', 'Cancelled')],
         default='ISSUED'
     )
     
@@ -366,6 +481,175 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ['-issued_date', '-created_at']
+        indexes = [
+            models.Index(fields=['issued_date']),
+            # Overdue sweep and AR aging: status IN (open) AND due_date < today
+            models.Index(fields=['status', 'due_date']),
+        ]
 
     def __str__(self):
         return f"{self.invoice_number} - {self.client_name}"
+
+class LineItem(models.Model):
+    """
+    Normalized copy of one entry of a document's `items` JSON, written by the
+    serializers (see LineItemService) so line items can be queried in SQL.
+    """
+    position = models.PositiveIntegerField()
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    # As entered: a number, or a billing period such as "Per Month"
+    quantity_label = models.CharField(max_length=50, blank=True)
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, help_text="Numeric multiplier applied to price")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        abstract = True
+        ordering = ['position']
+
+    def __str__(self):
+        return f"{self.name} x {self.quantity_label}"
+
+class InvoiceItem(LineItem):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='line_items')
+
+    class Meta(LineItem.Meta):
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
+class QuotationItem(LineItem):
+    quotation = models.ForeignKey(Quotation, on_delete=models.CASCADE, related_name='line_items')
+
+    class Meta(LineItem.Meta):
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
+class JobRun(models.Model):
+    """One execution of a periodic job started by the run_scheduler command."""
+    class Status(models.TextChoices):
+        RUNNING = 'RUNNING', _('Running')
+        SUCCESS = 'SUCCESS', _('Success')
+        FAILED = 'FAILED', _('Failed')
+
+    job_name = models.CharField(max_length=100)
+    scheduled_for = models.DateTimeField(help_text=_('Schedule slot (minute) this run belongs to'))
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    output = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    host = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+        constraints = [
+            # A slot is claimed by exactly one container, whoever inserts first
+            models.UniqueConstraint(fields=['job_name', 'scheduled_for'], name='unique_job_run_per_slot'),
+        ]
+        indexes = [
+            models.Index(fields=['job_name', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_name} @ {self.scheduled_for} ({self.status})"
+
+class DocumentSequence(models.Model):
+    """Per-prefix, per-year counter behind invoice and quotation numbers (see DocumentNumberService)."""
+    prefix = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'year'], name='unique_document_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.last_value}"
+
+class ExportJob(models.Model):
+    """A background export requested through the API and produced by the run_export_worker command."""
+    class Kind(models.TextChoices):
+        LEADS = 'leads', _('Leads')
+        REMINDERS = 'reminders', _('Reminders')
+        TASKS = 'tasks', _('Tasks')
+
+    class Format(models.TextChoices):
+        CSV = 'csv', _('CSV')
+        XLSX = 'xlsx', _('Excel')
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        SUCCESS = 'SUCCESS', _('Success')
+        FAILED = 'FAILED', _('Failed')
+        EXPIRED = 'EXPIRED', _('Expired')
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    format = models.CharField(max_length=10, choices=Format.choices, default=Format.XLSX)
+    # The list endpoint's query parameters (status, search, ordering, ...)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    # Relative to MEDIA_ROOT; only served through the authenticated download endpoint
+    file_path = models.CharField(max_length=255, blank=True, default='')
+    filename = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped with every progress update; a RUNNING job that stops beating was orphaned by a dead worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['requested_by', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} export #{self.pk} ({self.status})"
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable document upload. Chunks are appended in order to a
+    staging file under MEDIA_ROOT/uploads; when the last byte arrives the file
+    is hashed and stored as a DocumentBlob, and the LeadDocument is created.
+    """
+    class Status(models.TextChoices):
+        ACTIVE = 'ACTIVE', _('Active')
+        COMPLETE = 'COMPLETE', _('Complete')
+        FAILED = 'FAILED', _('Failed')
+
+    # Random, so a session's staging file and URL cannot be guessed
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='upload_sessions')
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Optional SHA-256 declared by the client, verified on completion
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    # Bytes received so far: the offset the next chunk must start at
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
+    document = models.ForeignKey(LeadDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.name} ({self.offset}/{self.size})"
@@ -0,0 +1,80 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    """Raised when BULK_ONBOARD_MAX_CONCURRENT batches are already being hashed."""
+
+
+def _init_hash_worker():
+    """Runs once in each hashing process: only settings are needed, not the app registry."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+
+class PasswordHashPool:
+    """
+    Per-process pool of PASSWORD_HASH_WORKERS processes for bulk onboarding.
+    Each PBKDF2 hash costs hundreds of milliseconds of CPU, so a batch hashed
+    in the request thread would take minutes and hold the GIL throughout.
+
+    The processes are started on first use and kept for later batches. At
+    most BULK_ONBOARD_MAX_CONCURRENT batches are hashed at once; beyond that
+    hash() raises HashingBusy rather than queueing more CPU-bound work.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process full of request threads can inherit held locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_hash_worker,
+                )
+            return self._executor
+
+    def _get_slots(self):
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(settings.BULK_ONBOARD_MAX_CONCURRENT)
+            return self._slots
+
+    def hash(self, passwords):
+        """Returns make_password() of each password, in order."""
+        from django.contrib.auth.hashers import make_password
+
+        passwords = list(passwords)
+        # Small batches are hashed inline, where handing them to the pool would cost more
+        if settings.PASSWORD_HASH_WORKERS < 2 or len(passwords) < settings.PASSWORD_HASH_POOL_MIN:
+            return [make_password(password) for password in passwords]
+
+        slots = self._get_slots()
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            chunksize = max(1, len(passwords) // (settings.PASSWORD_HASH_WORKERS * 4))
+            try:
+                return list(self._get_executor().map(make_password, passwords, chunksize=chunksize))
+            except BrokenProcessPool:
+                logger.warning("Password hashing pool was broken; starting a new one")
+                with self._lock:
+                    self._executor = None
+                return list(self._get_executor().map(make_password, passwords, chunksize=chunksize))
+        finally:
+            slots.release()
+
+
+password_hash_pool = PasswordHashPool()
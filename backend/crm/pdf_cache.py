@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import time
+
+from django.conf import settings
+
+from .pdf_rendering import PdfRenderer
+
+
+class PdfCacheService:
+    """
+    Content-addressed cache of rendered PDFs under MEDIA_ROOT/pdf_cache.
+
+    The key is a SHA-256 of everything that affects the output: the template
+    context and a fingerprint of the template, stylesheet and logo. Identical
+    inputs always map to the same file, so nothing ever needs invalidating;
+    a changed document simply gets a new key and the old file ages out via
+    prune_pdf_cache. The key doubles as the HTTP ETag.
+    """
+
+    @staticmethod
+    def cache_dir():
+        return os.path.join(settings.MEDIA_ROOT, 'pdf_cache')
+
+    @staticmethod
+    def cache_key(context):
+        payload = json.dumps(
+            {'assets': PdfRenderer.assets_fingerprint(), 'context': context},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def path_for(key):
+        # Sharded by the first two hex digits to keep directories small
+        return os.path.join(PdfCacheService.cache_dir(), key[:2], f"{key}.pdf")
+
+    @staticmethod
+    def get(key):
+        """Returns the cached file path or None. A hit refreshes the file's access time for LRU pruning."""
+        path = PdfCacheService.path_for(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        os.utime(path, (time.time(), stat.st_mtime))
+        return path
+
+    @staticmethod
+    def put(key, content):
+        path = PdfCacheService.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as tmp:
+            tmp.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def entries():
+        """Yields (path, size, last_access) for every cached PDF."""
+        for root, _, files in os.walk(PdfCacheService.cache_dir()):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    @staticmethod
+    def prune(max_bytes, max_age_seconds=None):
+        """
+        Deletes entries unused for longer than max_age_seconds, then the least
+        recently used ones until the cache fits in max_bytes.
+        Returns (files_deleted, bytes_freed, bytes_kept).
+        """
+        now = time.time()
+        entries = sorted(PdfCacheService.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        deleted = freed = 0
+
+        for path, size, last_access in entries:
+            expired = max_age_seconds is not None and now - last_access > max_age_seconds
+            if not expired and total <= max_bytes:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            freed += size
+            deleted += 1
+
+        return deleted, freed, total
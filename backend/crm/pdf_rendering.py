@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+import weasyprint
+from weasyprint.text.fonts import FontConfiguration
+from django.conf import settings
+from django.template.loader import get_template
+
+
+class PdfRenderer:
+    """
+    Renders the finance (invoice/quotation) template to PDF with its static
+    assets prepared once: the logo is read and base64-encoded once per
+    process, and the stylesheet is parsed once per renderer together with the
+    FontConfiguration it was parsed against, then reused for every render.
+
+    WeasyPrint objects are not safe to share between threads, so use
+    get_renderer(), which keeps one renderer per thread.
+    """
+
+    TEMPLATE = 'crm/invoice.html'
+    STATIC_DIR = os.path.join(settings.BASE_DIR, 'crm/static/crm')
+    STYLESHEET_PATH = os.path.join(STATIC_DIR, 'css/invoice.css')
+    LOGO_PATH = os.path.join(STATIC_DIR, 'img/clickai_logo.jpg')
+
+    def __init__(self):
+        self.template = get_template(self.TEMPLATE)
+        self.font_config = FontConfiguration()
+        self.stylesheet = weasyprint.CSS(string=self.stylesheet_source(), font_config=self.font_config)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def stylesheet_source():
+        with open(PdfRenderer.STYLESHEET_PATH, encoding='utf-8') as stylesheet:
+            return stylesheet.read()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def logo_data():
+        if not os.path.exists(PdfRenderer.LOGO_PATH):
+            return None
+        with open(PdfRenderer.LOGO_PATH, 'rb') as logo:
+            return base64.b64encode(logo.read()).decode('utf-8')
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def assets_fingerprint():
+        """Hash of the template source, stylesheet and logo; part of the PDF cache key."""
+        digest = hashlib.sha256()
+        digest.update(get_template(PdfRenderer.TEMPLATE).template.source.encode())
+        digest.update(PdfRenderer.stylesheet_source().encode())
+        digest.update((PdfRenderer.logo_data() or '').encode())
+        return digest.hexdigest()
+
+    def render(self, context):
+        """Returns PDF bytes for a context from invoice_views.finance_pdf_context()."""
+        html_string = self.template.render({**context, 'logo_data': self.logo_data()})
+        html = weasyprint.HTML(string=html_string, base_url=self.STATIC_DIR)
+        return html.write_pdf(stylesheets=[self.stylesheet], font_config=self.font_config)
+
+
+_local = threading.local()
+
+
+def get_renderer():
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = PdfRenderer()
+    return renderer
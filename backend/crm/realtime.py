@@ -0,0 +1,108 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationBroker:
+    """
+    Per-process fan-out of Postgres NOTIFY events to SSE subscribers.
+
+    One background thread holds a dedicated connection LISTENing on the
+    crm_notifications channel (fed by the triggers from migrations 0025 and 0040) and
+    hands each payload to the queues of that recipient's open streams, so
+    idle clients cost no queries at all.
+    """
+
+    CHANNEL = 'crm_notifications'
+    POLL_SECONDS = 5
+    RECONNECT_SECONDS = 3
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def is_supported(self):
+        return connections['default'].vendor == 'postgresql'
+
+    def subscribe(self, user_id):
+        events = queue.Queue(maxsize=self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(events)
+            self._ensure_listener()
+        return events
+
+    def unsubscribe(self, user_id, events):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(events)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, payload):
+        """Delivers a decoded NOTIFY payload to every stream of its recipient."""
+        with self._lock:
+            targets = list(self._subscribers.get(payload.get('recipient_id'), ()))
+        for events in targets:
+            try:
+                events.put_nowait(payload)
+            except queue.Full:
+                # A stalled client only loses events; it will resync its count on reconnect
+                logger.warning("Dropping notification event for slow SSE subscriber")
+
+    def _ensure_listener(self):
+        if not self.is_supported:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._listen_forever, name='notification-listener', daemon=True)
+            self._thread.start()
+
+    def _listen_forever(self):
+        while True:
+            wrapper = None
+            try:
+                # A private connection: LISTEN must not share the request threads' connections
+                wrapper = connections.create_connection('default')
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+
+                while True:
+                    if select.select([raw], [], [], self.POLL_SECONDS) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        notify = raw.notifies.pop(0)
+                        try:
+                            self.publish(json.loads(notify.payload))
+                        except ValueError:
+                            logger.warning("Ignoring malformed notification payload: %s", notify.payload)
+            except Exception:
+                logger.exception("Notification listener lost its connection; reconnecting")
+                time.sleep(self.RECONNECT_SECONDS)
+            finally:
+                if wrapper is not None:
+                    try:
+                        wrapper.close()
+                    except Exception:
+                        pass
+
+
+broker = NotificationBroker()
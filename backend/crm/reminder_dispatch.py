@@ -0,0 +1,156 @@
+import heapq
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderDispatcher:
+    """
+    Sends a "Reminder due" notification when a PENDING FollowUpReminder
+    reaches its due_date.
+
+    Reminders due within the next `horizon` are kept in a min-heap keyed on
+    due_date. The table is never rescanned: the horizon advances in slabs
+    (one due_date range query each), and edits are picked up by polling for
+    rows whose updated_at is past a high-water mark. Heap entries are
+    invalidated lazily: `scheduled` holds the live due_date of every queued
+    reminder, and a popped entry that doesn't match it is discarded.
+
+    Run exactly one dispatcher at a time (run_reminder_dispatcher holds an
+    advisory lock); the notified_at claim keeps a second one harmless anyway.
+    """
+
+    # Transactions may commit with an updated_at older than the mark; re-read this much
+    COMMIT_LAG = timedelta(seconds=30)
+
+    def __init__(self, horizon=timedelta(minutes=60), batch_size=500):
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.heap = []
+        self.scheduled = {}
+        self.horizon_end = None
+        self.high_water = None
+
+    def pending(self):
+        from .models import FollowUpReminder
+
+        return FollowUpReminder.objects.filter(
+            status=FollowUpReminder.Status.PENDING,
+            notified_at__isnull=True,
+        )
+
+    def schedule(self, reminder_id, due_date):
+        if self.scheduled.get(reminder_id) == due_date:
+            return
+        self.scheduled[reminder_id] = due_date
+        heapq.heappush(self.heap, (due_date, reminder_id))
+
+    def unschedule(self, reminder_id):
+        self.scheduled.pop(reminder_id, None)
+
+    def load(self, now=None):
+        """Initial load: everything pending up to the horizon, including overdue reminders."""
+        from .models import FollowUpReminder
+
+        now = now or timezone.now()
+        self.high_water = FollowUpReminder.objects.order_by('-updated_at').values_list('updated_at', flat=True).first() or now
+        self.horizon_end = now + self.horizon
+        rows = self.pending().filter(due_date__lt=self.horizon_end).values_list('id', 'due_date')
+        for reminder_id, due_date in rows.iterator(chunk_size=2000):
+            self.schedule(reminder_id, due_date)
+        return len(self.scheduled)
+
+    def advance_horizon(self, now=None):
+        """Loads the next slab once half of the current horizon has elapsed."""
+        now = now or timezone.now()
+        if now + self.horizon / 2 < self.horizon_end:
+            return 0
+        new_end = now + self.horizon
+        rows = self.pending().filter(due_date__gte=self.horizon_end, due_date__lt=new_end).values_list('id', 'due_date')
+        loaded = 0
+        for reminder_id, due_date in rows.iterator(chunk_size=2000):
+            self.schedule(reminder_id, due_date)
+            loaded += 1
+        self.horizon_end = new_end
+        return loaded
+
+    def refresh(self):
+        """Applies reminders created or edited since the high-water mark."""
+        from .models import FollowUpReminder
+
+        changed = FollowUpReminder.objects.filter(
+            updated_at__gte=self.high_water - self.COMMIT_LAG,
+        ).values_list('id', 'due_date', 'status', 'notified_at', 'updated_at')
+
+        count = 0
+        for reminder_id, due_date, status, notified_at, updated_at in changed.iterator(chunk_size=2000):
+            count += 1
+            if updated_at > self.high_water:
+                self.high_water = updated_at
+            if status == FollowUpReminder.Status.PENDING and notified_at is None and due_date < self.horizon_end:
+                self.schedule(reminder_id, due_date)
+            else:
+                # Completed, dismissed, already sent, or moved beyond the horizon (a later slab loads it)
+                self.unschedule(reminder_id)
+        return count
+
+    def next_due(self):
+        """due_date of the earliest live heap entry, or None."""
+        while self.heap:
+            due_date, reminder_id = self.heap[0]
+            if self.scheduled.get(reminder_id) == due_date:
+                return due_date
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now):
+        ids = []
+        while self.heap and self.heap[0][0] <= now and len(ids) < self.batch_size:
+            due_date, reminder_id = heapq.heappop(self.heap)
+            if self.scheduled.get(reminder_id) == due_date:
+                del self.scheduled[reminder_id]
+                ids.append(reminder_id)
+        return ids
+
+    def fire_due(self, now=None):
+        """Notifies every reminder that is due. Returns the number of notifications sent."""
+        now = now or timezone.now()
+        sent = 0
+        while True:
+            ids = self.pop_due(now)
+            if not ids:
+                return sent
+            sent += self.dispatch(ids, now)
+
+    def dispatch(self, ids, now):
+        """
+        Claims the reminders (notified_at) and bulk-inserts their notifications in
+        one transaction. Rows changed since they were queued are skipped; the
+        next refresh reschedules them if needed.
+        """
+        from .models import FollowUpReminder, Notification
+
+        with transaction.atomic():
+            claimed = list(
+                self.pending().select_for_update(skip_locked=True)
+                .filter(id__in=ids, due_date__lte=now)
+                .values_list('id', 'assigned_to_id', 'lead_id', 'message')
+            )
+            if not claimed:
+                return 0
+            # update() leaves updated_at alone, so the claim doesn't echo back through refresh()
+            FollowUpReminder.objects.filter(id__in=[row[0] for row in claimed]).update(notified_at=now)
+            Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=assigned_to_id,
+                    lead_id=lead_id,
+                    message=f"Reminder due: {message}",
+                    is_read=False,
+                )
+                for _, assigned_to_id, lead_id, message in claimed
+            ], batch_size=self.batch_size)
+        return len(claimed)
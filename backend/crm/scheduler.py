@@ -0,0 +1,222 @@
+import io
+import logging
+import socket
+import time
+import traceback
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class CronSchedule:
+    """
+    A standard 5-field cron expression: minute hour day-of-month month day-of-week.
+    Fields accept '*', numbers, ranges (1-5), lists (1,15) and steps (*/10, 0-30/5).
+    Day-of-week is 0-6 with 0 = Sunday (7 is accepted as Sunday too).
+    Times are evaluated in the project TIME_ZONE.
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELD_RANGES)
+        ]
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for item in field.split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start, end = (int(value) for value in item.split('-', 1))
+            else:
+                start = int(item)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        moment = timezone.localtime(moment)
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        # Cron semantics: when both day fields are restricted, either may match
+        day_match = moment.day in self.days
+        weekday_match = (moment.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment, limit_days=366):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        end = candidate + timedelta(days=limit_days)
+        while candidate < end:
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        return None
+
+    def __str__(self):
+        return self.expression
+
+
+class Job:
+    def __init__(self, name, schedule, func, description=''):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.func = func
+        self.description = description
+
+    def is_due(self, slot):
+        return self.schedule.matches(slot)
+
+
+_registry = {}
+
+
+def register(name, schedule, description=''):
+    """Decorator registering `func(stdout)` as a periodic job under `name`."""
+    def decorator(func):
+        _registry[name] = Job(name, schedule, func, description)
+        return func
+    return decorator
+
+
+def get_jobs():
+    # Jobs register themselves on import
+    from . import jobs  # noqa: F401
+    return dict(_registry)
+
+
+def lock_key(name):
+    """Stable signed 64-bit key for pg_try_advisory_lock, derived from the job name."""
+    key = zlib.crc32(f"crm.scheduler:{name}".encode())
+    return key - (1 << 32) if key >= (1 << 31) else key
+
+
+@contextmanager
+def advisory_lock(name):
+    """
+    Session-level Postgres advisory lock that is only held by one connection
+    across the cluster; yields False if another session already holds it.
+    Other databases have no advisory locks, so the lock always succeeds there.
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+
+    key = lock_key(name)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+class SchedulerService:
+    @staticmethod
+    def current_slot(now=None):
+        return (now or timezone.now()).replace(second=0, microsecond=0)
+
+    @staticmethod
+    def run_job(job, slot):
+        """
+        Runs `job` for the given slot unless another container already claimed
+        it or is still running the previous slot. Returns the JobRun, or None
+        when the run was skipped.
+        """
+        from .models import JobRun
+
+        with advisory_lock(job.name) as acquired:
+            if not acquired:
+                logger.info("Skipping %s: still running elsewhere", job.name)
+                return None
+
+            try:
+                with transaction.atomic():
+                    run = JobRun.objects.create(
+                        job_name=job.name,
+                        scheduled_for=slot,
+                        host=socket.gethostname(),
+                    )
+            except IntegrityError:
+                logger.info("Skipping %s: slot %s already ran", job.name, slot)
+                return None
+
+            output = io.StringIO()
+            started = time.monotonic()
+            try:
+                job.func(output)
+                run.status = JobRun.Status.SUCCESS
+            except Exception:
+                logger.exception("Scheduled job %s failed", job.name)
+                run.status = JobRun.Status.FAILED
+                run.error = traceback.format_exc()
+
+            run.finished_at = timezone.now()
+            run.duration_ms = int((time.monotonic() - started) * 1000)
+            run.output = output.getvalue()[-10000:]
+            run.save(update_fields=['status', 'error', 'finished_at', 'duration_ms', 'output'])
+            return run
+
+    @staticmethod
+    def job_status(jobs, now=None):
+        """Last run, last success and next slot for each registered job."""
+        from django.db.models import Max
+        from .models import JobRun
+
+        now = now or timezone.now()
+        names = list(jobs)
+        latest_ids = JobRun.objects.filter(job_name__in=names).values('job_name').annotate(latest=Max('id')).values('latest')
+        last_runs = {run.job_name: run for run in JobRun.objects.filter(id__in=latest_ids)}
+        last_success = dict(
+            JobRun.objects.filter(job_name__in=names, status=JobRun.Status.SUCCESS)
+            .values('job_name').annotate(at=Max('finished_at')).values_list('job_name', 'at')
+        )
+
+        data = []
+        for name, job in sorted(jobs.items()):
+            run = last_runs.get(name)
+            next_run = job.schedule.next_after(now)
+            data.append({
+                'name': name,
+                'schedule': str(job.schedule),
+                'description': job.description,
+                'next_run': next_run.isoformat() if next_run else None,
+                'last_success_at': last_success[name].isoformat() if last_success.get(name) else None,
+                'last_run': {
+                    'status': run.status,
+                    'scheduled_for': run.scheduled_for.isoformat(),
+                    'started_at': run.started_at.isoformat(),
+                    'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+                    'duration_ms': run.duration_ms,
+                    'host': run.host,
+                    'error': run.error.strip().splitlines()[-1] if run.error else '',
+                } if run else None,
+            })
+        return data
@@ -1,7 +1,49 @@
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
 from rest_framework import serializers
 from .models import Invoice, Quotation, User
+from .services import LineItemService
 
-class QuotationSerializer(serializers.ModelSerializer):
+class LineItemsSerializerMixin:
+    """
+    Validates the `items` JSON, recomputes subtotals and grand_total on the
+    server (any client-supplied totals are ignored) and keeps the normalized
+    line_items table in sync on every create/update.
+    """
+
+    def validate_items(self, items):
+        if not isinstance(items, list):
+            raise serializers.ValidationError("Items must be a list.")
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not str(item.get('name') or '').strip():
+                raise serializers.ValidationError(f"Item {index + 1} needs a name.")
+            try:
+                Decimal(str(item.get('price') or 0))
+            except InvalidOperation:
+                raise serializers.ValidationError(f"Item {index + 1} has an invalid price.")
+        return items
+
+    def apply_totals(self, validated_data):
+        if 'items' in validated_data:
+            items, _, grand_total = LineItemService.normalize(validated_data['items'])
+            validated_data['items'] = items
+            validated_data['grand_total'] = grand_total
+        return validated_data
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            document = super().create(self.apply_totals(validated_data))
+            LineItemService.sync(document)
+        return document
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            document = super().update(instance, self.apply_totals(validated_data))
+            if 'items' in validated_data:
+                LineItemService.sync(document)
+        return document
+
+class QuotationSerializer(LineItemsSerializerMixin, serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
 
     class Meta:
@@ -12,7 +54,7 @@ class QuotationSerializer(serializers.ModelSerializer):
             'issued_date', 'valid_until', 'status', 'created_by', 
             'created_by_username', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by', 'quotation_number']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by', 'quotation_number', 'grand_total']
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -20,7 +62,7 @@ class QuotationSerializer(serializers.ModelSerializer):
             validated_data['created_by'] = request.user
         return super().create(validated_data)
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(LineItemsSerializerMixin, serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
 
     class Meta:
@@ -31,7 +73,7 @@ class InvoiceSerializer(serializers.ModelSerializer):
             'issued_date', 'due_date', 'status', 'created_by', 
             'created_by_username', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by', 'invoice_number']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by', 'invoice_number', 'grand_total']
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -1,4 +1,10 @@
+import base64
+import json
+import re
+from decimal import Decimal
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rbac.engine import has_perm
 from .models import Lead, Team, AuditLog, LeadStage
 
 class TransitionService:
@@ -84,12 +90,12 @@ class TransitionService:
     def can_edit(user, lead):
         """
         Dynamic Permissions:
-        - Managers can always edit.
+        - Managers (leads.edit_all) can always edit.
         - Team members can only edit if the lead is in their team's stage.
         - The assigned user can always edit.
         - The lead generator can always edit.
         """
-        if getattr(user, 'is_manager', False) or user.is_superuser:
+        if has_perm(user, 'leads.edit_all'):
             return True
         
         # User is assigned to the lead
@@ -144,6 +150,7 @@ class StagnationService:
                     lead=lead,
                     assigned_to=user,
                     reminder_type=FollowUpReminder.Type.AUTO,
+                    reason=FollowUpReminder.Reason.STAGNANT,
                     status=FollowUpReminder.Status.PENDING,
                     due_date=timezone.now(),
                     message=f"Stagnant Lead: {lead.first_name or ''} {lead.last_name or ''} has been in {lead.get_stage_display()} since {lead.updated_at.strftime('%Y-%m-%d')}.".replace('  ', ' ')
@@ -151,6 +158,1350 @@ class StagnationService:
                 count += 1
         
         if reminders_to_create:
-            FollowUpReminder.objects.bulk_create(reminders_to_create)
+            ReminderService.bulk_create_with_notifications(reminders_to_create)
                 
         return count
+
+class ReminderService:
+    @staticmethod
+    def is_due(due_date, now=None):
+        """Whether a (not yet saved) due_date has passed; it may still be a date or a naive datetime."""
+        from datetime import date, datetime
+
+        now = now or timezone.now()
+        if isinstance(due_date, datetime):
+            if timezone.is_naive(due_date):
+                due_date = timezone.make_aware(due_date)
+            return due_date <= now
+        if isinstance(due_date, date):
+            return due_date <= timezone.localdate(now)
+        return False
+
+    @staticmethod
+    def bulk_create_with_notifications(reminders, batch_size=1000):
+        """
+        Inserts reminders and their "New Reminder" notifications in bulk.
+        bulk_create() skips the post_save signal that normally sends the
+        notification, so it is written here with the same message. Reminders
+        that are already due are marked notified, as the pre_save signal does
+        for single ones: the dispatcher must not send "Reminder due" as well.
+        """
+        from .models import FollowUpReminder, Notification
+
+        now = timezone.now()
+        for reminder in reminders:
+            if reminder.notified_at is None and ReminderService.is_due(reminder.due_date, now):
+                reminder.notified_at = now
+        FollowUpReminder.objects.bulk_create(reminders, batch_size=batch_size)
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=reminder.assigned_to_id,
+                lead_id=reminder.lead_id,
+                message=f"New Reminder: {reminder.message}",
+                is_read=False,
+            )
+            for reminder in reminders
+        ], batch_size=batch_size)
+        return len(reminders)
+
+class RevenueService:
+    HISTORY_MONTHS = 6
+    INCENTIVE_RATE = 0.10
+
+    @staticmethod
+    def month_window(today, months=HISTORY_MONTHS):
+        """
+        Calendar-correct (year, month) pairs for the last `months` months,
+        oldest first and ending with the month of `today`.
+        """
+        window = []
+        for offset in range(months - 1, -1, -1):
+            month_index = today.year * 12 + (today.month - 1) - offset
+            window.append((month_index // 12, month_index % 12 + 1))
+        return window
+
+    @staticmethod
+    def with_monthly_revenue(users, months):
+        """
+        Annotates `users` with one revenue_<i> sum per month in `months` so the
+        whole history for every user comes back from a single grouped query.
+        """
+        from decimal import Decimal
+        from django.db.models import Sum, Q, DecimalField, Value
+        from django.db.models.functions import Coalesce
+
+        annotations = {}
+        for index, (year, month) in enumerate(months):
+            annotations[f'revenue_{index}'] = Coalesce(
+                Sum('revenue_records__amount', filter=Q(revenue_records__year=year, revenue_records__month=month)),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        return users.annotate(**annotations)
+
+    @staticmethod
+    def summarize(user, months):
+        """Builds the revenue-stats payload for a user annotated by with_monthly_revenue()."""
+        from datetime import date
+
+        history = [
+            {
+                'month': date(year, month, 1).strftime('%b'),
+                'year': year,
+                'revenue': getattr(user, f'revenue_{index}'),
+            }
+            for index, (year, month) in enumerate(months)
+        ]
+        current_month_revenue = history[-1]['revenue']
+
+        threshold = float(user.revenue_threshold)
+        progress_percentage = (float(current_month_revenue) / threshold * 100) if threshold > 0 else 0
+        progress_percentage = min(max(progress_percentage, 0), 100)
+
+        # Incentive (10% if threshold met)
+        target_met = float(current_month_revenue) >= threshold
+        incentive_amount = float(current_month_revenue) * RevenueService.INCENTIVE_RATE if target_met else 0.00
+
+        return {
+            'user_id': user.id,
+            'username': user.username,
+            'current_month_revenue': current_month_revenue,
+            'threshold': threshold,
+            'progress_percentage': round(progress_percentage, 1),
+            'incentive_amount': round(incentive_amount, 2),
+            'target_met': target_met,
+            'monthly_history': history,
+        }
+
+class NotificationService:
+    # (message prefix of a burst, digest message that replaces it)
+    COALESCE_RULES = [
+        ('You have been assigned a new lead', 'You have been assigned {count} new leads'),
+        ('New Reminder:', 'You have {count} new reminders'),
+        ('New Task Assigned:', 'You have been assigned {count} new tasks'),
+    ]
+
+    @staticmethod
+    def coalesce_bursts(min_burst=5, settle_minutes=1, gap_seconds=60):
+        """
+        Replaces bursts of similar unread notifications (same recipient, sender
+        and kind, each within `gap_seconds` of the previous one) with a single
+        digest notification, e.g. the 40 "assigned a new lead" rows written by
+        one bulk_assign, however many minute boundaries they cross.
+        The newest row of a burst becomes the digest: it keeps its place in the
+        -created_at ordering, links the burst's lead or task when they all share
+        one, and, being an update rather than an insert, is not pushed to the
+        recipient again as a new notification.
+        Bursts whose newest row is younger than `settle_minutes` may still be
+        growing and are left alone. Returns the number of notifications removed.
+        """
+        from datetime import timedelta
+        from django.db import transaction
+        from .models import Notification
+
+        now = timezone.now()
+        settled_before = now - timedelta(minutes=settle_minutes)
+        gap = timedelta(seconds=gap_seconds)
+        removed = 0
+
+        for prefix, digest_message in NotificationService.COALESCE_RULES:
+            rows = Notification.objects.filter(
+                is_read=False,
+                message__startswith=prefix,
+                created_at__lte=now,
+            ).order_by('recipient_id', 'sender_id', 'created_at', 'id').values_list(
+                'id', 'recipient_id', 'sender_id', 'created_at'
+            )
+
+            for burst in NotificationService._bursts(rows.iterator(), gap):
+                if len(burst) < min_burst or burst[-1][3] >= settled_before:
+                    continue
+                with transaction.atomic():
+                    # Anything read since the scan is no longer part of the burst
+                    members = list(Notification.objects.select_for_update().filter(
+                        id__in=[row[0] for row in burst], is_read=False,
+                    ).order_by('created_at', 'id').values_list('id', 'lead_id', 'task_id'))
+                    if len(members) < min_burst:
+                        continue
+                    digest_id = members[-1][0]
+                    leads = {lead_id for _, lead_id, _ in members}
+                    tasks = {task_id for _, _, task_id in members}
+                    Notification.objects.filter(id=digest_id).update(
+                        message=digest_message.format(count=len(members)),
+                        lead_id=leads.pop() if len(leads) == 1 else None,
+                        task_id=tasks.pop() if len(tasks) == 1 else None,
+                    )
+                    Notification.objects.filter(id__in=[member[0] for member in members[:-1]]).delete()
+                removed += len(members) - 1
+
+        return removed
+
+    @staticmethod
+    def _bursts(rows, gap):
+        """Splits (id, recipient, sender, created_at) rows, ordered by recipient, sender and time, into bursts."""
+        burst = []
+        for row in rows:
+            if burst and (row[1:3] != burst[-1][1:3] or row[3] - burst[-1][3] > gap):
+                yield burst
+                burst = []
+            burst.append(row)
+        if burst:
+            yield burst
+
+    @staticmethod
+    def prune_read(older_than, batch_size=1000, archive=None):
+        """
+        Deletes read notifications created before `older_than` in batches of
+        `batch_size`, walking the primary key so each batch is a short index
+        range scan and a short transaction. When `archive` (a text file object)
+        is given, each row is written to it as a JSON line before deletion.
+        Returns the number of notifications deleted.
+        """
+        import json
+        from .models import Notification
+
+        stale = Notification.objects.filter(is_read=True, created_at__lt=older_than).order_by('id')
+        fields = ['id', 'recipient_id', 'sender_id', 'message', 'is_read', 'created_at', 'lead_id', 'task_id']
+        deleted = 0
+        last_id = 0
+
+        while True:
+            batch = list(stale.filter(id__gt=last_id).values(*fields)[:batch_size])
+            if not batch:
+                break
+            if archive is not None:
+                for row in batch:
+                    archive.write(json.dumps(row, default=str) + '\n')
+            ids = [row['id'] for row in batch]
+            Notification.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            last_id = ids[-1]
+
+        return deleted
+
+class TechPipelineBoardService:
+    """
+    Kanban view of tech pipelines: one column per TechPipelineStage, newest
+    update first, each column paged with a keyset cursor on (updated_at, id).
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    @staticmethod
+    def encode_cursor(pipeline):
+        raw = json.dumps([pipeline.updated_at.isoformat(), pipeline.id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Returns (updated_at, id); raises ValueError for a malformed cursor."""
+        try:
+            updated_at, pipeline_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError) as exc:
+            raise ValueError('Invalid cursor') from exc
+        parsed = parse_datetime(updated_at)
+        if parsed is None or not isinstance(pipeline_id, int):
+            raise ValueError('Invalid cursor')
+        return parsed, pipeline_id
+
+    @staticmethod
+    def _page(cards, limit):
+        cards = list(cards)
+        has_more = len(cards) > limit
+        cards = cards[:limit]
+        next_cursor = TechPipelineBoardService.encode_cursor(cards[-1]) if has_more else None
+        return cards, next_cursor
+
+    @staticmethod
+    def board(queryset, limit):
+        """
+        Returns {stage: (count, cards, next_cursor)} for every stage using two
+        queries: a grouped count and a windowed fetch of the first `limit`
+        cards per stage (leads joined in).
+        """
+        from django.db.models import Count, F, Window
+        from django.db.models.functions import RowNumber
+        from .models import TechPipelineStage
+
+        counts = dict(queryset.order_by().values_list('stage').annotate(total=Count('id')))
+
+        ranked = queryset.select_related('lead').annotate(
+            column_position=Window(
+                expression=RowNumber(),
+                partition_by=[F('stage')],
+                order_by=[F('updated_at').desc(), F('id').desc()],
+            )
+        ).filter(column_position__lte=limit + 1).order_by('stage', 'column_position')
+
+        by_stage = {}
+        for pipeline in ranked:
+            by_stage.setdefault(pipeline.stage, []).append(pipeline)
+
+        board = {}
+        for stage in TechPipelineStage.values:
+            cards, next_cursor = TechPipelineBoardService._page(by_stage.get(stage, []), limit)
+            board[stage] = (counts.get(stage, 0), cards, next_cursor)
+        return board
+
+    @staticmethod
+    def column(queryset, stage, limit, cursor=None):
+        """Next page of one column after `cursor`. Returns (count, cards, next_cursor)."""
+        from django.db.models import Q
+
+        column = queryset.filter(stage=stage)
+        page = column.select_related('lead').order_by('-updated_at', '-id')
+        if cursor:
+            updated_at, pipeline_id = TechPipelineBoardService.decode_cursor(cursor)
+            page = page.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pipeline_id))
+
+        cards, next_cursor = TechPipelineBoardService._page(page[:limit + 1], limit)
+        return column.count(), cards, next_cursor
+
+class TechPipelineAnalyticsService:
+    """Time spent per tech pipeline stage, computed from TechPipelineStageHistory in SQL."""
+
+    PERCENTILES = (0.5, 0.9)
+
+    @staticmethod
+    def stage_durations(since=None, group_by_assignee=False, include_open=True):
+        """
+        One grouped query returning, per stage (and assignee if requested), the
+        number of intervals plus average and percentile durations in hours.
+        Open intervals (the current stage) count up to now unless include_open
+        is False. Percentiles need PostgreSQL and are None elsewhere.
+        """
+        from django.db import connection
+        from django.db.models import Avg, Count, DateTimeField, DurationField, ExpressionWrapper, F, Q, Value
+        from django.db.models.functions import Coalesce
+        from .aggregates import DurationSeconds, PercentileCont
+        from .models import TechPipelineStageHistory
+
+        history = TechPipelineStageHistory.objects.all()
+        if since:
+            history = history.filter(entered_at__gte=since)
+        if not include_open:
+            history = history.filter(exited_at__isnull=False)
+
+        exited_at = Coalesce(F('exited_at'), Value(timezone.now(), output_field=DateTimeField()))
+        history = history.annotate(
+            seconds=DurationSeconds(ExpressionWrapper(exited_at - F('entered_at'), output_field=DurationField()))
+        )
+
+        group_fields = ['stage', 'assignee_id', 'assignee__username'] if group_by_assignee else ['stage']
+        aggregates = {
+            'intervals': Count('id'),
+            'open_intervals': Count('id', filter=Q(exited_at__isnull=True)),
+            'avg_seconds': Avg('seconds'),
+        }
+        with_percentiles = connection.vendor == 'postgresql'
+        if with_percentiles:
+            for percentile in TechPipelineAnalyticsService.PERCENTILES:
+                aggregates[f'p{int(percentile * 100)}_seconds'] = PercentileCont('seconds', percentile)
+
+        rows = history.values(*group_fields).annotate(**aggregates).order_by(*group_fields)
+
+        results = []
+        for row in rows:
+            entry = {'stage': row['stage'], 'intervals': row['intervals'], 'open_intervals': row['open_intervals']}
+            if group_by_assignee:
+                entry['assignee'] = row['assignee_id']
+                entry['assignee_name'] = row['assignee__username']
+            entry['avg_hours'] = TechPipelineAnalyticsService._hours(row['avg_seconds'])
+            for percentile in TechPipelineAnalyticsService.PERCENTILES:
+                key = f'p{int(percentile * 100)}'
+                entry[f'{key}_hours'] = TechPipelineAnalyticsService._hours(row.get(f'{key}_seconds')) if with_percentiles else None
+            results.append(entry)
+        return results
+
+    @staticmethod
+    def _hours(seconds):
+        return round(seconds / 3600, 2) if seconds is not None else None
+
+class DocumentNumberService:
+    """
+    Gap-free yearly document numbers such as INV-2026-000123.
+
+    A single upsert increments (or creates) the DocumentSequence row and
+    returns the new value, so there is no table scan and no retry loop. The
+    row stays locked until the caller's transaction ends: call this inside
+    the transaction that saves the document, so a rollback also gives the
+    number back and concurrent creators simply queue on the row.
+    """
+
+    INVOICE_PREFIX = 'INV'
+    QUOTATION_PREFIX = 'QUO'
+
+    @staticmethod
+    def next_value(prefix, year):
+        from django.db import connection
+        from .models import DocumentSequence
+
+        table = connection.ops.quote_name(DocumentSequence._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (prefix, year, last_value) VALUES (%s, %s, 1)
+                ON CONFLICT (prefix, year) DO UPDATE SET last_value = {table}.last_value + 1
+                RETURNING last_value
+                """,
+                [prefix, year],
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def next_number(prefix, year=None):
+        from django.db import transaction
+
+        if not transaction.get_connection().in_atomic_block:
+            raise RuntimeError('Document numbers must be allocated inside the transaction that saves the document')
+        year = year or timezone.localdate().year
+        return f"{prefix}-{year}-{DocumentNumberService.next_value(prefix, year):06d}"
+
+class LineItemService:
+    """
+    Keeps the normalized InvoiceItem/QuotationItem rows in step with a
+    document's `items` JSON and computes totals server-side.
+
+    Quantity follows the frontend rule: a billing period ("Per Month",
+    "Per Year") counts once, anything else counts as its leading number.
+    """
+
+    VAT_RATE = Decimal('0.05')
+    PERIODIC_QUANTITIES = ('Per Month', 'Per Year')
+    LEADING_NUMBER = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+    @staticmethod
+    def quantity_multiplier(quantity):
+        label = str(quantity if quantity is not None else '').strip()
+        if label in LineItemService.PERIODIC_QUANTITIES:
+            return Decimal('1')
+        match = LineItemService.LEADING_NUMBER.match(label)
+        return Decimal(match.group(1)) if match else Decimal('0')
+
+    @staticmethod
+    def normalize(items):
+        """
+        Returns (items, subtotal, grand_total): the items with server-computed
+        subtotals, their sum, and the VAT-inclusive grand total.
+        """
+        cents = Decimal('0.01')
+        normalized = []
+        subtotal = Decimal('0')
+        for item in items:
+            price = Decimal(str(item.get('price') or 0)).quantize(cents)
+            quantity = item.get('quantity', 1)
+            line_total = (price * LineItemService.quantity_multiplier(quantity)).quantize(cents)
+            subtotal += line_total
+            normalized.append({**item, 'price': float(price), 'quantity': quantity, 'subtotal': float(line_total)})
+        grand_total = (subtotal * (1 + LineItemService.VAT_RATE)).quantize(cents)
+        return normalized, subtotal, grand_total
+
+    @staticmethod
+    def sync(document):
+        """Replaces the document's line_items rows with its current `items`."""
+        item_model = document.line_items.model
+        parent_field = document.line_items.field.name
+        document.line_items.all().delete()
+        item_model.objects.bulk_create([
+            item_model(
+                position=position,
+                name=str(item.get('name') or '')[:255],
+                price=Decimal(str(item.get('price') or 0)),
+                quantity_label=str(item.get('quantity', ''))[:50],
+                quantity=LineItemService.quantity_multiplier(item.get('quantity', 1)),
+                subtotal=Decimal(str(item.get('subtotal') or 0)),
+                **{parent_field: document},
+            )
+            for position, item in enumerate(document.items or [])
+        ])
+
+    @staticmethod
+    def revenue_by_item(item_model, period='month', date_from=None, date_to=None, statuses=None):
+        """
+        Revenue (pre-VAT line subtotals), quantity and document count per item
+        name and period, as one GROUP BY over the line item table.
+        """
+        from django.db.models import Count, Sum
+        from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+
+        truncate = {'month': TruncMonth, 'quarter': TruncQuarter, 'year': TruncYear}[period]
+        parent = 'invoice' if item_model._meta.model_name == 'invoiceitem' else 'quotation'
+
+        rows = item_model.objects.all()
+        if date_from:
+            rows = rows.filter(**{f'{parent}__issued_date__gte': date_from})
+        if date_to:
+            rows = rows.filter(**{f'{parent}__issued_date__lte': date_to})
+        if statuses:
+            rows = rows.filter(**{f'{parent}__status__in': statuses})
+
+        return (
+            rows.annotate(period=truncate(f'{parent}__issued_date'))
+            .values('period', 'name')
+            .annotate(revenue=Sum('subtotal'), quantity=Sum('quantity'), documents=Count(parent, distinct=True))
+            .order_by('period', '-revenue', 'name')
+        )
+
+class ReceivablesService:
+    """
+    Set-based status upkeep and accounts-receivable aging for invoices and
+    quotations. The sweep is one UPDATE per transition, so it costs the same
+    for ten documents as for ten thousand and never races a concurrent edit
+    (the WHERE clause is re-checked on the row at update time).
+    """
+
+    # Invoices still waiting for money
+    OPEN_INVOICE_STATUSES = ['ISSUED', 'OVERDUE']
+    # (label, first day past due, last day past due or None)
+    AGING_BUCKETS = [
+        ('days_1_30', 1, 30),
+        ('days_31_60', 31, 60),
+        ('days_61_90', 61, 90),
+        ('days_90_plus', 91, None),
+    ]
+
+    @staticmethod
+    def sweep(today=None):
+        """
+        ISSUED invoices past due_date become OVERDUE (and OVERDUE ones whose
+        due date was pushed back return to ISSUED); SENT quotations past
+        valid_until become EXPIRED. A quotation without valid_until is valid
+        for QUOTATION_DEFAULT_VALIDITY_DAYS after its issued_date.
+        Returns a dict of row counts.
+        """
+        from datetime import timedelta
+        from django.conf import settings
+        from django.db.models import Q
+        from .models import Invoice, Quotation
+
+        today = today or timezone.localdate()
+        default_valid_from = today - timedelta(days=settings.QUOTATION_DEFAULT_VALIDITY_DAYS)
+        now = timezone.now()
+        # update() bypasses auto_now, so updated_at is set explicitly
+        return {
+            'invoices_overdue': Invoice.objects.filter(
+                status='ISSUED', due_date__lt=today
+            ).update(status='OVERDUE', updated_at=now),
+            'invoices_reopened': Invoice.objects.filter(
+                status='OVERDUE', due_date__gte=today
+            ).update(status='ISSUED', updated_at=now),
+            # valid_until < today is never true for NULL, so those rows need their own branch
+            'quotations_expired': Quotation.objects.filter(
+                Q(valid_until__lt=today) | Q(valid_until__isnull=True, issued_date__lt=default_valid_from),
+                status='SENT',
+            ).update(status='EXPIRED', updated_at=now),
+        }
+
+    @staticmethod
+    def aging(as_of=None, client_name=None):
+        """
+        Outstanding invoice totals per client split into current (not yet due,
+        or no due date) and 1-30/31-60/61-90/90+ days past due, computed in a
+        single GROUP BY with filtered sums. Returns (rows, totals).
+        """
+        from datetime import timedelta
+        from django.db.models import Count, DecimalField, Q, Sum, Value
+        from django.db.models.functions import Coalesce
+        from .models import Invoice
+
+        as_of = as_of or timezone.localdate()
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+        def bucket_sum(condition):
+            return Coalesce(Sum('grand_total', filter=condition), zero)
+
+        buckets = {'current': bucket_sum(Q(due_date__isnull=True) | Q(due_date__gte=as_of))}
+        for label, first_day, last_day in ReceivablesService.AGING_BUCKETS:
+            # Days past due d means due_date = as_of - d
+            condition = Q(due_date__lte=as_of - timedelta(days=first_day))
+            if last_day is not None:
+                condition &= Q(due_date__gte=as_of - timedelta(days=last_day))
+            buckets[label] = bucket_sum(condition)
+
+        invoices = Invoice.objects.filter(
+            status__in=ReceivablesService.OPEN_INVOICE_STATUSES,
+            issued_date__lte=as_of,
+        )
+        if client_name:
+            invoices = invoices.filter(client_name__icontains=client_name)
+
+        rows = list(
+            invoices.order_by()
+            .values('client_name')
+            .annotate(total=Coalesce(Sum('grand_total'), zero), invoices=Count('id'), **buckets)
+            .order_by('-total', 'client_name')
+        )
+
+        totals = {label: sum((row[label] for row in rows), Decimal('0.00')) for label in ['total', *buckets]}
+        totals['invoices'] = sum(row['invoices'] for row in rows)
+        return rows, totals
+
+class ListQueryService:
+    """
+    The filtering behind the lead, reminder and task list endpoints, taking
+    the user and a dict of query parameters instead of a request so the same
+    querysets can be rebuilt outside a request (e.g. by background exports).
+    """
+
+    @staticmethod
+    def leads(user, params):
+        """Leads visible to the user after filters, search and ordering, without any eager loading"""
+        from datetime import datetime
+        from django.db.models import Q
+
+        queryset = Lead.objects.all()
+        
+        # RBAC: If not admin/manager/view_all, limit to assigned
+        if not has_perm(user, 'leads.view_all'):
+            queryset = queryset.filter(assigned_to=user)
+
+        # Filters
+        status_param = params.get('status')
+        if status_param == 'open':
+            queryset = queryset.exclude(stage__in=['CLOSED', 'REJECTED'])
+        elif status_param == 'closed':
+            queryset = queryset.filter(stage__in=['CLOSED', 'REJECTED'])
+            
+        team_param = params.get('team')
+        if team_param:
+            queryset = queryset.filter(assigned_team=team_param)
+
+        # Unassigned Filter
+        if params.get('unassigned') == 'true':
+            queryset = queryset.filter(assigned_to__isnull=True)
+
+        # Assigned Filter
+        if params.get('assigned') == 'true':
+            queryset = queryset.filter(assigned_to__isnull=False)
+
+        # New Today Filter
+        if params.get('new_today') == 'true':
+            today = timezone.localdate()
+            start_of_today = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+            end_of_today = timezone.make_aware(datetime.combine(today, datetime.max.time()))
+            queryset = queryset.filter(created_at__range=(start_of_today, end_of_today))
+
+        # Reminder Date Filter (DateField — simple exact match)
+        reminder_date_param = params.get('reminder_date')
+        if reminder_date_param:
+            try:
+                parsed_date = datetime.strptime(reminder_date_param, '%Y-%m-%d').date()
+                queryset = queryset.filter(reminder_date=parsed_date)
+            except ValueError:
+                pass # Ignore invalid date format
+
+        # Sorting
+        ordering = params.get('ordering', '-created_at')
+        if ordering:
+            queryset = queryset.order_by(ordering)
+
+        # Search
+        search_query = params.get('search')
+        if search_query:
+            queryset = queryset.filter(
+                Q(first_name__icontains=search_query) |
+                Q(last_name__icontains=search_query) |
+                Q(email__icontains=search_query) |
+                Q(phone__icontains=search_query)
+            )
+
+        return queryset
+
+    @staticmethod
+    def scoped_reminders(user):
+        """Managers see all reminders, others only their own"""
+        from .models import FollowUpReminder
+
+        qs = FollowUpReminder.objects.all()
+        if not has_perm(user, 'records.view_all'):
+             qs = qs.filter(assigned_to=user)
+        return qs
+
+    @staticmethod
+    def reminders(user, params):
+        from datetime import datetime
+        from .utils import local_day_range
+
+        qs = ListQueryService.scoped_reminders(user)
+            
+        # Filters
+        status_param = params.get('status')
+        if status_param:
+            if status_param != 'all':
+                qs = qs.filter(status=status_param)
+
+        filter_param = params.get('filter')
+        # Use localdate to correctly handle timezone
+        today = timezone.localdate()
+        if filter_param == 'today':
+            today_start, today_end = local_day_range(today)
+            qs = qs.filter(due_date__gte=today_start, due_date__lt=today_end)
+        elif filter_param == 'overdue':
+             qs = qs.filter(due_date__lt=timezone.now())
+        elif filter_param == 'upcoming':
+             qs = qs.filter(due_date__gt=timezone.now())
+        elif filter_param == 'completed':
+             qs = qs.filter(status='COMPLETED')
+
+        date_param = params.get('date')
+        if date_param:
+            try:
+                target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+                day_start, day_end = local_day_range(target_date)
+                qs = qs.filter(due_date__gte=day_start, due_date__lt=day_end)
+            except ValueError:
+                pass
+            
+        return qs.order_by('due_date')
+
+    @staticmethod
+    def tasks(user, params):
+        from .models import Task
+
+        owner_id = params.get('owner')
+        if owner_id:
+            return Task.objects.filter(owner_id=owner_id)
+        
+        lead_id = params.get('lead')
+        if lead_id:
+            return Task.objects.filter(lead_id=lead_id)
+
+        # Default: Show only tasks assigned to the user
+        return Task.objects.filter(owner=user)
+
+class ExportCancelled(Exception):
+    """The export job was deleted or handed to another worker while running."""
+
+class ExportJobService:
+    """
+    Runs background exports (ExportJob rows) for the run_export_worker command.
+
+    Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+    can run side by side without handing out a job twice. Rows are streamed
+    from a server-side cursor (see exports.export_rows) and progress is saved
+    every PROGRESS_EVERY rows; that write doubles as the job's heartbeat and is
+    fenced on started_at, so a worker whose job was deleted or reclaimed stops
+    at its next progress update.
+    """
+
+    PROGRESS_EVERY = 2000
+    EXPORT_DIR = 'exports'
+
+    @staticmethod
+    def columns_for(kind):
+        from .exports import LEAD_EXPORT_COLUMNS, REMINDER_EXPORT_COLUMNS, TASK_EXPORT_COLUMNS
+
+        return {
+            'leads': LEAD_EXPORT_COLUMNS,
+            'reminders': REMINDER_EXPORT_COLUMNS,
+            'tasks': TASK_EXPORT_COLUMNS,
+        }[kind]
+
+    @staticmethod
+    def queryset_for(job):
+        builders = {
+            'leads': ListQueryService.leads,
+            'reminders': ListQueryService.reminders,
+            'tasks': ListQueryService.tasks,
+        }
+        return builders[job.kind](job.requested_by, job.params)
+
+    @staticmethod
+    def claim_next():
+        """Marks the oldest pending (or orphaned) job RUNNING and returns it, or None."""
+        from datetime import timedelta
+        from django.conf import settings
+        from django.db import transaction
+        from django.db.models import Q
+        from .models import ExportJob
+
+        now = timezone.now()
+        stale = now - timedelta(minutes=settings.EXPORT_JOB_STALE_MINUTES)
+        with transaction.atomic():
+            job = (
+                ExportJob.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=ExportJob.Status.PENDING) |
+                    Q(status=ExportJob.Status.RUNNING, heartbeat_at__lt=stale)
+                )
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = ExportJob.Status.RUNNING
+            job.started_at = job.heartbeat_at = now
+            job.processed_rows = 0
+            job.error = ''
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'processed_rows', 'error'])
+        return job
+
+    @staticmethod
+    def _running(job):
+        from .models import ExportJob
+
+        return ExportJob.objects.filter(pk=job.pk, status=ExportJob.Status.RUNNING, started_at=job.started_at)
+
+    @staticmethod
+    def _with_progress(job, rows):
+        processed = 0
+        for row in rows:
+            yield row
+            processed += 1
+            if processed % ExportJobService.PROGRESS_EVERY == 0:
+                if not ExportJobService._running(job).update(processed_rows=processed, heartbeat_at=timezone.now()):
+                    raise ExportCancelled()
+        job.processed_rows = processed
+
+    @staticmethod
+    def run(job):
+        """Writes the job's file under MEDIA_ROOT/exports and records the outcome. Returns the final status."""
+        import os
+        import secrets
+        from datetime import timedelta
+        from django.conf import settings
+        from .exports import export_headers, export_rows
+        from .models import ExportJob
+        from .utils import write_csv, write_xlsx
+
+        relative_path = os.path.join(
+            ExportJobService.EXPORT_DIR, f"{job.pk}-{secrets.token_urlsafe(16)}.{job.format}"
+        )
+        path = ExportJobService.absolute_path(relative_path)
+        tmp_path = f"{path}.tmp"
+
+        try:
+            columns = ExportJobService.columns_for(job.kind)
+            queryset = ExportJobService.queryset_for(job)
+            ExportJobService._running(job).update(total_rows=queryset.count())
+
+            rows = ExportJobService._with_progress(job, export_rows(queryset, columns))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if job.format == ExportJob.Format.CSV:
+                with open(tmp_path, 'w', newline='', encoding='utf-8') as target:
+                    write_csv(target, export_headers(columns), rows)
+            else:
+                write_xlsx(tmp_path, job.get_kind_display(), export_headers(columns), rows)
+            os.replace(tmp_path, path)
+        except ExportCancelled:
+            ExportJobService._remove(tmp_path)
+            return None
+        except Exception as exc:
+            ExportJobService._remove(tmp_path)
+            ExportJobService._running(job).update(
+                status=ExportJob.Status.FAILED, error=str(exc), finished_at=timezone.now(),
+            )
+            raise
+
+        now = timezone.now()
+        finished = ExportJobService._running(job).update(
+            status=ExportJob.Status.SUCCESS,
+            processed_rows=job.processed_rows,
+            file_path=relative_path,
+            filename=f"{job.kind} - {timezone.localdate():%Y-%m-%d}.{job.format}",
+            finished_at=now,
+            heartbeat_at=now,
+            expires_at=now + timedelta(hours=settings.EXPORT_JOB_TTL_HOURS),
+        )
+        if not finished:
+            ExportJobService._remove(path)
+            return None
+        return ExportJob.Status.SUCCESS
+
+    @staticmethod
+    def expire(now=None):
+        """Deletes the files of finished jobs past expires_at and marks them EXPIRED. Returns the job count."""
+        from .models import ExportJob
+
+        now = now or timezone.now()
+        expired = list(
+            ExportJob.objects.filter(status=ExportJob.Status.SUCCESS, expires_at__lt=now).values_list('pk', 'file_path')
+        )
+        for _, path in expired:
+            ExportJobService._remove(ExportJobService.absolute_path(path))
+        return ExportJob.objects.filter(pk__in=[pk for pk, _ in expired]).update(
+            status=ExportJob.Status.EXPIRED, file_path='',
+        )
+
+    @staticmethod
+    def delete(job):
+        """Deletes the job and its file; a worker still running it stops at its next progress update."""
+        if job.file_path:
+            ExportJobService._remove(ExportJobService.absolute_path(job.file_path))
+        job.delete()
+
+    @staticmethod
+    def absolute_path(relative_path):
+        import os
+        from django.conf import settings
+
+        return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+    @staticmethod
+    def _remove(path):
+        import os
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class OnboardingService:
+    """
+    Bulk user onboarding from CSV or JSON rows (UserViewSet.bulk_onboard and
+    the onboard_users command).
+
+    Every row is validated up front and reported on individually. Passwords
+    of the valid rows are hashed in a process pool (password_hashing), then
+    the users and their role memberships are inserted with one bulk_create
+    each, in a single transaction. onboard() raises HashingBusy when other
+    bulk onboards already occupy the pool.
+    """
+
+    # Same initial password as UserViewSet.onboard
+    DEFAULT_PASSWORD = 'password123'
+    TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+    @staticmethod
+    def parse_csv(text):
+        """Rows of a CSV with a header line; column names are case-insensitive."""
+        import csv
+        import io
+
+        reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+        return [
+            {key.strip().lower(): (value or '').strip() for key, value in row.items() if key is not None}
+            for row in reader
+        ]
+
+    @staticmethod
+    def parse_json(data):
+        """Accepts a list of rows or {"users": [...]}."""
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError('Expected a list of users or {"users": [...]}')
+        return data
+
+    @staticmethod
+    def _split_names(value):
+        if isinstance(value, (list, tuple)):
+            return [str(name).strip() for name in value if str(name).strip()]
+        return [name.strip() for name in re.split(r'[;,]', str(value or '')) if name.strip()]
+
+    @staticmethod
+    def _clean(row, roles, default_password):
+        """Returns (user fields, roles, password, errors) for one input row."""
+        from django.core.exceptions import ValidationError
+        from django.core.validators import validate_email
+        from .models import User
+
+        errors = []
+        username = User.normalize_username(str(row.get('username') or '').strip())
+        email = str(row.get('email') or '').strip()
+        team = str(row.get('team') or '').strip()
+
+        if not username:
+            errors.append('username is required')
+        elif len(username) > User._meta.get_field('username').max_length:
+            errors.append('username is too long')
+        else:
+            try:
+                User.username_validator(username)
+            except ValidationError as e:
+                errors.extend(e.messages)
+
+        if not email:
+            errors.append('email is required')
+        else:
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append(f"invalid email '{email}'")
+
+        teams = {value.lower(): value for value in Team.values}
+        teams.update({str(label).lower(): value for value, label in Team.choices})
+        if team.lower() not in teams:
+            errors.append(f"team must be one of {', '.join(Team.values)}")
+
+        is_manager = row.get('is_manager', False)
+        if not isinstance(is_manager, bool):
+            is_manager = str(is_manager).strip().lower() in OnboardingService.TRUE_VALUES
+
+        role_names = OnboardingService._split_names(row.get('roles'))
+        unknown = [name for name in role_names if name.lower() not in roles]
+        if unknown:
+            errors.append(f"unknown roles: {', '.join(unknown)}")
+        user_roles = {roles[name.lower()] for name in role_names if name.lower() in roles}
+        if is_manager and 'manager' in roles:
+            user_roles.add(roles['manager'])
+
+        full_name = str(row.get('full_name') or '').strip()
+        first_name, _, last_name = full_name.partition(' ')
+        fields = {
+            'username': username,
+            'email': User.objects.normalize_email(email),
+            'first_name': str(row.get('first_name') or first_name).strip(),
+            'last_name': str(row.get('last_name') or last_name).strip(),
+            'team': teams.get(team.lower()),
+            'is_manager': is_manager,
+        }
+        password = str(row.get('password') or default_password or OnboardingService.DEFAULT_PASSWORD)
+        return fields, user_roles, password, errors
+
+    @staticmethod
+    def onboard(rows, default_password=None, dry_run=False):
+        """
+        Creates a user per valid row. Returns one result per row, in order:
+        {'row', 'username', 'status': 'created' | 'valid' (dry run) | 'error', 'id', 'errors'}.
+        """
+        from django.db import IntegrityError, transaction
+        from rbac.models import Role
+        from .models import User
+        from .password_hashing import password_hash_pool
+
+        roles = {role.name.lower(): role for role in Role.objects.all()}
+        results, pending = [], []
+        seen = set()
+        for index, row in enumerate(rows, start=1):
+            fields, user_roles, password, errors = OnboardingService._clean(row, roles, default_password)
+            if fields['username'] and fields['username'] in seen:
+                errors.append('duplicate username in this batch')
+            seen.add(fields['username'])
+            result = {'row': index, 'username': fields['username'], 'status': 'error', 'id': None, 'errors': errors}
+            results.append(result)
+            if not errors:
+                pending.append((result, fields, user_roles, password))
+
+        taken = set(User.objects.filter(username__in=[fields['username'] for _, fields, _, _ in pending])
+                    .values_list('username', flat=True))
+        for result, fields, _, _ in pending:
+            if fields['username'] in taken:
+                result['errors'].append('username already taken')
+        pending = [entry for entry in pending if not entry[0]['errors']]
+
+        if dry_run:
+            for result, _, _, _ in pending:
+                result['status'] = 'valid'
+            return results
+
+        hashes = password_hash_pool.hash(password for _, _, _, password in pending)
+        pending = [(result, User(password=hashed, **fields), user_roles)
+                   for (result, fields, user_roles, _), hashed in zip(pending, hashes)]
+
+        Membership = Role.users.through
+        while pending:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user for _, user, _ in pending], batch_size=500)
+                    Membership.objects.bulk_create(
+                        [Membership(role_id=role.pk, user_id=user.pk) for _, user, user_roles in pending for role in user_roles],
+                        batch_size=1000,
+                    )
+                break
+            except IntegrityError:
+                # A username was taken concurrently since the check above: report those rows and retry the rest
+                usernames = [user.username for _, user, _ in pending]
+                taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+                if not taken:
+                    raise
+                for result, user, _ in pending:
+                    if user.username in taken:
+                        result['errors'].append('username already taken')
+                    user.pk = None
+                pending = [entry for entry in pending if not entry[0]['errors']]
+
+        for result, user, _ in pending:
+            result['status'] = 'created'
+            result['id'] = user.pk
+        return results
+
+class UploadError(Exception):
+    """A document upload that cannot proceed; the message is shown to the client."""
+
+class UploadOffsetMismatch(UploadError):
+    """A chunk did not start where the upload session left off."""
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk starting at offset {offset}')
+        self.offset = offset
+
+class DocumentStorageService:
+    """
+    Content-addressed storage for lead documents, and the chunked upload protocol.
+
+    Each distinct file is stored once, as a DocumentBlob under
+    MEDIA_ROOT/blobs/<ab>/<cd>/<sha256>, and LeadDocument rows reference the
+    blob: the same brochure attached to 300 leads takes one file. Whole-file
+    uploads go through store_upload(). Large files are sent in chunks to an
+    UploadSession: a chunk must start at the session's offset, so a client
+    whose connection dropped asks for the offset and carries on from there.
+    A client that sends the SHA-256 up front skips the transfer entirely
+    when it can already read a document with that content.
+    """
+
+    BLOB_DIR = 'blobs'
+    UPLOAD_DIR = 'uploads'
+    READ_SIZE = 1024 * 1024
+    # Unreferenced blobs used more recently than this are kept: an upload may be about to reference them
+    PRUNE_GRACE_HOURS = 1
+
+    @staticmethod
+    def absolute_path(relative_path):
+        import os
+        from django.conf import settings
+
+        return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+    @staticmethod
+    def blob_path(sha256, name):
+        import os
+
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+            extension = ''
+        return os.path.join(DocumentStorageService.BLOB_DIR, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+    @staticmethod
+    def staging_path(session):
+        import os
+
+        return DocumentStorageService.absolute_path(os.path.join(DocumentStorageService.UPLOAD_DIR, f"{session.pk}.part"))
+
+    @staticmethod
+    def hash_file(path):
+        """Returns (sha256 hex digest, size) of the file at path."""
+        import hashlib
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as source:
+            while chunk := source.read(DocumentStorageService.READ_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    @staticmethod
+    def find_blob(sha256, size, readable_by=None):
+        """
+        The stored blob with this content, marked as just used, or None. With
+        readable_by, only a blob already attached to a lead that user can see:
+        a bare hash must not hand out someone else's file.
+        """
+        from .models import DocumentBlob
+
+        blobs = DocumentBlob.objects.filter(sha256=sha256, size=size)
+        if readable_by is not None:
+            blobs = blobs.filter(documents__lead__in=ListQueryService.leads(readable_by, {}))
+        blob = blobs.first()
+        if blob is not None:
+            blob.last_used_at = timezone.now()
+            DocumentBlob.objects.filter(pk=blob.pk).update(last_used_at=blob.last_used_at)
+        return blob
+
+    @staticmethod
+    def store(source_path, name, sha256=None, move=False):
+        """
+        Stores the file at source_path as a blob, or reuses the blob already
+        holding the same content, and returns it. With move=True the source
+        file is consumed either way.
+        """
+        import os
+        import shutil
+        from django.db import IntegrityError, transaction
+        from .models import DocumentBlob
+
+        if sha256 is None:
+            sha256, size = DocumentStorageService.hash_file(source_path)
+        else:
+            size = os.path.getsize(source_path)
+
+        blob = DocumentStorageService.find_blob(sha256, size)
+        relative = blob.path if blob is not None else DocumentStorageService.blob_path(sha256, name)
+        target = DocumentStorageService.absolute_path(relative)
+
+        if blob is None or not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if move:
+                os.replace(source_path, target)
+            else:
+                tmp_path = f"{target}.{os.getpid()}.tmp"
+                shutil.copyfile(source_path, tmp_path)
+                os.replace(tmp_path, target)
+        elif move:
+            os.remove(source_path)
+
+        if blob is None:
+            try:
+                with transaction.atomic():
+                    blob = DocumentBlob.objects.create(sha256=sha256, size=size, path=relative)
+            except IntegrityError:
+                # Stored concurrently by another upload of the same content
+                blob = DocumentBlob.objects.get(sha256=sha256)
+                if blob.path != relative:
+                    DocumentStorageService._remove(target)
+        return blob
+
+    @staticmethod
+    def store_upload(uploaded_file):
+        """Stores a whole-file upload (a Django UploadedFile) and returns its blob."""
+        import hashlib
+        import os
+        import uuid
+
+        staging = DocumentStorageService.absolute_path(os.path.join(DocumentStorageService.UPLOAD_DIR, f"{uuid.uuid4()}.part"))
+        os.makedirs(os.path.dirname(staging), exist_ok=True)
+        digest = hashlib.sha256()
+        try:
+            with open(staging, 'wb') as target:
+                for chunk in uploaded_file.chunks(DocumentStorageService.READ_SIZE):
+                    digest.update(chunk)
+                    target.write(chunk)
+            return DocumentStorageService.store(staging, uploaded_file.name, sha256=digest.hexdigest(), move=True)
+        finally:
+            DocumentStorageService._remove(staging)
+
+    @staticmethod
+    def attach(lead, name, blob):
+        from .models import LeadDocument
+
+        return LeadDocument.objects.create(lead=lead, name=name, blob=blob, file_path=blob.path)
+
+    @staticmethod
+    def start_session(user, lead, name, size, sha256=''):
+        """
+        Opens an upload session. When the declared SHA-256 matches a blob the
+        user can already read, the document is attached at once and the
+        session starts COMPLETE. Otherwise the bytes must be sent, and any
+        deduplication happens on complete() against the received content.
+        """
+        import os
+        from datetime import timedelta
+        from django.conf import settings
+        from .models import UploadSession
+
+        session = UploadSession(
+            created_by=user, lead=lead, name=name, size=size, sha256=sha256,
+            expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+        )
+        blob = DocumentStorageService.find_blob(sha256, size, readable_by=user) if sha256 else None
+        if blob is not None:
+            session.document = DocumentStorageService.attach(lead, name, blob)
+            session.offset = size
+            session.status = UploadSession.Status.COMPLETE
+            session.save()
+            return session
+
+        session.save()
+        staging = DocumentStorageService.staging_path(session)
+        os.makedirs(os.path.dirname(staging), exist_ok=True)
+        open(staging, 'wb').close()
+        return session
+
+    @staticmethod
+    def append_chunk(session_id, offset, stream, length):
+        """
+        Appends `length` bytes read from `stream` at `offset` and returns the
+        updated session; the chunk that completes the file also stores it.
+        The session row stays locked meanwhile, so chunks are applied one at
+        a time. A chunk cut short by a dropped connection does not advance
+        the offset, and its bytes are overwritten by the retry.
+        """
+        from django.db import transaction
+        from .models import UploadSession
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session_id)
+            if session.status != UploadSession.Status.ACTIVE:
+                raise UploadError(f'Upload is {session.get_status_display().lower()}')
+            if offset != session.offset:
+                raise UploadOffsetMismatch(session.offset)
+            if length <= 0 or offset + length > session.size:
+                raise UploadError(f'Chunk must be 1 to {session.size - offset} bytes')
+
+            received = 0
+            with open(DocumentStorageService.staging_path(session), 'r+b') as target:
+                target.seek(offset)
+                target.truncate()
+                while received < length:
+                    chunk = stream.read(min(DocumentStorageService.READ_SIZE, length - received))
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    received += len(chunk)
+            if received != length:
+                raise UploadError(f'Chunk ended after {received} of {length} bytes')
+
+            session.offset += received
+            session.save(update_fields=['offset', 'updated_at'])
+            if session.offset == session.size:
+                DocumentStorageService.complete(session)
+        return session
+
+    @staticmethod
+    def complete(session):
+        """Hashes the staged file, stores it as a blob and attaches it to the lead."""
+        from .models import UploadSession
+
+        staging = DocumentStorageService.staging_path(session)
+        sha256, _ = DocumentStorageService.hash_file(staging)
+        if session.sha256 and session.sha256 != sha256:
+            DocumentStorageService._remove(staging)
+            session.status = UploadSession.Status.FAILED
+            session.error = f'Content SHA-256 {sha256} does not match the declared {session.sha256}'
+            session.save(update_fields=['status', 'error', 'updated_at'])
+            return session
+
+        blob = DocumentStorageService.store(staging, session.name, sha256=sha256, move=True)
+        session.document = DocumentStorageService.attach(session.lead, session.name, blob)
+        session.sha256 = sha256
+        session.status = UploadSession.Status.COMPLETE
+        session.save(update_fields=['document', 'sha256', 'status', 'updated_at'])
+        return session
+
+    @staticmethod
+    def delete_session(session):
+        DocumentStorageService._remove(DocumentStorageService.staging_path(session))
+        session.delete()
+
+    @staticmethod
+    def expire_sessions():
+        """Deletes sessions past expires_at and their staged bytes. Returns how many."""
+        from .models import UploadSession
+
+        expired = list(UploadSession.objects.filter(expires_at__lt=timezone.now()))
+        for session in expired:
+            DocumentStorageService.delete_session(session)
+        return len(expired)
+
+    @staticmethod
+    def prune_blobs():
+        """Deletes blobs no document references any more. Returns (blobs deleted, bytes freed)."""
+        from datetime import timedelta
+        from django.db import transaction
+        from .models import DocumentBlob
+
+        cutoff = timezone.now() - timedelta(hours=DocumentStorageService.PRUNE_GRACE_HOURS)
+        candidates = DocumentBlob.objects.filter(documents__isnull=True, last_used_at__lt=cutoff).values_list('pk', flat=True)
+        deleted = freed = 0
+        for pk in list(candidates):
+            with transaction.atomic():
+                # Locked, so a document being attached to it concurrently waits and then fails rather than dangling
+                blob = DocumentBlob.objects.select_for_update().filter(pk=pk, last_used_at__lt=cutoff).first()
+                if blob is None or blob.documents.exists():
+                    continue
+                blob.delete()
+            DocumentStorageService._remove(DocumentStorageService.absolute_path(blob.path))
+            deleted += 1
+            freed += blob.size
+        return deleted, freed
+
+    @staticmethod
+    def _remove(path):
+        import os
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import FollowUpReminder, Task, Notification, Lead, TechPipeline, LeadStage, RevenueRecord
+from .models import FollowUpReminder, Task, Notification, Lead, TechPipeline, TechPipelineStageHistory, LeadStage, RevenueRecord, User
 
 @receiver(post_save, sender=FollowUpReminder)
 def notify_on_reminder_creation(sender, instance, created, **kwargs):
@@ -16,6 +16,29 @@ def notify_on_reminder_creation(sender, instance, created, **kwargs):
             is_read=False
         )
 
+@receiver(pre_save, sender=FollowUpReminder)
+def skip_due_notice_for_due_reminder(sender, instance, **kwargs):
+    """
+    A reminder created already due is announced by its "New Reminder"
+    notification; marking it notified keeps the dispatcher from sending
+    "Reminder due" for it as well.
+    """
+    from .services import ReminderService
+
+    if instance._state.adding and instance.notified_at is None and ReminderService.is_due(instance.due_date):
+        instance.notified_at = timezone.now()
+
+@receiver(pre_save, sender=FollowUpReminder)
+def rearm_reminder_on_reschedule(sender, instance, **kwargs):
+    """
+    A rescheduled reminder fires again at its new due date, so clear notified_at
+    when due_date changes. The dispatcher picks the row up through updated_at.
+    """
+    if instance.pk and instance.notified_at is not None:
+        old_due_date = FollowUpReminder.objects.filter(pk=instance.pk).values_list('due_date', flat=True).first()
+        if old_due_date is not None and old_due_date != instance.due_date:
+            instance.notified_at = None
+
 @receiver(post_save, sender=Task)
 def notify_on_task_assignment(sender, instance, created, **kwargs):
     """
@@ -41,6 +64,38 @@ def create_tech_pipeline_on_stage_change(sender, instance, created, **kwargs):
             TechPipeline.objects.create(lead=instance)
 
 
+@receiver(pre_save, sender=TechPipeline)
+def capture_previous_pipeline_stage(sender, instance, **kwargs):
+    """
+    Remember the stored stage so post_save can tell whether it changed.
+    """
+    if instance.pk:
+        instance._old_stage = TechPipeline.objects.filter(pk=instance.pk).values_list('stage', flat=True).first()
+    else:
+        instance._old_stage = None
+
+
+@receiver(post_save, sender=TechPipeline)
+def record_pipeline_stage_change(sender, instance, created, **kwargs):
+    """
+    Close the open stage interval and open a new one whenever the stage changes.
+    """
+    old_stage = getattr(instance, '_old_stage', None)
+    if not created and old_stage == instance.stage:
+        return
+
+    now = timezone.now()
+    if not created:
+        TechPipelineStageHistory.objects.filter(pipeline=instance, exited_at__isnull=True).update(exited_at=now)
+    TechPipelineStageHistory.objects.create(
+        pipeline=instance,
+        stage=instance.stage,
+        assignee_id=Lead.objects.filter(pk=instance.lead_id).values_list('assigned_to_id', flat=True).first(),
+        entered_at=now,
+    )
+    instance._old_stage = instance.stage
+
+
 @receiver(pre_save, sender=Lead)
 def capture_previous_state(sender, instance, **kwargs):
     """
@@ -105,3 +160,9 @@ def track_revenue_update(sender, instance, created, **kwargs):
             year=now.year
         )
 
+
+@receiver(post_save, sender=User)
+def forget_cached_user_state(sender, instance, **kwargs):
+    """Deactivations and permission changes made in this process apply to its next request at once."""
+    from .authentication import user_states
+    user_states.forget(instance.pk)
@@ -0,0 +1,340 @@
+import hashlib
+import shutil
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from rbac.engine import bump_perm_version
+from rbac.tokens import add_permission_claims
+from .authentication import ClaimsJWTAuthentication, StreamTicketAuthentication, issue_stream_ticket, user_states
+from .invoice_views import generate_finance_pdf
+from .models import ClaimsUser, FollowUpReminder, Lead, LeadDocument, Notification, Quotation, Team, UploadSession, User
+from .password_hashing import password_hash_pool
+from .pdf_cache import PdfCacheService
+from .reminder_dispatch import ReminderDispatcher
+from .services import DocumentStorageService, NotificationService, ReceivablesService, ReminderService
+from .workers import pdf_render_pool
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_states.clear()
+        self.user = User.objects.create_user(
+            username='alice', password='x', first_name='Alice', team=Team.SALES, is_manager=True,
+        )
+
+    def token_for(self, user):
+        return AccessToken(str(add_permission_claims(AccessToken.for_user(user), user)))
+
+    def authenticate(self, user):
+        return ClaimsJWTAuthentication().get_user(self.token_for(user))
+
+    def test_round_trip_restores_every_claimed_field(self):
+        token = self.token_for(self.user)
+        with self.assertNumQueries(1):  # the is_active / perm_version lookup only
+            authenticated = ClaimsJWTAuthentication().get_user(token)
+
+        self.assertIsInstance(authenticated, ClaimsUser)
+        self.assertEqual(authenticated.pk, self.user.pk)
+        for field in (*ClaimsUser.CLAIM_FIELDS, 'is_active', 'perm_version'):
+            self.assertEqual(getattr(authenticated, field), getattr(self.user, field), field)
+        self.assertIs(authenticated.is_superuser, False)
+        self.assertEqual(authenticated, self.user)
+
+    def test_unclaimed_fields_load_in_one_query(self):
+        authenticated = self.authenticate(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticated.first_name, 'Alice')
+            self.assertEqual(authenticated.email, self.user.email)
+
+    def test_stale_permission_version_loads_the_user(self):
+        token = self.token_for(self.user)
+        User.objects.filter(pk=self.user.pk).update(perm_version=self.user.perm_version + 1)
+        user_states.clear()
+
+        authenticated = ClaimsJWTAuthentication().get_user(token)
+        self.assertIs(type(authenticated), User)
+        self.assertEqual(authenticated.username, 'alice')
+
+
+class UploadDeduplicationTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+        self.owner = User.objects.create_user(username='owner', password='x', team=Team.SALES)
+        self.other = User.objects.create_user(username='other', password='x', team=Team.SALES)
+        self.owner_lead = Lead.objects.create(first_name='Owner', assigned_to=self.owner)
+        self.other_lead = Lead.objects.create(first_name='Other', assigned_to=self.other)
+
+        self.content = b'signed contract'
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+        staged = f'{self.media_root}/contract.pdf'
+        with open(staged, 'wb') as source:
+            source.write(self.content)
+        blob = DocumentStorageService.store(staged, 'contract.pdf', move=True)
+        DocumentStorageService.attach(self.owner_lead, 'contract.pdf', blob)
+
+    def start(self, user, lead):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, client.post('/api/v1/upload-sessions/', {
+            'lead': lead.pk, 'name': 'copy.pdf', 'size': len(self.content), 'sha256': self.sha256,
+        }, format='json')
+
+    def test_reader_of_the_blob_skips_the_transfer(self):
+        _, response = self.start(self.owner, self.owner_lead)
+        self.assertEqual(response.data['status'], UploadSession.Status.COMPLETE)
+        self.assertEqual(LeadDocument.objects.filter(blob__sha256=self.sha256).count(), 2)
+
+    def test_bare_hash_does_not_grant_someone_elses_file(self):
+        client, response = self.start(self.other, self.other_lead)
+        self.assertEqual(response.data['status'], UploadSession.Status.ACTIVE)
+        self.assertFalse(LeadDocument.objects.filter(lead=self.other_lead).exists())
+
+        # Sending the bytes still deduplicates onto the stored blob
+        response = client.put(f"/api/v1/upload-sessions/{response.data['id']}/chunk/", self.content,
+                              content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.data['status'], UploadSession.Status.COMPLETE)
+        self.assertEqual(LeadDocument.objects.get(lead=self.other_lead).blob.sha256, self.sha256)
+
+
+class LeadHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='x', is_manager=True)
+        self.lead = Lead.objects.create(first_name='History', assigned_to=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_malformed_archived_months_are_rejected(self):
+        for value in ('2025', '2025-01-02', '2025-13', 'abc', '2025-1'):
+            response = self.client.get(f'/api/v1/leads/{self.lead.pk}/history/',
+                                       {'include_archived': 'true', 'archived_months': value})
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_valid_archived_months_are_accepted(self):
+        response = self.client.get(f'/api/v1/leads/{self.lead.pk}/history/',
+                                   {'include_archived': 'true', 'archived_months': '2025-01,2025-12'})
+        self.assertEqual(response.status_code, 200)
+
+
+class DueReminderNotificationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rep', password='x')
+        self.lead = Lead.objects.create(first_name='Due', assigned_to=self.user)
+
+    def dispatch_all(self):
+        dispatcher = ReminderDispatcher()
+        dispatcher.load()
+        return dispatcher.fire_due(timezone.now() + timedelta(seconds=1))
+
+    def test_reminder_created_already_due_is_only_announced_once(self):
+        FollowUpReminder.objects.create(lead=self.lead, assigned_to=self.user, due_date=timezone.now(), message='Call')
+        self.assertEqual(self.dispatch_all(), 0)
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+
+    def test_bulk_created_auto_reminders_are_only_announced_once(self):
+        ReminderService.bulk_create_with_notifications([
+            FollowUpReminder(lead=self.lead, assigned_to=self.user, reminder_type=FollowUpReminder.Type.AUTO,
+                             due_date=timezone.now(), message='Stale'),
+        ])
+        self.assertEqual(self.dispatch_all(), 0)
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+
+    def test_future_reminder_is_still_dispatched_when_due(self):
+        reminder = FollowUpReminder.objects.create(
+            lead=self.lead, assigned_to=self.user, due_date=timezone.now() + timedelta(hours=1), message='Later',
+        )
+        self.assertIsNone(reminder.notified_at)
+        dispatcher = ReminderDispatcher()
+        dispatcher.load()
+        self.assertEqual(dispatcher.fire_due(timezone.now() + timedelta(hours=2)), 1)
+
+
+class PermVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='versioned', password='x')
+
+    def current_version(self):
+        return User.objects.values_list('perm_version', flat=True).get(pk=self.user.pk)
+
+    def test_full_save_does_not_revert_a_concurrent_bump(self):
+        stale_copy = User.objects.get(pk=self.user.pk)
+        bump_perm_version([self.user.pk])
+        stale_copy.first_name = 'Renamed'
+        stale_copy.save()
+        self.assertEqual(self.current_version(), self.user.perm_version + 1)
+
+    def test_flag_change_bumps_atomically(self):
+        stale_copy = User.objects.get(pk=self.user.pk)
+        bump_perm_version([self.user.pk])
+        stale_copy.is_manager = True
+        stale_copy.save()
+        self.assertEqual(self.current_version(), self.user.perm_version + 2)
+        self.assertEqual(stale_copy.perm_version, self.user.perm_version + 2)
+
+
+class NotificationStreamTicketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='listener', password='x')
+        self.client = APIClient()
+
+    def test_ticket_authenticates_the_stream(self):
+        self.client.force_authenticate(self.user)
+        ticket = self.client.post('/api/v1/notifications/stream_ticket/').data['ticket']
+        self.client.force_authenticate(None)
+
+        request = APIRequestFactory().get('/api/v1/notifications/stream/', {'ticket': ticket})
+        user, _ = StreamTicketAuthentication().authenticate(Request(request))
+        self.assertEqual(user, self.user)
+
+    def test_access_token_is_not_accepted_in_the_query_string(self):
+        token = str(AccessToken.for_user(self.user))
+        for param in ('token', 'ticket'):
+            response = self.client.get('/api/v1/notifications/stream/', {param: token}, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 401, param)
+
+    def test_expired_ticket_is_rejected(self):
+        ticket = issue_stream_ticket(self.user)
+        request = APIRequestFactory().get('/api/v1/notifications/stream/', {'ticket': ticket})
+        with override_settings(NOTIFICATION_STREAM_TICKET_TTL=-1):
+            with self.assertRaises(AuthenticationFailed):
+                StreamTicketAuthentication().authenticate(Request(request))
+
+
+class ReminderCalendarTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='x', is_manager=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_non_numeric_assigned_to_is_rejected(self):
+        response = self.client.get('/api/v1/reminders/calendar/', {'month': '2025-01', 'assigned_to': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_numeric_assigned_to_is_accepted(self):
+        response = self.client.get('/api/v1/reminders/calendar/', {'month': '2025-01', 'assigned_to': self.user.pk})
+        self.assertEqual(response.status_code, 200)
+
+
+class NotificationCoalesceTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='assigner', password='x', is_manager=True)
+        self.rep = User.objects.create_user(username='assignee', password='x')
+        self.lead = Lead.objects.create(first_name='Burst', assigned_to=self.rep)
+
+    def burst(self, start, spacing, count, **fields):
+        ids = []
+        for index in range(count):
+            notification = Notification.objects.create(
+                recipient=self.rep, sender=self.manager, message='You have been assigned a new lead', **fields,
+            )
+            Notification.objects.filter(pk=notification.pk).update(created_at=start + index * spacing)
+            ids.append(notification.pk)
+        return ids
+
+    def test_burst_across_a_minute_boundary_becomes_one_digest(self):
+        start = (timezone.now() - timedelta(hours=1)).replace(second=57, microsecond=0)
+        ids = self.burst(start, timedelta(seconds=1), 6)
+
+        self.assertEqual(NotificationService.coalesce_bursts(min_burst=5), 5)
+        digest = Notification.objects.get(recipient=self.rep)
+        # The newest row is rewritten in place, so nothing new is pushed to the recipient
+        self.assertEqual(digest.pk, ids[-1])
+        self.assertEqual(digest.message, 'You have been assigned 6 new leads')
+        self.assertIsNone(digest.lead_id)
+
+    def test_digest_keeps_a_shared_lead(self):
+        self.burst(timezone.now() - timedelta(hours=1), timedelta(seconds=5), 5, lead=self.lead)
+        NotificationService.coalesce_bursts(min_burst=5)
+        self.assertEqual(Notification.objects.get(recipient=self.rep).lead, self.lead)
+
+    def test_separate_bursts_and_unsettled_bursts_are_left_alone(self):
+        start = timezone.now() - timedelta(hours=1)
+        self.burst(start, timedelta(minutes=5), 6)
+        self.burst(timezone.now() - timedelta(seconds=10), timedelta(seconds=1), 6)
+        self.assertEqual(NotificationService.coalesce_bursts(min_burst=5), 0)
+
+
+class ReceivablesSweepTests(TestCase):
+    def quotation(self, number, **fields):
+        return Quotation.objects.create(quotation_number=number, client_name='Acme', **fields)
+
+    @override_settings(QUOTATION_DEFAULT_VALIDITY_DAYS=30)
+    def test_quotation_without_valid_until_expires_after_the_default_validity(self):
+        today = timezone.localdate()
+        stale = self.quotation('Q-1', issued_date=today - timedelta(days=31))
+        recent = self.quotation('Q-2', issued_date=today - timedelta(days=30))
+        dated = self.quotation('Q-3', issued_date=today - timedelta(days=90), valid_until=today)
+
+        self.assertEqual(ReceivablesService.sweep(today)['quotations_expired'], 1)
+        statuses = dict(Quotation.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {stale.pk: 'EXPIRED', recent.pk: 'SENT', dated.pk: 'SENT'})
+
+
+@override_settings(PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_POOL_MIN=2)
+class BulkOnboardConcurrencyTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='x', email='admin@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.rows = [{'username': f'new{index}', 'email': f'new{index}@example.com', 'team': Team.SALES}
+                     for index in range(2)]
+
+    def test_onboard_while_the_pool_is_busy_is_turned_away(self):
+        slots = password_hash_pool._get_slots()
+        slots.acquire()
+        self.addCleanup(slots.release)
+
+        response = self.client.post('/api/v1/users/bulk_onboard/', self.rows, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(User.objects.filter(username__startswith='new').exists())
+
+    def test_dry_run_does_not_need_the_pool(self):
+        slots = password_hash_pool._get_slots()
+        slots.acquire()
+        self.addCleanup(slots.release)
+
+        response = self.client.post('/api/v1/users/bulk_onboard/?dry_run=true', self.rows, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class FinancePdfDownloadTests(TestCase):
+    def setUp(self):
+        self.quotation = Quotation.objects.create(quotation_number='Q-PDF', client_name='Acme')
+        self.request = APIRequestFactory().get(f'/api/v1/quotations/{self.quotation.pk}/download/')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.rendered = f'{directory}/rendered.pdf'
+        with open(self.rendered, 'wb') as pdf:
+            pdf.write(b'%PDF-1.7')
+
+    def test_cache_file_pruned_after_lookup_is_rendered_again(self):
+        future = Future()
+        future.set_result(self.rendered)
+        with mock.patch.object(PdfCacheService, 'get', side_effect=['/missing/pruned.pdf', None]), \
+                mock.patch.object(pdf_render_pool, 'submit', return_value=future) as submit:
+            response = generate_finance_pdf(self.quotation, self.request)
+        self.assertEqual(response.status_code, 200)
+        submit.assert_called_once()
+        response.close()
+
+    def test_render_failure_is_logged_with_its_traceback(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        with mock.patch.object(PdfCacheService, 'get', return_value=None), \
+                mock.patch.object(pdf_render_pool, 'submit', return_value=future), \
+                self.assertLogs('crm.invoice_views', 'ERROR') as logs:
+            self.assertIsNone(generate_finance_pdf(self.quotation, self.request))
+        self.assertIn('BrokenProcessPool', logs.output[0])
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LeadViewSet, LeadIngestView, LeadDocumentViewSet, AccountViewSet, ContactViewSet, UserViewSet, DealViewSet, TaskViewSet, DashboardStatsView, NoteViewSet, NotificationViewSet, TeamsListView, ReportsView, ReminderViewSet, DailyActivityView, TechPipelineViewSet, RevenueStatsView
+from .views import LeadViewSet, LeadIngestView, LeadDocumentViewSet, AccountViewSet, ContactViewSet, UserViewSet, DealViewSet, TaskViewSet, DashboardStatsView, NoteViewSet, NotificationViewSet, TeamsListView, ReportsView, ReminderViewSet, DailyActivityView, TechPipelineViewSet, RevenueStatsView, RevenueLeaderboardView, NotificationStreamView, SchedulerStatusView, ExportJobViewSet, UploadSessionViewSet
 from .invoice_views import InvoiceViewSet, QuotationViewSet
 
 from rest_framework_simplejwt.views import (
@@ -22,13 +22,18 @@ router.register(r'reminders', ReminderViewSet, basename='reminder')
 router.register(r'tech-pipeline', TechPipelineViewSet)
 router.register(r'invoices', InvoiceViewSet, basename='invoice')
 router.register(r'quotations', QuotationViewSet, basename='quotation')
+router.register(r'export-jobs', ExportJobViewSet, basename='export-job')
+router.register(r'upload-sessions', UploadSessionViewSet, basename='upload-session')
 
 
 urlpatterns = [
+    path('notifications/stream/', NotificationStreamView.as_view(), name='notification-stream'),
     path('', include(router.urls)),
     path('ingest/', LeadIngestView.as_view(), name='ingest'),
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
     path('users/<int:pk>/revenue-stats/', RevenueStatsView.as_view(), name='revenue-stats'),
+    path('revenue/leaderboard/', RevenueLeaderboardView.as_view(), name='revenue-leaderboard'),
+    path('scheduler/jobs/', SchedulerStatusView.as_view(), name='scheduler-jobs'),
     path('reports/', ReportsView.as_view(), name='reports'),
     path('reports/daily-activities/', DailyActivityView.as_view(), name='daily-activities'),
     path('teams/', TeamsListView.as_view(), name='teams-list'),
@@ -1,7 +1,11 @@
 from django.template.loader import render_to_string
+from django.http import StreamingHttpResponse
 from django.conf import settings
 import weasyprint
 import tempfile
+import csv
+from datetime import datetime, timedelta
+from django.utils import timezone
 
 def generate_pdf(template_src, context_dict, request=None):
     """
@@ -24,3 +28,137 @@ def generate_pdf(template_src, context_dict, request=None):
     pdf_file = html.write_pdf()
     
     return pdf_file
+
+
+def local_day_range(start_date, end_date=None):
+    """
+    Half-open [start, end) aware datetimes covering whole local days.
+
+    Filtering a DateTimeField with __gte/__lt on these bounds can use an index
+    on the column, unlike __date which casts every row.
+
+    Args:
+        start_date (date): First day.
+        end_date (date): Last day, inclusive. Defaults to start_date.
+
+    Returns:
+        tuple: (range_start, range_end)
+    """
+    end_date = end_date or start_date
+    range_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return range_start, range_end
+
+
+class Echo:
+    """A file-like object that returns written values instead of buffering them."""
+
+    def write(self, value):
+        return value
+
+
+class ZipStreamBuffer:
+    """
+    Unseekable file object for zipfile.ZipFile that keeps written bytes until
+    drained, so an archive can be streamed entry by entry. ZipFile detects the
+    missing seek() and writes data descriptors instead of rewinding.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_csv_response(filename, headers, rows):
+    """
+    Build a StreamingHttpResponse that writes CSV rows as they are produced.
+
+    Args:
+        filename (str): Name offered to the browser for the download.
+        headers (list): Header row.
+        rows (iterable): Row sequences; ideally a lazy queryset iterator so
+            nothing is held in memory.
+
+    Returns:
+        StreamingHttpResponse: The CSV download.
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_xlsx(target, sheet_title, headers, rows):
+    """
+    Write rows to `target` (a path or binary file object) as a single-sheet
+    XLSX using openpyxl's write-only mode, which streams each row to the
+    worksheet XML instead of keeping cell objects in memory.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_title)
+    worksheet.append(headers)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(target)
+
+
+def write_csv(target, headers, rows):
+    """Write rows to `target`, a text file object opened with newline=''."""
+    writer = csv.writer(target)
+    writer.writerow(headers)
+    writer.writerows(rows)
+
+
+def xlsx_file_response(filename, sheet_title, headers, rows):
+    """
+    Build an XLSX download from rows using openpyxl's write-only mode.
+
+    Rows are written straight to the worksheet's XML stream instead of being
+    kept as cell objects, and the finished workbook is spooled to an anonymous
+    temporary file rather than a bytes buffer, so memory stays flat however
+    many rows there are. The file is removed when the response is closed.
+
+    Args:
+        filename (str): Name offered to the browser for the download.
+        sheet_title (str): Title of the single worksheet.
+        headers (list): Header row.
+        rows (iterable): Row sequences; ideally a lazy queryset iterator.
+
+    Returns:
+        FileResponse: The XLSX download.
+    """
+    from django.http import FileResponse
+
+    spool = tempfile.TemporaryFile()
+    write_xlsx(spool, sheet_title, headers, rows)
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -1,20 +1,31 @@
-from rest_framework import serializers, viewsets, status, permissions, filters, exceptions
+from rest_framework import serializers, viewsets, status, permissions, filters, exceptions, renderers
 import csv
-from django.http import HttpResponse
+import json
+import queue
+import re
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.db import connection as db_connection
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-import openpyxl
-from openpyxl import Workbook
+from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models.functions import TruncDay, TruncMonth, TruncYear, Coalesce
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncYear, Coalesce
 from django.db.models import Count, Sum, F, ExpressionWrapper, FloatField, Q, Prefetch
 from django.db import models
 from django.db.models import Count, Sum # Added aggregation imports
-from .models import Lead, LeadDocument, LeadStage, AuditLog, Team, User, Account, Contact, Deal, Task, Note, Notification, FollowUpReminder, TechPipeline, RevenueRecord
-from .services import TransitionService
+from .models import Lead, LeadDocument, UploadSession, LeadStage, AuditLog, Team, User, Account, Contact, Deal, Task, Note, Notification, FollowUpReminder, TechPipeline, TechPipelineStage, RevenueRecord, ExportJob
+from .services import TransitionService, RevenueService, ListQueryService, ExportJobService, OnboardingService, DocumentStorageService, UploadError, UploadOffsetMismatch, TechPipelineBoardService, TechPipelineAnalyticsService
+from .utils import stream_csv_response, xlsx_file_response, local_day_range
+from .exports import LEAD_EXPORT_COLUMNS, REMINDER_EXPORT_COLUMNS, TASK_EXPORT_COLUMNS, export_headers, export_rows
+from .audit_archive import AuditLogArchiveService
+from .password_hashing import HashingBusy
+from .authentication import ClaimsJWTAuthentication, StreamTicketAuthentication, issue_stream_ticket
+from .realtime import broker
+from .scheduler import SchedulerService, get_jobs
 from rbac.models import Role  # Move here to fix NameError in UserSerializer
+from rbac.engine import has_perm
 
 # --- Serializers ---
 
@@ -119,7 +130,7 @@ class LeadViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         user = self.request.user
-        if not (user.is_superuser or user.is_manager or getattr(user, 'can_create_leads', True)):
+        if not has_perm(user, 'leads.create'):
              raise permissions.PermissionDenied("You do not have permission to create leads.")
 
         # Duplicate phone check
@@ -193,74 +204,14 @@ class LeadViewSet(viewsets.ModelViewSet):
 
     def perform_destroy(self, instance):
         user = self.request.user
-        if not (user.is_superuser or user.is_manager or getattr(user, 'can_delete_leads', False)):
+        if not has_perm(user, 'leads.delete'):
              raise permissions.PermissionDenied("You do not have permission to delete leads.")
         instance.delete()
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Lead.objects.all()
-        
-        # RBAC: If not admin/manager/view_all, limit to assigned
-        if not (user.is_superuser or user.is_manager or getattr(user, 'view_all_leads', False)):
-            queryset = queryset.filter(assigned_to=user)
-
-        # Filters
-        status_param = self.request.query_params.get('status')
-        if status_param == 'open':
-            queryset = queryset.exclude(stage__in=['CLOSED', 'REJECTED'])
-        elif status_param == 'closed':
-            queryset = queryset.filter(stage__in=['CLOSED', 'REJECTED'])
-            
-        team_param = self.request.query_params.get('team')
-        if team_param:
-            queryset = queryset.filter(assigned_team=team_param)
-
-        # Unassigned Filter
-        unassigned_param = self.request.query_params.get('unassigned')
-        if unassigned_param == 'true':
-            queryset = queryset.filter(assigned_to__isnull=True)
-
-        # Assigned Filter
-        assigned_param = self.request.query_params.get('assigned')
-        if assigned_param == 'true':
-            queryset = queryset.filter(assigned_to__isnull=False)
-
-        # New Today Filter
-        new_today_param = self.request.query_params.get('new_today')
-        if new_today_param == 'true':
-            today = timezone.localdate()
-            start_of_today = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-            end_of_today = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-            queryset = queryset.filter(created_at__range=(start_of_today, end_of_today))
-
-        # Reminder Date Filter (DateField — simple exact match)
-        reminder_date_param = self.request.query_params.get('reminder_date')
-        if reminder_date_param:
-            try:
-                parsed_date = datetime.strptime(reminder_date_param, '%Y-%m-%d').date()
-                queryset = queryset.filter(reminder_date=parsed_date)
-            except ValueError:
-                pass # Ignore invalid date format
-
-        # Sorting
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering:
-            queryset = queryset.order_by(ordering)
-
-        # Search
-        search_query = self.request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                models.Q(first_name__icontains=search_query) |
-                models.Q(last_name__icontains=search_query) |
-                models.Q(email__icontains=search_query) |
-                models.Q(phone__icontains=search_query)
-            )
-
         # Optimise: fetch all related data in a few queries instead of N+1
         # This is a read-only optimisation — no data is written or changed.
-        queryset = queryset.select_related(
+        return self.filter_leads().select_related(
             'assigned_to',
             'lead_generator',
             'tech_pipeline',
@@ -269,67 +220,18 @@ class LeadViewSet(viewsets.ModelViewSet):
             Prefetch('audit_logs', queryset=AuditLog.objects.select_related('actor')),
         )
 
-        return queryset
+    def filter_leads(self):
+        """Leads visible to the user after the request's filters, search and ordering, without any eager loading"""
+        return ListQueryService.leads(self.request.user, self.request.query_params)
 
     @action(detail=False, methods=['get'])
     def export_xlsx(self, request):
         user = request.user
-        if not (user.is_superuser or user.is_manager or getattr(user, 'can_export_leads', False)):
+        if not has_perm(user, 'leads.export'):
              return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        queryset = self.get_queryset()
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Leads Export"
-        
-        # Headers
-        headers = [
-            'ID', 'Name', 'Company Name', 'Industry', 'Emirate', 'Address', 'Email',
-            'Phone Number', 'Status', 'Stage', 'Lead Generator',
-            'Assigned To', 'Created Date', 'Create Time',
-            'Service Requested', 'Follow up Reminder (latest)', 'Latest Update Date', 'Remarks',
-            'Location Link'
-        ]
-        ws.append(headers)
-        
-        for lead in queryset:
-            # Handle timezone
-            local_created_at = timezone.localtime(lead.created_at)
-            created_date = local_created_at.date().strftime('%Y-%m-%d')
-            created_time = local_created_at.time().strftime('%H:%M:%S')
-            
-            # Follow up reminder date (DateField - date only)
-            reminder_val = ''
-            if lead.reminder_date:
-                reminder_val = lead.reminder_date.strftime('%Y-%m-%d')
-
-            # Latest Update date (DateField - date only)
-            latest_update_val = ''
-            if lead.latest_update:
-                latest_update_val = lead.latest_update.strftime('%Y-%m-%d')
-
-            ws.append([
-                lead.id,
-                f"{lead.first_name} {lead.last_name}",
-                lead.company_name or '',
-                lead.industry or '',
-                lead.emirate or '',
-                lead.address or '',
-                lead.email or '',
-                lead.phone or '',
-                lead.status,
-                lead.stage,
-                f"{lead.lead_generator.first_name} {lead.lead_generator.last_name}" if lead.lead_generator and getattr(lead.lead_generator, 'first_name', None) else (lead.lead_generator.username if lead.lead_generator else ''),
-                f"{lead.assigned_to.first_name} {lead.assigned_to.last_name}" if lead.assigned_to and getattr(lead.assigned_to, 'first_name', None) else (lead.assigned_to.username if lead.assigned_to else ''),
-                created_date,
-                created_time,
-                lead.tech_requirements or '',
-                reminder_val,
-                latest_update_val,
-                lead.remarks or '',
-                lead.created_location_link or ''
-            ])
+        # Only the exported columns, streamed in chunks: no prefetches, no model instances
+        rows = export_rows(self.filter_leads(), LEAD_EXPORT_COLUMNS)
         
         # Determine dynamic filename
         is_new_today = request.query_params.get('new_today') == 'true'
@@ -337,20 +239,24 @@ class LeadViewSet(viewsets.ModelViewSet):
         date_str = timezone.now().strftime('%Y-%m-%d')
         filename = f"{base_name} - {date_str}.xlsx"
         
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        wb.save(response)
-        
-        return response
+        return xlsx_file_response(filename, "Leads Export", export_headers(LEAD_EXPORT_COLUMNS), rows)
+
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """Same rows and filters as export_xlsx, streamed as CSV while the query runs"""
+        user = request.user
+        if not has_perm(user, 'leads.export'):
+             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        base_name = "new leads" if request.query_params.get('new_today') == 'true' else "all leads"
+        filename = f"{base_name} - {timezone.now():%Y-%m-%d}.csv"
+        rows = export_rows(self.filter_leads(), LEAD_EXPORT_COLUMNS)
+        return stream_csv_response(filename, export_headers(LEAD_EXPORT_COLUMNS), rows)
 
 
     @action(detail=False, methods=['post'])
     def bulk_assign(self, request):
-        is_manager = getattr(request.user, 'is_manager', False)
-        is_superuser = getattr(request.user, 'is_superuser', False)
-        if not (is_manager or is_superuser):
+        if not has_perm(request.user, 'leads.assign'):
              return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
         lead_ids = request.data.get('lead_ids', [])
@@ -380,6 +286,49 @@ class LeadViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        Activity history for a lead. Archived months (see archive_audit_logs) are
+        only read when explicitly requested with ?include_archived=true, optionally
+        narrowed with ?archived_months=2025-01,2025-02.
+        """
+        lead = self.get_object()
+        live_logs = AuditLog.objects.filter(lead=lead).select_related('actor').order_by('-timestamp')
+        entries = [(log.timestamp, dict(AuditLogSerializer(log).data, archived=False)) for log in live_logs]
+
+        if request.query_params.get('include_archived') == 'true':
+            months = None
+            months_param = request.query_params.get('archived_months')
+            if months_param:
+                months = []
+                for value in months_param.split(','):
+                    match = re.fullmatch(r'(\d{4})-(\d{2})', value.strip())
+                    if not match or not 1 <= int(match.group(2)) <= 12:
+                        return Response({'error': 'Invalid archived_months. Use YYYY-MM,YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+                    months.append((int(match.group(1)), int(match.group(2))))
+
+            archived = list(AuditLogArchiveService.read_archived(lead_id=lead.id, months=months))
+            actor_names = dict(User.objects.filter(
+                id__in={record['actor_id'] for record in archived if record['actor_id']}
+            ).values_list('id', 'username'))
+            for record in archived:
+                entries.append((record['timestamp'], {
+                    'id': record['id'],
+                    'lead': record['lead_id'],
+                    'actor': record['actor_id'],
+                    'actor_name': actor_names.get(record['actor_id']),
+                    'action': record['action'],
+                    'from_stage': record['from_stage'],
+                    'to_stage': record['to_stage'],
+                    'timestamp': record['timestamp'],
+                    'notes': record['notes'],
+                    'archived': True,
+                }))
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        return Response([entry for _, entry in entries])
+
     @action(detail=True, methods=['post'])
     def transition(self, request, pk=None):
         lead = self.get_object()
@@ -397,7 +346,7 @@ class LeadViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
         # Only Managers or Team Leads should assign
-        if not getattr(request.user, 'is_manager', False):
+        if not has_perm(request.user, 'leads.assign'):
              return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
         lead = self.get_object()
@@ -424,8 +373,8 @@ class LeadViewSet(viewsets.ModelViewSet):
         user = request.user
         lead = self.get_object()
         
-        # Check permissions - must be assigned, manager, or superuser
-        if not (user.is_superuser or user.is_manager or lead.assigned_to == user):
+        # Check permissions - must be assigned or allowed to edit any lead
+        if not (lead.assigned_to == user or has_perm(user, 'leads.edit_all')):
              return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
         new_date_str = request.data.get('reminder_date')
@@ -490,10 +439,97 @@ class LeadDocumentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         file_obj = self.request.data.get('file_path')
         if file_obj:
-            serializer.save(name=file_obj.name)
+            # Stored once per content (DocumentBlob); large files should use upload-sessions instead
+            blob = DocumentStorageService.store_upload(file_obj)
+            serializer.save(name=file_obj.name, blob=blob, file_path=blob.path)
         else:
             serializer.save()
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+    document = LeadDocumentSerializer(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'lead', 'name', 'size', 'sha256', 'offset', 'chunk_size', 'status', 'document',
+            'error', 'created_at', 'expires_at',
+        ]
+        read_only_fields = ['offset', 'status', 'error', 'created_at', 'expires_at']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_MAX_BYTES
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.DOCUMENT_MAX_BYTES:
+            raise serializers.ValidationError(f'size must be between 1 and {settings.DOCUMENT_MAX_BYTES} bytes')
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('sha256 must be 64 hex digits')
+        return value
+
+class UploadSessionViewSet(viewsets.ModelViewSet):
+    """
+    Chunked, resumable document uploads:
+      1. POST {lead, name, size, sha256?} opens a session. If the declared
+         SHA-256 is already stored, the document is attached at once and the
+         session comes back COMPLETE.
+      2. PUT chunk/ with the raw bytes and an Upload-Offset header equal to
+         the session's offset, at most chunk_size bytes each. The chunk that
+         completes the file returns the session with its document.
+      3. After a dropped connection, GET the session for the offset to resume
+         from. A chunk sent at the wrong offset gets 409 with the offset.
+    DELETE cancels a session. Unfinished sessions expire after UPLOAD_SESSION_TTL_HOURS.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'put', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(created_by=self.request.user).select_related('document')
+
+    def update(self, request, *args, **kwargs):
+        return Response({'error': 'Send chunks to chunk/'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        session = DocumentStorageService.start_session(
+            request.user, data['lead'], data['name'], data['size'], data.get('sha256', ''),
+        )
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        DocumentStorageService.delete_session(instance)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset and Content-Length headers are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+            return Response({'error': f'Chunks are limited to {settings.UPLOAD_CHUNK_MAX_BYTES} bytes'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            session = DocumentStorageService.append_chunk(session.pk, offset, request.stream, length)
+        except UploadOffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if session.status == UploadSession.Status.FAILED:
+            return Response(self.get_serializer(session).data, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(self.get_serializer(session).data)
+
 class NoteSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
     author_full_name = serializers.SerializerMethodField(read_only=True)
@@ -549,7 +585,7 @@ class AccountViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.is_manager:
+        if has_perm(user, 'records.view_all'):
             return Account.objects.all()
         return Account.objects.filter(owner=user)
     
@@ -563,7 +599,7 @@ class ContactViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.is_manager:
+        if has_perm(user, 'records.view_all'):
             return Contact.objects.all()
         return Contact.objects.filter(owner=user)
 
@@ -582,7 +618,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         # Start with base queryset based on permissions
-        if user.is_superuser or user.is_manager:
+        if has_perm(user, 'users.manage'):
             queryset = User.objects.all()
         else:
             queryset = User.objects.filter(id=user.id)
@@ -595,7 +631,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return queryset.order_by('username')
 
     def destroy(self, request, *args, **kwargs):
-        if not (request.user.is_superuser or request.user.team == 'ADMIN'):
+        if not has_perm(request.user, 'users.delete'):
             raise exceptions.PermissionDenied("Only the Admin team can delete users.")
         return super().destroy(request, *args, **kwargs)
 
@@ -606,7 +642,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def onboard(self, request):
-        if not (request.user.is_superuser or request.user.is_manager):
+        if not has_perm(request.user, 'users.manage'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
             
         full_name = request.data.get('full_name', '')
@@ -642,9 +678,60 @@ class UserViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def bulk_onboard(self, request):
+        """
+        Onboards many users at once from an uploaded `file` (.csv or .json), a
+        JSON list / {"users": [...]}, or CSV text in `csv`. Columns: username,
+        email, team, full_name (or first_name/last_name), is_manager, roles
+        (separated by ';'), password. Returns a result per row; ?dry_run=true
+        only validates.
+        """
+        if not has_perm(request.user, 'users.manage'):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                text = upload.read().decode('utf-8-sig')
+                if upload.name.lower().endswith('.json'):
+                    rows = OnboardingService.parse_json(json.loads(text))
+                else:
+                    rows = OnboardingService.parse_csv(text)
+            elif isinstance(request.data, dict) and 'csv' in request.data:
+                rows = OnboardingService.parse_csv(request.data['csv'])
+            else:
+                rows = OnboardingService.parse_json(request.data)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': f'Could not read users: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not rows:
+            return Response({'error': 'No users given'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_ONBOARD_MAX_ROWS:
+            return Response({'error': f'At most {settings.BULK_ONBOARD_MAX_ROWS} users per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.query_params.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        default_password = request.data.get('default_password') if isinstance(request.data, dict) else None
+        try:
+            results = OnboardingService.onboard(rows, default_password=default_password, dry_run=dry_run)
+        except HashingBusy:
+            response = Response({'error': 'Another bulk onboarding is in progress. Try again shortly.'},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(settings.BULK_ONBOARD_RETRY_AFTER)
+            return response
+        created = sum(result['status'] == 'created' for result in results)
+        failed = sum(result['status'] == 'error' for result in results)
+        if dry_run:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'failed': failed, 'results': results}, status=response_status)
+
     @action(detail=False, methods=['post'])
     def change_password(self, request):
-        user = request.user
+        # The authenticated user may be a read-only ClaimsUser; writes need the real row
+        user = User.objects.get(pk=request.user.pk)
         old_password = request.data.get('old_password')
         new_password = request.data.get('new_password')
         confirm_password = request.data.get('confirm_password')
@@ -670,7 +757,7 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Admin only: Update the revenue threshold for a specific user.
         """
-        if not (request.user.is_superuser or request.user.is_manager):
+        if not has_perm(request.user, 'users.manage'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
             
         user = self.get_object()
@@ -701,7 +788,7 @@ class DashboardStatsView(APIView):
             cache.set(cache_key, stagnant_count, 3600)  # Cache for 1 hour
 
         # Define base querysets based on RBAC
-        if user.is_superuser or user.is_manager:
+        if has_perm(user, 'records.view_all'):
             leads = Lead.objects.all()
             deals = Deal.objects.all()
             tasks = Task.objects.all()
@@ -788,7 +875,7 @@ class DealViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.is_manager:
+        if has_perm(user, 'records.view_all'):
             return Deal.objects.all()
         return Deal.objects.filter(owner=user)
 
@@ -801,25 +888,22 @@ class TaskViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        owner_id = self.request.query_params.get('owner')
-        if owner_id:
-            return Task.objects.filter(owner_id=owner_id)
-        
-        lead_id = self.request.query_params.get('lead')
-        if lead_id:
-            return Task.objects.filter(lead_id=lead_id)
-
-        # Default: Show only tasks assigned to the user
-        return Task.objects.filter(owner=user)
+        return ListQueryService.tasks(self.request.user, self.request.query_params)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """The tasks this list would show (same ?owner / ?lead filters), streamed as CSV"""
+        rows = export_rows(self.get_queryset().order_by('deadline', 'id'), TASK_EXPORT_COLUMNS)
+        filename = f"tasks - {timezone.now():%Y-%m-%d}.csv"
+        return stream_csv_response(filename, export_headers(TASK_EXPORT_COLUMNS), rows)
+
     @action(detail=True, methods=['post'])
     def send_reminder(self, request, pk=None):
         """Admin action to send a reminder notification to the task owner."""
-        if not (request.user.is_superuser or request.user.is_manager):
+        if not has_perm(request.user, 'tasks.send_reminder'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
         task = self.get_object()
@@ -843,7 +927,7 @@ class ReportsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        if not (request.user.is_superuser or request.user.is_manager):
+        if not has_perm(request.user, 'reports.view'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
         timeframe = request.query_params.get('timeframe', 'monthly')
@@ -1024,24 +1108,41 @@ class ReportsView(APIView):
 class DailyActivityView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    EXPORT_HEADERS = ['ID', 'Lead ID', 'Lead Name', 'From Stage', 'To Stage', 'Actor', 'Timestamp', 'Notes']
+
     def get(self, request):
-        if not (request.user.is_superuser or request.user.is_manager):
+        if not has_perm(request.user, 'reports.view'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
+        # Either a single ?date= or an inclusive ?start_date=&end_date= range
+        today_str = timezone.localdate().strftime('%Y-%m-%d')
         date_str = request.query_params.get('date')
-        if not date_str:
-            date_str = timezone.now().strftime('%Y-%m-%d')
-        
+        start_str = request.query_params.get('start_date') or date_str or today_str
+        end_str = request.query_params.get('end_date') or date_str or start_str
+
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
         except ValueError:
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch Audit Logs for that day (Lead Stage Changes)
+        if end_date < start_date:
+            return Response({'error': 'end_date must not be before start_date'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Half-open range on the raw column so the (action, timestamp) index is used;
+        # timestamp__date would wrap the column in a cast.
+        range_start, range_end = local_day_range(start_date, end_date)
+
         activities = AuditLog.objects.filter(
-            timestamp__date=date,
-            action='Stage Change'
-        ).select_related('lead', 'actor').order_by('-timestamp')
+            action='Stage Change',
+            timestamp__gte=range_start,
+            timestamp__lt=range_end,
+        ).order_by('-timestamp')
+
+        if request.query_params.get('export') == 'true':
+            return self.export_csv(activities, start_date, end_date)
+
+        activities = activities.select_related('lead', 'actor')
 
         data = []
         for activity in activities:
@@ -1059,10 +1160,35 @@ class DailyActivityView(APIView):
         
         return Response(data)
 
+    def export_csv(self, activities, start_date, end_date):
+        # values_list + iterator() streams from a server-side cursor without building model instances
+        rows = activities.values_list(
+            'id', 'lead_id', 'lead__first_name', 'lead__last_name',
+            'from_stage', 'to_stage', 'actor__username', 'timestamp', 'notes',
+        ).iterator(chunk_size=2000)
+
+        def format_rows():
+            for pk, lead_id, first_name, last_name, from_stage, to_stage, actor, timestamp, notes in rows:
+                lead_name = f"{first_name or ''} {last_name or ''}".strip()
+                yield [
+                    pk,
+                    lead_id,
+                    lead_name or 'Unnamed Lead',
+                    from_stage or '',
+                    to_stage or '',
+                    actor or 'System',
+                    timezone.localtime(timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+                    notes or '',
+                ]
+
+        if start_date == end_date:
+            filename = f"daily activities - {start_date:%Y-%m-%d}.csv"
+        else:
+            filename = f"daily activities - {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}.csv"
+        return stream_csv_response(filename, self.EXPORT_HEADERS, format_rows())
+
     def post(self, request):
-        # Handle Export (using POST or GET with 'export' param, let's use a separate endpoint or param? 
-        # Plan said endpoint. Let's support export via GET with ?export=true for simplicity in downloading)
-        # Re-implementing logic in GET because browser download is easier with GET
+        # Exports are served by GET with ?export=true so the browser can download directly
         return Response({'message': 'Use GET with ?export=true'})
 
 
@@ -1093,70 +1219,61 @@ class RevenueStatsView(APIView):
         target_user_id = int(pk) if pk else user.id
         
         # Access Control: Only admins or the user themselves can view stats
-        if target_user_id != user.id and not (user.is_superuser or user.is_manager):
+        if target_user_id != user.id and not has_perm(user, 'reports.view'):
              return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-             
-        try:
-            target_user = User.objects.get(id=target_user_id)
-        except User.DoesNotExist:
+
+        months = RevenueService.month_window(timezone.localdate())
+        target_user = RevenueService.with_monthly_revenue(User.objects.filter(id=target_user_id), months).first()
+        if target_user is None:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-        today = timezone.localdate()
-        current_month = today.month
-        current_year = today.year
-        
-        # 1. Current Month Revenue
-        current_month_revenue = RevenueRecord.objects.filter(
-            user=target_user,
-            month=current_month,
-            year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0.00
-        
-        # 2. Threshold
-        threshold = float(target_user.revenue_threshold)
-        
-        # 3. Progress
-        progress_percentage = (float(current_month_revenue) / threshold * 100) if threshold > 0 else 0
-        if progress_percentage > 100:
-            progress_percentage = 100
-        elif progress_percentage < 0:
-            progress_percentage = 0
-            
-        # 4. Incentive (10% if threshold met)
-        incentive_eligibility = float(current_month_revenue) >= threshold
-        incentive_amount = float(current_month_revenue) * 0.10 if incentive_eligibility else 0.00
-        
-        # 5. Monthly Breakdown (Last 6 months)
-        monthly_stats = []
-        for i in range(5, -1, -1):
-            date = today - timedelta(days=i*30) # Approx
-            m = date.month
-            y = date.year
-            revenue = RevenueRecord.objects.filter(
-                user=target_user,
-                month=m,
-                year=y
-            ).aggregate(total=Sum('amount'))['total'] or 0.00
-            
-            monthly_stats.append({
-                'month': date.strftime('%b'),
-                'year': y,
-                'revenue': revenue
+
+        return Response(RevenueService.summarize(target_user, months))
+
+class RevenueLeaderboardView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Revenue stats for every active user (optionally ?team=SALES) in one grouped query,
+        ranked by current month revenue.
+        """
+        if not has_perm(request.user, 'reports.view'):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        users = User.objects.filter(is_active=True)
+        team_param = request.query_params.get('team')
+        if team_param:
+            users = users.filter(team=team_param)
+
+        months = RevenueService.month_window(timezone.localdate())
+        users = RevenueService.with_monthly_revenue(users, months).order_by(f'-revenue_{len(months) - 1}', 'username')
+
+        data = []
+        for rank, target_user in enumerate(users, start=1):
+            entry = RevenueService.summarize(target_user, months)
+            entry.update({
+                'rank': rank,
+                'full_name': f"{target_user.first_name} {target_user.last_name}".strip(),
+                'team': target_user.team,
             })
-            
-        data = {
-            'username': target_user.username,
-            'current_month_revenue': current_month_revenue,
-            'threshold': threshold,
-            'progress_percentage': round(progress_percentage, 1),
-            'incentive_amount': round(incentive_amount, 2),
-            'target_met': incentive_eligibility,
-            'monthly_history': monthly_stats
-        }
-        
+            data.append(entry)
+
         return Response(data)
 
 
+class SchedulerStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Registered periodic jobs with their schedule, next run and the outcome of the last run.
+        """
+        if not has_perm(request.user, 'scheduler.view'):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response(SchedulerService.job_status(get_jobs()))
+
+
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
@@ -1181,6 +1298,60 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def unread_count(self, request):
         count = Notification.objects.filter(recipient=request.user, is_read=False).count()
         return Response({'count': count})
+
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """A short-lived ?ticket= for opening the notification stream, so the access token stays out of URLs"""
+        return Response({'ticket': issue_stream_ticket(request.user)})
+class EventStreamRenderer(renderers.BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode()
+
+class NotificationStreamView(APIView):
+    """
+    Server-Sent Events feed of new notifications and unread counts for the current user.
+    Events are pushed by Postgres LISTEN/NOTIFY (see crm.realtime), so an idle
+    stream costs no queries; a comment line is sent as a keep-alive.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication, StreamTicketAuthentication]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
+    HEARTBEAT_SECONDS = 15
+
+    def get(self, request):
+        user_id = request.user.id
+
+        def stream():
+            # Subscribe before counting so nothing published in between is missed
+            events = broker.subscribe(user_id)
+            try:
+                unread_count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+                # Don't pin a database connection for the lifetime of the stream
+                db_connection.close()
+                yield "retry: 5000\n\n"
+                yield self.format_event('unread_count', {'unread_count': unread_count})
+                while True:
+                    try:
+                        payload = events.get(timeout=self.HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield self.format_event(payload.get('event', 'notification'), payload)
+            finally:
+                broker.unsubscribe(user_id, events)
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+        return response
+
+    @staticmethod
+    def format_event(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
 class TeamsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -1194,7 +1365,7 @@ class FollowUpReminderSerializer(serializers.ModelSerializer):
     class Meta:
         model = FollowUpReminder
         fields = '__all__'
-        read_only_fields = ['created_at', 'completed_at']
+        read_only_fields = ['created_at', 'completed_at', 'notified_at']
 
 class ReminderViewSet(viewsets.ModelViewSet):
     queryset = FollowUpReminder.objects.all()
@@ -1202,44 +1373,18 @@ class ReminderViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        qs = FollowUpReminder.objects.all()
-        
-        # Managers see all, others see assigned
-        if not (user.is_superuser or user.is_manager):
-            qs = qs.filter(assigned_to=user)
-            
-        # Filters
-        status_param = self.request.query_params.get('status')
-        if status_param:
-            if status_param != 'all':
-                qs = qs.filter(status=status_param)
-
-        filter_param = self.request.query_params.get('filter')
-        # Use localdate to correctly handle timezone
-        today = timezone.localdate()
-        if filter_param == 'today':
-            qs = qs.filter(due_date__date=today)
-        elif filter_param == 'overdue':
-             qs = qs.filter(due_date__lt=timezone.now())
-        elif filter_param == 'upcoming':
-             qs = qs.filter(due_date__gt=timezone.now())
-        elif filter_param == 'completed':
-             qs = qs.filter(status='COMPLETED')
-
-        date_param = self.request.query_params.get('date')
-        if date_param:
-            try:
-                target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
-                qs = qs.filter(due_date__date=target_date)
-            except ValueError:
-                pass
-            
-        return qs.order_by('due_date')
+        return ListQueryService.reminders(self.request.user, self.request.query_params)
 
     def perform_create(self, serializer):
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """The reminders this list would show (same ?status / ?filter / ?date filters), streamed as CSV"""
+        rows = export_rows(self.get_queryset(), REMINDER_EXPORT_COLUMNS)
+        filename = f"reminders - {timezone.now():%Y-%m-%d}.csv"
+        return stream_csv_response(filename, export_headers(REMINDER_EXPORT_COLUMNS), rows)
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         reminder = self.get_object()
@@ -1264,30 +1409,76 @@ class ReminderViewSet(viewsets.ModelViewSet):
         reminder.save()
         return Response({'message': 'Reminder dismissed'})
 
+    def scoped_reminders(self):
+        return ListQueryService.scoped_reminders(self.request.user)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        user = self.request.user
-        qs = FollowUpReminder.objects.all()
-        if not (user.is_superuser or user.is_manager):
-             qs = qs.filter(assigned_to=user)
-        
-        today = timezone.localdate()
-        
-        total_pending = qs.filter(status='PENDING').count()
-        unread_count = qs.filter(status='PENDING', is_read=False).count()
-        overdue = qs.filter(status='PENDING', due_date__lt=timezone.now()).count()
-        today_count = qs.filter(status='PENDING', due_date__date=today).count()
-        upcoming = qs.filter(status='PENDING', due_date__gt=timezone.now()).count()
-        completed = qs.filter(status='COMPLETED').count()
-        
-        return Response({
-            'total_pending': total_pending,
-            'unread_count': unread_count,
-            'overdue': overdue,
-            'today': today_count,
-            'upcoming': upcoming,
-            'completed': completed
-        })
+        qs = self.scoped_reminders()
+        now = timezone.now()
+        today_start, today_end = local_day_range(timezone.localdate())
+
+        # One pass over the user's reminders instead of a count() per figure
+        pending = Q(status='PENDING')
+        stats = qs.aggregate(
+            total_pending=Count('id', filter=pending),
+            unread_count=Count('id', filter=pending & Q(is_read=False)),
+            overdue=Count('id', filter=pending & Q(due_date__lt=now)),
+            today=Count('id', filter=pending & Q(due_date__gte=today_start, due_date__lt=today_end)),
+            upcoming=Count('id', filter=pending & Q(due_date__gt=now)),
+            completed=Count('id', filter=Q(status='COMPLETED')),
+        )
+        return Response(stats)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Per-day pending/overdue/completed counts for one month (?month=YYYY-MM,
+        default current), grouped by local due date in a single query.
+        Managers may narrow it to one user with ?assigned_to=<id>.
+        """
+        month_param = request.query_params.get('month')
+        try:
+            month_start = datetime.strptime(month_param, '%Y-%m').date() if month_param else timezone.localdate().replace(day=1)
+        except ValueError:
+            return Response({'error': 'Invalid month format. Use YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        range_start, range_end = local_day_range(month_start, next_month - timedelta(days=1))
+
+        qs = self.scoped_reminders().filter(due_date__gte=range_start, due_date__lt=range_end)
+        assigned_to = request.query_params.get('assigned_to')
+        if assigned_to:
+            try:
+                qs = qs.filter(assigned_to_id=int(assigned_to))
+            except ValueError:
+                return Response({'error': 'Invalid assigned_to. Use a user id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        rows = (
+            qs.annotate(day=TruncDate('due_date', tzinfo=timezone.get_current_timezone()))
+            .values('day')
+            .annotate(
+                pending=Count('id', filter=Q(status='PENDING', due_date__gte=now)),
+                overdue=Count('id', filter=Q(status='PENDING', due_date__lt=now)),
+                completed=Count('id', filter=Q(status='COMPLETED')),
+            )
+            .order_by('day')
+        )
+        by_day = {row['day']: row for row in rows}
+
+        days = []
+        day = month_start
+        while day < next_month:
+            row = by_day.get(day, {})
+            days.append({
+                'date': day.isoformat(),
+                'pending': row.get('pending', 0),
+                'overdue': row.get('overdue', 0),
+                'completed': row.get('completed', 0),
+            })
+            day += timedelta(days=1)
+
+        return Response({'month': month_start.strftime('%Y-%m'), 'days': days})
 
 class TechPipelineViewSet(viewsets.ModelViewSet):
     queryset = TechPipeline.objects.all()
@@ -1300,18 +1491,84 @@ class TechPipelineViewSet(viewsets.ModelViewSet):
         return super().paginate_queryset(queryset)
 
     def get_queryset(self):
-        user = self.request.user
-        # Logic: Visible to Tech login, Admin login, or users with view_tech_pipeline permission
-        if (
-            user.is_superuser or 
-            user.is_manager or 
-            getattr(user, 'team', 'SALES') in [Team.ADMIN, Team.TECH] or 
-            getattr(user, 'view_tech_pipeline', False) or 
-            getattr(user, 'manage_tech_pipeline', False)
-        ):
-            return TechPipeline.objects.all().order_by('-updated_at')
+        if self.can_view(self.request.user):
+            return TechPipeline.objects.select_related('lead').order_by('-updated_at')
         return TechPipeline.objects.none()
 
+    def can_view(self, user):
+        # Logic: Visible to Tech login, Admin login, or users with view_tech_pipeline permission
+        return has_perm(user, 'tech_pipeline.view')
+
+    @action(detail=False, methods=['get'], url_path='stage-analytics')
+    def stage_analytics(self, request):
+        """
+        Average, median and p90 time spent in each stage, from the stage history.
+        ?group_by=assignee splits it per lead owner; ?since=YYYY-MM-DD limits to
+        intervals entered since then; ?include_open=false ignores current stages.
+        """
+        if not self.can_view(request.user):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        since = None
+        since_param = request.query_params.get('since')
+        if since_param:
+            try:
+                since, _ = local_day_range(datetime.strptime(since_param, '%Y-%m-%d').date())
+            except ValueError:
+                return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.query_params.get('group_by', 'stage')
+        if group_by not in ('stage', 'assignee'):
+            return Response({'error': 'group_by must be stage or assignee'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = TechPipelineAnalyticsService.stage_durations(
+            since=since,
+            group_by_assignee=group_by == 'assignee',
+            include_open=request.query_params.get('include_open', 'true') != 'false',
+        )
+        return Response({'group_by': group_by, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def board(self, request):
+        """
+        Kanban board: pipelines grouped by stage with per-column counts.
+        Each column holds the ?limit= most recently updated cards (default 20)
+        and a next_cursor; pass ?stage=<STAGE>&cursor=<next_cursor> to load
+        more of one column.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', TechPipelineBoardService.DEFAULT_LIMIT)),
+                        TechPipelineBoardService.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        stage = request.query_params.get('stage')
+        if stage:
+            if stage not in TechPipelineStage.values:
+                return Response({'error': f'Unknown stage {stage}'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                columns = {stage: TechPipelineBoardService.column(queryset, stage, limit, request.query_params.get('cursor'))}
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            columns = TechPipelineBoardService.board(queryset, limit)
+
+        return Response({
+            'columns': [
+                {
+                    'stage': column_stage,
+                    'label': TechPipelineStage(column_stage).label,
+                    'count': count,
+                    'results': TechPipelineSerializer(cards, many=True).data,
+                    'next_cursor': next_cursor,
+                }
+                for column_stage, (count, cards, next_cursor) in columns.items()
+            ]
+        })
+
     def perform_create(self, serializer):
         # Usually created via Signal, but if manual:
         if not self.can_edit(self.request.user):
@@ -1324,9 +1581,66 @@ class TechPipelineViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def can_edit(self, user):
-        return (
-            user.is_superuser or 
-            user.is_manager or 
-            getattr(user, 'team', 'SALES') in [Team.ADMIN, Team.TECH] or 
-            getattr(user, 'manage_tech_pipeline', False)
-        )
+        return has_perm(user, 'tech_pipeline.manage')
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'kind', 'format', 'params', 'status', 'total_rows', 'processed_rows', 'progress',
+            'filename', 'error', 'created_at', 'started_at', 'finished_at', 'expires_at',
+        ]
+        read_only_fields = [
+            'status', 'total_rows', 'processed_rows', 'filename', 'error',
+            'created_at', 'started_at', 'finished_at', 'expires_at',
+        ]
+
+    def get_progress(self, obj):
+        if obj.status == ExportJob.Status.SUCCESS:
+            return 100
+        if not obj.total_rows:
+            return 0
+        return min(99, obj.processed_rows * 100 // obj.total_rows)
+
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('params must be an object of list filters')
+        return {key: str(param) for key, param in value.items()}
+
+class ExportJobViewSet(viewsets.ModelViewSet):
+    """
+    Background exports: POST {kind, format, params} to queue one, poll it
+    until status is SUCCESS, then GET download/. Files expire after
+    EXPORT_JOB_TTL_HOURS; DELETE removes a job (and stops it if running).
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(requested_by=self.request.user)
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        if serializer.validated_data['kind'] == ExportJob.Kind.LEADS and not has_perm(user, 'leads.export'):
+            raise permissions.PermissionDenied("You do not have permission to export leads.")
+        serializer.save(requested_by=user)
+
+    def perform_destroy(self, instance):
+        ExportJobService.delete(instance)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status == ExportJob.Status.EXPIRED:
+            return Response({'error': 'This export has expired'}, status=status.HTTP_410_GONE)
+        if job.status != ExportJob.Status.SUCCESS:
+            return Response({'error': 'Export is not ready', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        try:
+            file = open(ExportJobService.absolute_path(job.file_path), 'rb')
+        except FileNotFoundError:
+            return Response({'error': 'This export has expired'}, status=status.HTTP_410_GONE)
+        return FileResponse(file, as_attachment=True, filename=job.filename)
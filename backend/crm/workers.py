@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    """Raised when too many renders are already queued."""
+
+
+def _init_render_worker():
+    """Runs once in each pool process: set up Django and warm the PDF renderer."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from .pdf_rendering import get_renderer
+    get_renderer()
+
+
+def render_to_cache(key, context):
+    """
+    Pool task: renders a finance PDF into the content-addressed cache and
+    returns its path. Writing the file here (not in the request thread)
+    means a render the client stopped waiting for still lands in the cache.
+    """
+    from .pdf_cache import PdfCacheService
+    from .pdf_rendering import get_renderer
+
+    path = PdfCacheService.get(key)
+    if path is None:
+        path = PdfCacheService.put(key, get_renderer().render(context))
+    return path
+
+
+class PdfRenderPool:
+    """
+    Per-process pool of warm WeasyPrint renderer processes, so CPU-bound PDF
+    rendering never runs in (or holds the GIL of) a request thread.
+
+    Renders are deduplicated by cache key: concurrent downloads of the same
+    document share one future. At most PDF_RENDER_MAX_PENDING renders may be
+    queued or running; beyond that submit() raises PoolBusy.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a process full of request threads can inherit held locks
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_render_worker,
+            )
+        return self._executor
+
+    def submit(self, key, context):
+        """Returns a future resolving to the cached PDF path."""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            if len(self._pending) >= settings.PDF_RENDER_MAX_PENDING:
+                raise PoolBusy()
+
+            try:
+                future = self._get_executor().submit(render_to_cache, key, context)
+            except BrokenProcessPool:
+                logger.warning("PDF render pool was broken; starting a new one")
+                self._executor = None
+                future = self._get_executor().submit(render_to_cache, key, context)
+
+            self._pending[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+
+pdf_render_pool = PdfRenderPool()
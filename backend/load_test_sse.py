@@ -0,0 +1,124 @@
+"""
+Load test for the notification SSE endpoint.
+
+Opens N concurrent idle EventSource-style connections against a running
+server, holds them open, and reports:
+  * how many connected and received their initial unread count
+  * database transactions committed while the streams were idle
+  * fan-out latency when one notification is inserted for the test user
+
+Usage (from the backend container, against the gunicorn server):
+    python load_test_sse.py --url http://localhost:8000 --connections 300 --idle 60
+"""
+import argparse
+import http.client
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.db import connection
+from crm.authentication import issue_stream_ticket
+from crm.models import Notification, User
+
+
+def open_stream(url, ticket, results, index, ready, received_push, stop):
+    parsed = urlparse(url)
+    conn_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+    conn = conn_class(parsed.hostname, parsed.port, timeout=None)
+    try:
+        conn.request('GET', f'/api/v1/notifications/stream/?ticket={ticket}', headers={'Accept': 'text/event-stream'})
+        response = conn.getresponse()
+        if response.status != 200:
+            results[index] = f'HTTP {response.status}'
+            return
+        results[index] = 'connected'
+        ready.release()
+
+        event = None
+        while not stop.is_set():
+            line = response.readline()
+            if not line:
+                results[index] = 'closed by server'
+                return
+            line = line.decode().strip()
+            if line.startswith('event:'):
+                event = line.split(':', 1)[1].strip()
+            elif line.startswith('data:') and event == 'notification':
+                received_push[index] = time.monotonic()
+    except Exception as exc:
+        results[index] = f'error: {exc}'
+    finally:
+        conn.close()
+
+
+def committed_transactions():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT xact_commit FROM pg_stat_database WHERE datname = current_database()")
+        return cursor.fetchone()[0]
+
+
+def run(url, connections_count, idle_seconds, username):
+    user = User.objects.get(username=username) if username else User.objects.filter(is_active=True).first()
+    ticket = issue_stream_ticket(user)
+    print(f"Opening {connections_count} streams for {user.username} against {url}")
+
+    results = [None] * connections_count
+    received_push = [None] * connections_count
+    ready = threading.Semaphore(0)
+    stop = threading.Event()
+    threads = []
+
+    started = time.monotonic()
+    for index in range(connections_count):
+        thread = threading.Thread(
+            target=open_stream,
+            args=(url, ticket, results, index, ready, received_push, stop),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+
+    connected = 0
+    deadline = time.monotonic() + 60
+    while connected < connections_count and time.monotonic() < deadline:
+        if ready.acquire(timeout=1):
+            connected += 1
+    print(f"[1] {connected}/{connections_count} streams connected in {time.monotonic() - started:.2f}s")
+
+    before = committed_transactions()
+    print(f"[2] Holding streams idle for {idle_seconds}s...")
+    time.sleep(idle_seconds)
+    idle_commits = committed_transactions() - before - 1
+    print(f"    Database transactions committed while idle (whole database): {idle_commits}")
+
+    pushed_at = time.monotonic()
+    Notification.objects.create(recipient=user, message='SSE load test notification')
+    time.sleep(5)
+    latencies = sorted(t - pushed_at for t in received_push if t is not None)
+    print(f"[3] Push delivered to {len(latencies)}/{connected} streams")
+    if latencies:
+        print(f"    Fan-out latency p50={latencies[len(latencies) // 2] * 1000:.1f}ms "
+              f"max={latencies[-1] * 1000:.1f}ms")
+
+    stop.set()
+    failures = [r for r in results if r not in ('connected', None)]
+    if failures:
+        print(f"[!] {len(failures)} streams failed, e.g. {failures[0]}")
+
+    Notification.objects.filter(recipient=user, message='SSE load test notification').delete()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--connections', type=int, default=300)
+    parser.add_argument('--idle', type=int, default=30)
+    parser.add_argument('--username', default=None)
+    args = parser.parse_args()
+    run(args.url, args.connections, args.idle, args.username)
@@ -0,0 +1,166 @@
+"""
+Permission engine: compiles everything that grants a user a permission (the
+user's flags, team and role memberships) into one frozenset of codenames, so
+views can ask has_perm(user, codename) without touching the database.
+
+A user's set only changes when their `perm_version` is bumped (see
+rbac/signals.py), which makes (user id, perm_version) a safe cache key:
+  1. the access token carries the compiled set and its version as claims
+     (rbac/tokens.py) and is used as-is while the version still matches;
+  2. otherwise the set comes from a per-process LRU cache;
+  3. and only on a miss is it compiled, with a single query for role grants.
+"""
+import threading
+from collections import OrderedDict
+
+# Codenames checked by the CRM. Besides being granted through a Role, each is
+# implied by the user flags below; superusers hold all of them.
+BUILTIN_PERMISSIONS = {
+    'leads.view_all': 'View all leads',
+    'leads.edit_all': 'Edit any lead',
+    'leads.create': 'Create leads',
+    'leads.delete': 'Delete leads',
+    'leads.export': 'Export leads',
+    'leads.assign': 'Assign leads to users',
+    'records.view_all': 'View all accounts, contacts, deals, tasks and reminders',
+    'reports.view': 'View reports, revenue and activity statistics',
+    'users.manage': 'Onboard users and set revenue targets',
+    'users.delete': 'Delete users',
+    'roles.manage': 'Edit roles and permissions',
+    'tasks.send_reminder': 'Send task reminders to other users',
+    'scheduler.view': 'View scheduled job status',
+    'tech_pipeline.view': 'View the tech pipeline',
+    'tech_pipeline.manage': 'Manage the tech pipeline',
+}
+
+# User fields that feed the compiled set; changing one bumps perm_version
+FLAG_FIELDS = (
+    'is_superuser', 'is_manager', 'is_active', 'team', 'view_all_leads', 'view_tech_pipeline',
+    'manage_tech_pipeline', 'can_create_leads', 'can_delete_leads', 'can_export_leads',
+)
+
+
+def _flag_permissions(user):
+    from crm.models import Team
+
+    if user.is_superuser:
+        return set(BUILTIN_PERMISSIONS)
+
+    granted = set()
+    if user.is_manager:
+        granted.update([
+            'leads.view_all', 'leads.edit_all', 'leads.create', 'leads.delete', 'leads.export', 'leads.assign',
+            'records.view_all', 'reports.view', 'users.manage', 'roles.manage',
+            'tasks.send_reminder', 'scheduler.view', 'tech_pipeline.view', 'tech_pipeline.manage',
+        ])
+    if user.team == Team.ADMIN:
+        granted.add('users.delete')
+    if user.team in (Team.ADMIN, Team.TECH):
+        granted.update(['tech_pipeline.view', 'tech_pipeline.manage'])
+
+    flags = {
+        'view_all_leads': 'leads.view_all',
+        'can_create_leads': 'leads.create',
+        'can_delete_leads': 'leads.delete',
+        'can_export_leads': 'leads.export',
+        'view_tech_pipeline': 'tech_pipeline.view',
+        'manage_tech_pipeline': 'tech_pipeline.manage',
+    }
+    granted.update(codename for flag, codename in flags.items() if getattr(user, flag, False))
+    if 'tech_pipeline.manage' in granted:
+        granted.add('tech_pipeline.view')
+    return granted
+
+
+def compile_permissions(user):
+    """Builds the user's permission set from flags and roles (one query)."""
+    from .models import Permission
+
+    if not user.is_active:
+        return frozenset()
+    granted = _flag_permissions(user)
+    granted.update(Permission.objects.filter(roles__users=user).values_list('codename', flat=True).distinct())
+    return frozenset(granted)
+
+
+class CompiledPermissionCache:
+    """Thread-safe LRU of compiled sets keyed by (user id, perm_version)."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            perms = self._entries.get(key)
+            if perms is not None:
+                self._entries.move_to_end(key)
+            return perms
+
+    def put(self, key, perms):
+        with self._lock:
+            self._entries[key] = perms
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+compiled_permissions = CompiledPermissionCache()
+
+
+def get_permissions(user):
+    """The user's compiled permission set, memoised on the user object for the request."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    perms = getattr(user, '_compiled_permissions', None)
+    if perms is not None:
+        return perms
+
+    version = user.perm_version
+    # Set by ClaimsJWTAuthentication from the access token's claims
+    claims = getattr(user, 'permission_claims', None)
+    if claims is not None and claims[0] == version:
+        perms = frozenset(claims[1])
+    else:
+        key = (user.pk, version)
+        perms = compiled_permissions.get(key)
+        if perms is None:
+            perms = compile_permissions(user)
+            compiled_permissions.put(key, perms)
+
+    user._compiled_permissions = perms
+    return perms
+
+
+def has_perm(user, codename):
+    return codename in get_permissions(user)
+
+
+def bump_perm_version(user_ids):
+    """Invalidates the compiled sets (and token claims) of the given users."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import F
+
+    user_ids = list(user_ids)
+    if user_ids:
+        get_user_model().objects.filter(pk__in=user_ids).update(perm_version=F('perm_version') + 1)
+
+
+def require(codename):
+    """DRF permission class granting access to users holding `codename`."""
+    from rest_framework.permissions import BasePermission
+
+    class HasPermission(BasePermission):
+        message = f"You do not have the '{codename}' permission."
+
+        def has_permission(self, request, view):
+            return has_perm(request.user, codename)
+
+    HasPermission.__name__ = f"HasPermission[{codename}]"
+    return HasPermission
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:17
+
+from django.db import migrations
+
+
+# Codenames checked by the CRM (rbac.engine.BUILTIN_PERMISSIONS at the time of writing),
+# created so they can be granted through roles
+BUILTIN_PERMISSIONS = [
+    ('leads.view_all', 'View all leads'),
+    ('leads.edit_all', 'Edit any lead'),
+    ('leads.create', 'Create leads'),
+    ('leads.delete', 'Delete leads'),
+    ('leads.export', 'Export leads'),
+    ('leads.assign', 'Assign leads to users'),
+    ('records.view_all', 'View all accounts, contacts, deals, tasks and reminders'),
+    ('reports.view', 'View reports, revenue and activity statistics'),
+    ('users.manage', 'Onboard users and set revenue targets'),
+    ('users.delete', 'Delete users'),
+    ('roles.manage', 'Edit roles and permissions'),
+    ('tasks.send_reminder', 'Send task reminders to other users'),
+    ('scheduler.view', 'View scheduled job status'),
+    ('tech_pipeline.view', 'View the tech pipeline'),
+    ('tech_pipeline.manage', 'Manage the tech pipeline'),
+]
+
+
+def create_permissions(apps, schema_editor):
+    Permission = apps.get_model('rbac', 'Permission')
+    for codename, name in BUILTIN_PERMISSIONS:
+        Permission.objects.get_or_create(codename=codename, defaults={'name': name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rbac', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_permissions, migrations.RunPython.noop),
+    ]
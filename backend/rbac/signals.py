@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, pre_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .engine import FLAG_FIELDS, bump_perm_version
+from .models import Permission, Role
+
+# Also stamped into access tokens as identity claims (rbac/tokens.py), so a change must make them stale too
+TOKEN_FIELDS = (*FLAG_FIELDS, 'username', 'is_staff')
+
+
+def _role_user_ids(role_ids):
+    return Role.users.through.objects.filter(role_id__in=role_ids).values_list('user_id', flat=True).distinct()
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def bump_on_flag_change(sender, instance, **kwargs):
+    """Changing a permission flag, the team or a claimed identity field invalidates the user's tokens' claims."""
+    if instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        # An atomic increment: User.save() never writes perm_version itself
+        bump_perm_version([instance.pk])
+        instance.perm_version = sender.objects.filter(pk=instance.pk).values_list('perm_version', flat=True).first()
+        instance.__dict__.pop('_compiled_permissions', None)
+
+
+@receiver(m2m_changed, sender=Role.users.through)
+def bump_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.roles.add(...): the user is the instance
+        bump_perm_version([instance.pk])
+    elif action == 'pre_clear':
+        bump_perm_version(_role_user_ids([instance.pk]))
+    else:
+        bump_perm_version(pk_set)
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def bump_on_role_permissions_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        role_ids = [instance.pk]
+    elif action == 'pre_clear':
+        role_ids = instance.roles.values_list('pk', flat=True)
+    else:
+        role_ids = pk_set
+    bump_perm_version(_role_user_ids(role_ids))
+
+
+@receiver(pre_delete, sender=Role)
+def bump_on_role_delete(sender, instance, **kwargs):
+    # The cascade removes memberships without m2m_changed
+    bump_perm_version(_role_user_ids([instance.pk]))
+
+
+@receiver(pre_delete, sender=Permission)
+@receiver(post_save, sender=Permission)
+def bump_on_permission_change(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    bump_perm_version(_role_user_ids(instance.roles.values_list('pk', flat=True)))
@@ -0,0 +1,48 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from crm.models import ClaimsUser
+
+from .engine import get_permissions
+
+# Claim names in access and refresh tokens
+PERMISSIONS_CLAIM = 'perms'
+PERM_VERSION_CLAIM = 'pv'
+
+
+def add_permission_claims(token, user):
+    token[PERMISSIONS_CLAIM] = sorted(get_permissions(user))
+    token[PERM_VERSION_CLAIM] = user.perm_version
+    # Lets ClaimsJWTAuthentication rebuild the user without loading it
+    for field in ClaimsUser.CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+class PermissionTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login: tokens carry the user's compiled permissions, their version and the identity claims."""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_permission_claims(super().get_token(user), user)
+
+
+class PermissionTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh: re-stamps the claims, so a new access token picks up permission
+    changes made since login instead of copying the refresh token's stale set.
+    """
+
+    def validate(self, attrs):
+        from django.contrib.auth import get_user_model
+
+        data = super().validate(attrs)
+        access = self.token_class.access_token_class(data['access'])
+        user = get_user_model().objects.filter(**{
+            api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM],
+        }).first()
+        if user is not None:
+            add_permission_claims(access, user)
+            data['access'] = str(access)
+        return data
@@ -1,14 +1,22 @@
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from .engine import require
 from .models import Permission, Role
 from .serializers import PermissionSerializer, RoleSerializer
 
+class ManageRolesOrReadOnly(require('roles.manage')):
+    """Anyone signed in may read roles and permissions; changing them needs roles.manage."""
+
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or super().has_permission(request, view)
+
 class PermissionViewSet(viewsets.ModelViewSet):
     queryset = Permission.objects.all()
     serializer_class = PermissionSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, ManageRolesOrReadOnly]
 
 class RoleViewSet(viewsets.ModelViewSet):
-    queryset = Role.objects.all()
+    # One query for all the roles' permissions instead of one per role
+    queryset = Role.objects.prefetch_related('permissions').order_by('name')
     serializer_class = RoleSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, ManageRolesOrReadOnly]
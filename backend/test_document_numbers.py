@@ -0,0 +1,85 @@
+"""
+Concurrency check for invoice/quotation numbering.
+
+Fires --creates parallel POSTs to /api/v1/invoices/ and /api/v1/quotations/
+from --threads threads (each with its own DB connection) and verifies that
+every request succeeded and that the numbers allocated in this run are
+unique and contiguous (gap-free). Meant for PostgreSQL; SQLite serialises
+writers and may report "database is locked" under load.
+
+Usage:
+    python test_document_numbers.py --creates 300 --threads 50
+"""
+import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from crm.models import Invoice, Quotation, User
+
+MARKER = 'Numbering concurrency test'
+
+
+def create(kind, token):
+    try:
+        client = Client(HTTP_HOST='localhost')
+        payload = {
+            'client_name': MARKER,
+            'items': [{'name': 'Item', 'price': 100, 'quantity': 1, 'subtotal': 100}],
+            'grand_total': '105.00',
+        }
+        response = client.post(f'/api/v1/{kind}/', payload, content_type='application/json',
+                               HTTP_AUTHORIZATION=f'Bearer {token}')
+        return response.status_code
+    finally:
+        connection.close()
+
+
+def check_numbers(model, field, prefix, year):
+    # Only this run's documents: earlier runs deleted theirs, which leaves gaps below
+    numbers = list(model.objects.filter(client_name=MARKER).values_list(field, flat=True))
+    values = sorted(int(number.rsplit('-', 1)[1]) for number in numbers if re.fullmatch(rf'{prefix}-{year}-\d{{6}}', number))
+    duplicates = len(values) - len(set(values))
+    gaps = sorted(set(range(values[0], values[-1] + 1)) - set(values)) if values else []
+    print(f"    {prefix}: {len(values)} sequential numbers, {values[0] if values else '-'}..{values[-1] if values else '-'}, "
+          f"duplicates={duplicates}, gaps={len(gaps)}")
+    return duplicates == 0 and not gaps
+
+
+def run(creates, threads):
+    user = User.objects.filter(is_superuser=True).first() or User.objects.first()
+    token = str(AccessToken.for_user(user))
+    year = timezone.localdate().year
+
+    print(f"[1] Firing {creates} invoice and {creates} quotation creates on {threads} threads...")
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(lambda i: create('invoices' if i % 2 else 'quotations', token), range(creates * 2)))
+
+    failures = [code for code in statuses if code != 201]
+    print(f"    {len(statuses) - len(failures)} created, {len(failures)} failed {sorted(set(failures)) or ''}")
+
+    print("[2] Checking allocated numbers...")
+    ok = check_numbers(Invoice, 'invoice_number', 'INV', year)
+    ok = check_numbers(Quotation, 'quotation_number', 'QUO', year) and ok
+
+    Invoice.objects.filter(client_name=MARKER).delete()
+    Quotation.objects.filter(client_name=MARKER).delete()
+    print("PASS" if ok and not failures else "FAIL")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--creates', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=50)
+    args = parser.parse_args()
+    run(args.creates, args.threads)
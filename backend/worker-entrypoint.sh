@@ -0,0 +1,12 @@
+#!/bin/sh
+
+# Entrypoint for the scheduler, dispatcher, export worker and SSE services.
+# Only the backend service (entrypoint.sh) migrates and seeds; these wait until
+# the database is reachable and every migration has been applied.
+echo "Waiting for database migrations..."
+until python manage.py migrate --check >/dev/null 2>&1; do
+    sleep 3
+done
+
+echo "READY TO START WORKER"
+exec "$@"
@@ -1,4 +1,4 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { RouterOutlet, RouterLink, RouterLinkActive, Router, NavigationEnd } from '@angular/router';
 import { CommonModule } from '@angular/common';
 import { AuthService } from '../../services/auth.service';
@@ -16,7 +16,7 @@ import { filter } from 'rxjs/operators';
     templateUrl: './main-layout.component.html',
     styleUrl: './main-layout.component.css'
 })
-export class MainLayoutComponent implements OnInit {
+export class MainLayoutComponent implements OnInit, OnDestroy {
     isSidebarOpen = false;
     isSettingsOpen = false;
     isChangePasswordOpen = false;
@@ -24,6 +24,8 @@ export class MainLayoutComponent implements OnInit {
     teams: any[] = [];
     unreadCount = 0;
     isDashboardRoute = true;
+    private notificationStream?: EventSource;
+    private reconnectTimer?: ReturnType<typeof setTimeout>;
 
     constructor(
         public authService: AuthService,
@@ -36,6 +38,7 @@ export class MainLayoutComponent implements OnInit {
         if (this.authService.isLoggedIn()) {
             this.loadTeams();
             this.loadUnreadCount();
+            this.connectNotificationStream();
         }
         this.checkRoute(this.router.url);
         this.router.events.pipe(
@@ -91,7 +94,57 @@ export class MainLayoutComponent implements OnInit {
         });
     }
 
+    connectNotificationStream() {
+        // Server pushes unread counts; EventSource cannot send headers, so it opens with a short-lived
+        // stream ticket in the query string instead of the access token
+        if (!this.authService.currentUserValue?.token || typeof EventSource === 'undefined') {
+            return;
+        }
+        this.http.post<{ ticket: string }>(`${environment.apiUrl}/notifications/stream_ticket/`, {}, {
+            headers: { 'X-Skip-Loader': 'true' }
+        }).subscribe({
+            next: ({ ticket }) => this.openNotificationStream(ticket),
+            error: () => this.scheduleReconnect()
+        });
+    }
+
+    private openNotificationStream(ticket: string) {
+        this.closeNotificationStream();
+        this.notificationStream = new EventSource(`${environment.apiUrl}/notifications/stream/?ticket=${encodeURIComponent(ticket)}`);
+        const updateCount = (event: MessageEvent) => {
+            const data = JSON.parse(event.data);
+            if (data.unread_count !== undefined) {
+                this.unreadCount = data.unread_count;
+            }
+        };
+        this.notificationStream.addEventListener('unread_count', updateCount as EventListener);
+        this.notificationStream.addEventListener('notification', updateCount as EventListener);
+        this.notificationStream.onerror = () => {
+            // Tickets are short-lived: reconnect with a fresh one
+            this.closeNotificationStream();
+            this.scheduleReconnect();
+        };
+    }
+
+    private scheduleReconnect() {
+        this.reconnectTimer = setTimeout(() => this.connectNotificationStream(), 10000);
+    }
+
+    closeNotificationStream() {
+        this.notificationStream?.close();
+        this.notificationStream = undefined;
+        if (this.reconnectTimer) {
+            clearTimeout(this.reconnectTimer);
+            this.reconnectTimer = undefined;
+        }
+    }
+
+    ngOnDestroy() {
+        this.closeNotificationStream();
+    }
+
     logout() {
+        this.closeNotificationStream();
         this.authService.logout();
     }
 }
@@ -66,6 +66,19 @@ export interface LeadDocument {
     uploaded_at: string;
 }
 
+export interface UploadSession {
+    id: string;
+    lead: number;
+    name: string;
+    size: number;
+    sha256: string;
+    offset: number;
+    chunk_size: number;
+    status: 'ACTIVE' | 'COMPLETE' | 'FAILED';
+    document: LeadDocument | null;
+    error: string;
+}
+
 export interface AuditLog {
     id: number;
     actor_name: string;
@@ -1,8 +1,8 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable, map } from 'rxjs';
+import { Observable, firstValueFrom, from, map } from 'rxjs';
 import { environment } from '../../../environments/environment';
-import { Lead, LeadDocument } from '../models/lead.model';
+import { Lead, LeadDocument, UploadSession } from '../models/lead.model';
 
 @Injectable({
     providedIn: 'root'
@@ -49,12 +49,54 @@ export class LeadService {
         });
     }
 
+    /**
+     * Uploads a document in chunks through /upload-sessions/. A failed chunk is
+     * retried from the offset the server reports, so a dropped connection only
+     * costs the chunk in flight. Files the server already stores (same SHA-256)
+     * are attached without sending any bytes.
+     */
     uploadDocument(leadId: number, file: File): Observable<LeadDocument> {
-        const formData = new FormData();
-        formData.append('lead', leadId.toString());
-        formData.append('file_path', file);
+        return from(this.uploadInChunks(leadId, file));
+    }
+
+    private async uploadInChunks(leadId: number, file: File): Promise<LeadDocument> {
+        const sessionsUrl = `${environment.apiUrl}/upload-sessions`;
+        const sha256 = await this.sha256(file);
+        let session = await firstValueFrom(this.http.post<UploadSession>(`${sessionsUrl}/`, {
+            lead: leadId, name: file.name, size: file.size, sha256
+        }));
+
+        let failures = 0;
+        while (session.status === 'ACTIVE') {
+            const chunk = file.slice(session.offset, session.offset + session.chunk_size);
+            try {
+                session = await firstValueFrom(this.http.put<UploadSession>(`${sessionsUrl}/${session.id}/chunk/`, chunk, {
+                    headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(session.offset) }
+                }));
+                failures = 0;
+            } catch (err) {
+                if (++failures > 5) {
+                    throw err;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+                // Carry on from wherever the server got to
+                session = await firstValueFrom(this.http.get<UploadSession>(`${sessionsUrl}/${session.id}/`));
+            }
+        }
+
+        if (session.status !== 'COMPLETE' || !session.document) {
+            throw new Error(session.error || 'Upload failed');
+        }
+        return session.document;
+    }
 
-        return this.http.post<LeadDocument>(`${environment.apiUrl}/documents/`, formData);
+    private async sha256(file: File): Promise<string> {
+        // crypto.subtle is only available on https (and localhost); the server hashes the file anyway
+        if (!window.crypto?.subtle) {
+            return '';
+        }
+        const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return Array.from(new Uint8Array(digest)).map(byte => byte.toString(16).padStart(2, '0')).join('');
     }
 
     deleteDocument(docId: number): Observable<any> {
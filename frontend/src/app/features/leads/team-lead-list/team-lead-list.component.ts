@@ -155,8 +155,8 @@ export class TeamLeadListComponent implements OnInit {
         return Math.ceil(this.totalCount / this.pageSize);
     }
 
-    exportCsv() {
-        const url = `${environment.apiUrl}/leads/export_xlsx/`;
+    exportLeads(format: 'xlsx' | 'csv' = 'xlsx') {
+        const url = `${environment.apiUrl}/leads/export_${format}/`;
         const params: any = {};
         if (this.teamName) params.team = this.teamName;
         if (this.searchTerm) params.search = this.searchTerm;
@@ -184,7 +184,7 @@ export class TeamLeadListComponent implements OnInit {
                 const dateStr = new Date().toISOString().split('T')[0];
 
                 a.href = objectUrl;
-                a.download = `${baseName} - ${dateStr}.xlsx`;
+                a.download = `${baseName} - ${dateStr}.${format}`;
                 a.click();
                 URL.revokeObjectURL(objectUrl);
             },
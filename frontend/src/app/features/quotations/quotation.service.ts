@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, of, timer } from 'rxjs';
+import { switchMap } from 'rxjs/operators';
 import { environment } from '../../../environments/environment';
 
 export interface QuotationItem {
@@ -53,6 +54,15 @@ export class QuotationService {
     }
 
     downloadPdf(id: number): Observable<Blob> {
-        return this.http.get(`${this.apiUrl}${id}/download/`, { responseType: 'blob' });
+        // 202 means the PDF is still rendering server-side; poll again after Retry-After
+        return this.http.get(`${this.apiUrl}${id}/download/`, { responseType: 'blob', observe: 'response' }).pipe(
+            switchMap(res => {
+                if (res.status === 202) {
+                    const retryAfter = Number(res.headers.get('Retry-After')) || 2;
+                    return timer(retryAfter * 1000).pipe(switchMap(() => this.downloadPdf(id)));
+                }
+                return of(res.body as Blob);
+            })
+        );
     }
 }
@@ -25,7 +25,9 @@ export class TechPipelineKanbanComponent implements OnInit {
 
     // Data grouped by stage
     stageData: { [key: string]: TechPipeline[] } = {};
-    allPipelines: TechPipeline[] = [];
+    stageCounts: { [key: string]: number } = {};
+    stageCursors: { [key: string]: string | null } = {};
+    pageSize = 20;
 
     constructor(
         private http: HttpClient,
@@ -34,6 +36,8 @@ export class TechPipelineKanbanComponent implements OnInit {
     ) {
         this.stages.forEach(stage => {
             this.stageData[stage.id] = [];
+            this.stageCounts[stage.id] = 0;
+            this.stageCursors[stage.id] = null;
         });
     }
 
@@ -42,11 +46,8 @@ export class TechPipelineKanbanComponent implements OnInit {
     }
 
     loadPipelines() {
-        this.http.get<any>(`${environment.apiUrl}/tech-pipeline/?no_pagination=true`).subscribe({
-            next: (res) => {
-                this.allPipelines = Array.isArray(res) ? res : res.results || [];
-                this.distributePipelines();
-            },
+        this.http.get<any>(`${environment.apiUrl}/tech-pipeline/board/?limit=${this.pageSize}`).subscribe({
+            next: (res) => this.applyColumns(res.columns || [], false),
             error: (err) => {
                 console.error('Failed to load tech pipelines', err);
                 this.toastService.error('Failed to load Tech Pipelines');
@@ -54,14 +55,23 @@ export class TechPipelineKanbanComponent implements OnInit {
         });
     }
 
-    distributePipelines() {
-        this.stages.forEach(stage => this.stageData[stage.id] = []);
+    loadMore(stageId: TechPipelineStage) {
+        const cursor = this.stageCursors[stageId];
+        if (!cursor) return;
+        this.http.get<any>(`${environment.apiUrl}/tech-pipeline/board/`, {
+            params: { stage: stageId, cursor, limit: this.pageSize }
+        }).subscribe({
+            next: (res) => this.applyColumns(res.columns || [], true),
+            error: () => this.toastService.error('Failed to load more items')
+        });
+    }
 
-        this.allPipelines.forEach(pipeline => {
-            const stageKey = pipeline.stage as TechPipelineStage;
-            if (this.stageData[stageKey]) {
-                this.stageData[stageKey].push(pipeline);
-            }
+    applyColumns(columns: any[], append: boolean) {
+        columns.forEach(column => {
+            const current = append ? this.stageData[column.stage] || [] : [];
+            this.stageData[column.stage] = [...current, ...column.results];
+            this.stageCounts[column.stage] = column.count;
+            this.stageCursors[column.stage] = column.next_cursor;
         });
     }
 
@@ -80,6 +90,8 @@ export class TechPipelineKanbanComponent implements OnInit {
                 event.currentIndex,
             );
             pipeline.stage = stageId;
+            this.stageCounts[previousStage]--;
+            this.stageCounts[stageId]++;
 
             // API call
             this.http.patch(`${environment.apiUrl}/tech-pipeline/${pipeline.id}/`, { stage: stageId }).subscribe({
@@ -90,6 +102,8 @@ export class TechPipelineKanbanComponent implements OnInit {
                     // Revert on failure
                     this.toastService.error('Failed to update stage');
                     pipeline.stage = previousStage;
+                    this.stageCounts[previousStage]++;
+                    this.stageCounts[stageId]--;
                     transferArrayItem(
                         event.container.data,
                         event.previousContainer.data,